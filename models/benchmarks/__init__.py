@@ -0,0 +1,2 @@
+# Micro-benchmarks for the camera pages. Run from the models/ directory, e.g.
+#   python -m benchmarks.bench_pose_math
@@ -0,0 +1,96 @@
+"""Allocation and time per frame of the Yoga frame path, before and after FrameBuffers.
+
+    python -m benchmarks.bench_frame_buffers [--frames 600] [--size 640x480]
+
+A synthetic MJPEG clip stands in for the camera. "before" is what the Yoga
+loop used to do: cap.read(), BGR->RGB, RGB->BGR and cv2.resize to 800x600,
+every step returning a new array. "after" reads into a ring slot, resizes
+once up front and converts into a reused read-only RGB buffer. Pose
+inference is left out; it is the same on both sides.
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from dadhichi.frames import FrameBuffers
+
+TARGET = (800, 600)
+
+
+def write_clip(path, n, size):
+    rng = np.random.default_rng(0)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, size)
+    for i in range(n):
+        frame = rng.integers(60, 90, (size[1], size[0], 3), dtype=np.uint8)
+        cv2.circle(frame, (size[0] // 2 + int(100 * np.sin(i / 10)), size[1] // 2), 40, (200, 180, 160), -1)
+        writer.write(frame)
+    writer.release()
+
+
+def legacy(cap, buffers):
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+        image = cv2.resize(image, TARGET)
+        yield image
+
+
+def buffered(cap, buffers):
+    while True:
+        ok, frame = buffers.read(cap)
+        if not ok:
+            break
+        buffers.release(buffers.to_rgb(frame))
+        yield frame
+        buffers.release(frame)
+
+
+def measure(path, loop, ring):
+    cap = cv2.VideoCapture(path)
+    buffers = FrameBuffers(TARGET, ring=ring)
+    tracemalloc.start()
+    frames = 0
+    start = time.perf_counter()
+    for _ in loop(cap, buffers):
+        frames += 1
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    cap.release()
+    return {
+        "frames": frames,
+        "ms_per_frame": elapsed / max(frames, 1) * 1000,
+        "peak_mb": peak / 2 ** 20,
+        "buffer_allocations": buffers.allocations,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--size", default="640x480", help="camera frame size, WxH")
+    parser.add_argument("--ring", type=int, default=1,
+                        help="capture slots; 1 matches this single-threaded loop, pages use 6")
+    args = parser.parse_args()
+    size = tuple(int(v) for v in args.size.split("x"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "clip.avi")
+        write_clip(path, args.frames, size)
+        results = {"before": measure(path, legacy, args.ring), "after": measure(path, buffered, args.ring)}
+
+    print(f"{'':<8}{'ms/frame':>10}{'peak MB':>10}{'allocs':>10}")
+    for name, r in results.items():
+        print(f"{name:<8}{r['ms_per_frame']:>10.2f}{r['peak_mb']:>10.1f}{r['buffer_allocations']:>10}")
+
+
+if __name__ == "__main__":
+    main()
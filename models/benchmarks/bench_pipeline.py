@@ -0,0 +1,208 @@
+"""Per-stage latency of the camera frame loop, replayed offline.
+
+    python -m benchmarks.bench_pipeline [--clip video.mp4] [--frames 300] [--page yoga|train] [--out results.json]
+
+Frames come from --clip if given, otherwise from a synthetic clip (a moving
+stick figure over noise, JPEG-encoded in memory so the decode stage has
+real work). Each frame goes through the same stages as the Yoga/Train
+loops: decode, BGR->RGB, pose.process, angle + rule evaluation, overlay
+drawing and frame encoding. The overlay is drawn with the same hud
+renderers and labels as the --page it stands for. The pose stage needs the legacy
+mediapipe.solutions API and is reported as skipped without it; rules then
+run on synthetic landmarks. Results are printed and written as JSON so
+runs can be compared over time.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import time
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+from dadhichi.asanas import TRACKS, TrackRules
+from dadhichi.camera import SyntheticCapture
+from dadhichi.hud import LabelCache, Layer, SkeletonRenderer
+from dadhichi.pose_math import NUM_LANDMARKS
+from dadhichi.transport import FrameTransport
+
+STAGES = ["decode", "convert", "infer", "evaluate", "draw", "encode"]
+
+
+def synthetic_clip(n, size=(640, 480), seed=0):
+    # JPEG bytes for a stick figure swinging its arms over sensor-like noise
+    cap = SyntheticCapture(*size, seed=seed)
+    frames = []
+    for _ in range(n):
+        ok, img = cap.read()
+        frames.append(cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 85])[1])
+    return frames
+
+
+def clip_frames(path, n):
+    # Re-encode the clip's frames so decode is timed the same way as the synthetic clip
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < n:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 85])[1])
+    cap.release()
+    return frames
+
+
+def load_pose():
+    try:
+        import mediapipe as mp
+        return mp.solutions.pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5)
+    except (ImportError, AttributeError):
+        return None
+
+
+def synthetic_landmarks(rng):
+    return [SimpleNamespace(x=float(x), y=float(y), z=float(z), visibility=float(v))
+            for x, y, z, v in rng.random((NUM_LANDMARKS, 4))]
+
+
+def summarize(samples):
+    samples = np.asarray(samples) * 1000
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {
+        "n": int(samples.size),
+        "mean_ms": float(samples.mean()),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "fps": float(1000 / samples.mean()) if samples.mean() else None,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class YogaOverlay:
+    # What the Yoga page draws per frame: skeleton, verdict and hold timer
+    def __init__(self):
+        self.skeleton = SkeletonRenderer(line_color=(0, 255, 0), point_color=(255, 0, 0), thickness=2, radius=2)
+        self.labels = LabelCache()
+
+    def draw(self, image, points, verdicts, i):
+        self.skeleton.draw(image, points)
+        if verdicts[0]:
+            self.labels.draw(image, "asana: Correct", (50, 50), (0, 255, 0))
+            self.labels.draw(image, f"time: {i // 30}s", (50, 100), (255, 255, 255))
+        else:
+            self.labels.draw(image, "asana: Incorrect", (50, 50), (0, 0, 255))
+
+
+class TrainOverlay:
+    # What the Train page draws per frame: rep panel, count, stage, tempo, angle and skeleton
+    def __init__(self):
+        self.panel = (Layer((226, 74))
+                      .rect((0, 0), (225, 73), (245, 117, 16))
+                      .text('REPS', (15, 12), (0, 0, 0))
+                      .text('STAGE', (65, 12), (0, 0, 0)))
+        self.skeleton = SkeletonRenderer(line_color=(245, 117, 66), point_color=(245, 66, 230), thickness=2, radius=2)
+        self.labels = LabelCache()
+
+    def draw(self, image, points, verdicts, i):
+        cv2.putText(image, str(round(float(points[13, 0]), 1)), (320, 240),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2, cv2.LINE_AA)
+        self.panel.apply(image)
+        self.labels.draw(image, str(i // 45), (10, 60), (255, 255, 255), 2, 2)
+        self.labels.draw(image, "up" if verdicts[0] else "down", (60, 60), (255, 255, 255), 2, 2)
+        self.labels.draw(image, "TEMPO 1.5s/rep", (10, 95), (245, 117, 16), 0.6, 2)
+        self.skeleton.draw(image, points)
+
+
+OVERLAYS = {"yoga": YogaOverlay, "train": TrainOverlay}
+
+
+def run(frames, pose, page="yoga", warmup=10):
+    rules = TrackRules(TRACKS["Track 2"])
+    overlay = OVERLAYS[page]()
+    transport = FrameTransport(None, preview_width=640)
+    rng = np.random.default_rng(1)
+    timings = {stage: [] for stage in STAGES + ["total"]}
+    clock = time.perf_counter
+
+    for i, data in enumerate(frames):
+        t0 = clock()
+        frame = cv2.imdecode(data, cv2.IMREAD_COLOR)
+        t1 = clock()
+        image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        t2 = clock()
+        landmarks = None
+        if pose is not None:
+            results = pose.process(image)
+            if results.pose_landmarks is not None:
+                landmarks = results.pose_landmarks.landmark
+        t3 = clock()
+        if landmarks is None:
+            landmarks = synthetic_landmarks(rng)
+        verdicts = rules.evaluate(landmarks)
+        t4 = clock()
+        overlay.draw(frame, rules.pose_frame.points, verdicts, i)
+        t5 = clock()
+        transport.encode(frame)
+        t6 = clock()
+
+        if i < warmup:
+            continue
+        for stage, dt in zip(STAGES + ["total"], (t1 - t0, t2 - t1, t3 - t2, t4 - t3, t5 - t4, t6 - t5, t6 - t0)):
+            timings[stage].append(dt)
+
+    return {stage: summarize(samples) for stage, samples in timings.items()
+            if samples and not (stage == "infer" and pose is None)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clip", help="video file to replay instead of synthetic frames")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--page", choices=sorted(OVERLAYS), default="yoga", help="whose overlay to draw")
+    parser.add_argument("--out", default="bench_pipeline.json")
+    args = parser.parse_args()
+
+    frames = clip_frames(args.clip, args.frames) if args.clip else synthetic_clip(args.frames)
+    pose = load_pose()
+    stages = run(frames, pose, args.page)
+
+    report = {
+        "benchmark": "pipeline",
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "opencv": cv2.__version__,
+        "source": args.clip or "synthetic",
+        "frames": len(frames),
+        "pose": "mediapipe" if pose is not None else "skipped",
+        "page": args.page,
+        "stages": stages,
+    }
+
+    print(f"{'stage':<10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'fps':>10}")
+    for stage, s in stages.items():
+        print(f"{stage:<10}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}{s['fps']:>10.1f}")
+    if pose is None:
+        print("infer: skipped (mediapipe.solutions not available), rules ran on synthetic landmarks")
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Meal-plan solve time and target miss across target profiles.
+
+    python -m benchmarks.bench_planner [--repeat 5] [--candidates 200]
+
+Each profile is solved with every available solver (the local search
+always, the LP when scipy is installed), once with the default candidate
+limit and once with no limit (every food that passes the density and cap
+screens), so the pruning's effect on time and plan quality shows side by
+side. "miss" is the mean relative
+difference from the calorie, protein, carb and fat targets.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from dadhichi.nutrition import get_store
+from dadhichi.planner import SODIUM, SUGAR, MealPlanner, Targets, lp_available
+
+PROFILES = {
+    "maintenance": (Targets(2000, 100, 250, 67), {}),
+    "cut, high protein": (Targets(1500, 150, 100, 55), {"sugar_max": 25}),
+    "bulk": (Targets(3000, 180, 350, 100), {}),
+    "low carb": (Targets(1800, 110, 30, 140), {}),
+    "low sodium": (Targets(2200, 90, 300, 70), {"sodium_max": 1500}),
+    "light meal, no meat": (Targets(600, 40, 60, 20), {"max_servings": 2, "exclude_words": ["BEEF", "PORK", "CHICKEN"]}),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--candidates", type=int, default=200)
+    args = parser.parse_args()
+
+    store = get_store()
+    start = time.perf_counter()
+    planner = MealPlanner(store)
+    print(f"density precomputation: {(time.perf_counter() - start) * 1000:.0f} ms over {len(planner.rows)} foods")
+
+    solvers = ["local"] + (["lp"] if lp_available() else [])
+    print(f"{'profile':<22}{'solver':>7}{'limit':>7}{'ms':>9}{'miss':>8}{'foods':>7}{'sugar':>7}{'sodium':>8}")
+    for name, (targets, options) in PROFILES.items():
+        options = dict(options)
+        exclude = planner.rows_matching(options.pop("exclude_words", ()))
+        for solver in solvers:
+            for limit in (args.candidates, len(planner.rows)):
+                times = []
+                for _ in range(args.repeat):
+                    plan = planner.plan(targets, exclude=exclude, candidates=limit, solver=solver, **options)
+                    times.append(plan.ms)
+                totals = plan.meal.totals
+                print(f"{name:<22}{solver:>7}{limit:>7}{np.median(times):>9.1f}{plan.error:>8.3f}{len(plan.rows):>7}"
+                      f"{totals[store.column(SUGAR)]:>7.0f}{totals[store.column(SODIUM)]:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
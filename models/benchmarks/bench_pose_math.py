@@ -0,0 +1,111 @@
+"""Per-frame CPU cost of landmark extraction + joint angles, before and after PoseFrame.
+
+    python -m benchmarks.bench_pose_math [--frames 20000]
+
+"before" replays what the Yoga loop used to do for its heaviest pose: build
+12 two-element lists from the landmarks and call the scalar angle function
+8 times plus one distance. "after" is a single PoseFrame.update call, which
+copies all 33 landmarks and computes every joint in pose_math.JOINTS (10
+angles, 2 distances).
+"""
+import argparse
+import enum
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from dadhichi import pose_math as pm
+
+
+def synthetic_landmarks(rng):
+    return [SimpleNamespace(x=float(x), y=float(y), z=float(z), visibility=float(v))
+            for x, y, z, v in rng.random((pm.NUM_LANDMARKS, 4))]
+
+
+# Stand-in for mp.solutions.pose.PoseLandmark (also an IntEnum) so the old
+# `landmarks[PoseLandmark.X.value].x` lookups cost what they cost in the page
+PoseLandmark = enum.IntEnum("PoseLandmark", {
+    "LEFT_SHOULDER": pm.LEFT_SHOULDER, "RIGHT_SHOULDER": pm.RIGHT_SHOULDER,
+    "LEFT_ELBOW": pm.LEFT_ELBOW, "RIGHT_ELBOW": pm.RIGHT_ELBOW,
+    "LEFT_WRIST": pm.LEFT_WRIST, "RIGHT_WRIST": pm.RIGHT_WRIST,
+    "LEFT_HIP": pm.LEFT_HIP, "RIGHT_HIP": pm.RIGHT_HIP,
+    "LEFT_KNEE": pm.LEFT_KNEE, "RIGHT_KNEE": pm.RIGHT_KNEE,
+    "LEFT_ANKLE": pm.LEFT_ANKLE, "RIGHT_ANKLE": pm.RIGHT_ANKLE,
+})
+
+
+def legacy_frame(landmarks):
+    left_shoulder = [landmarks[PoseLandmark.LEFT_SHOULDER.value].x,
+                     landmarks[PoseLandmark.LEFT_SHOULDER.value].y]
+    right_shoulder = [landmarks[PoseLandmark.RIGHT_SHOULDER.value].x,
+                      landmarks[PoseLandmark.RIGHT_SHOULDER.value].y]
+    left_wrist = [landmarks[PoseLandmark.LEFT_WRIST.value].x,
+                  landmarks[PoseLandmark.LEFT_WRIST.value].y]
+    right_wrist = [landmarks[PoseLandmark.RIGHT_WRIST.value].x,
+                   landmarks[PoseLandmark.RIGHT_WRIST.value].y]
+    left_hip = [landmarks[PoseLandmark.LEFT_HIP.value].x,
+                landmarks[PoseLandmark.LEFT_HIP.value].y]
+    right_hip = [landmarks[PoseLandmark.RIGHT_HIP.value].x,
+                 landmarks[PoseLandmark.RIGHT_HIP.value].y]
+    left_elbow = [landmarks[PoseLandmark.LEFT_ELBOW.value].x,
+                  landmarks[PoseLandmark.LEFT_ELBOW.value].y]
+    right_elbow = [landmarks[PoseLandmark.RIGHT_ELBOW.value].x,
+                   landmarks[PoseLandmark.RIGHT_ELBOW.value].y]
+    left_knee = [landmarks[PoseLandmark.LEFT_KNEE.value].x,
+                 landmarks[PoseLandmark.LEFT_KNEE.value].y]
+    right_knee = [landmarks[PoseLandmark.RIGHT_KNEE.value].x,
+                  landmarks[PoseLandmark.RIGHT_KNEE.value].y]
+    left_ankle = [landmarks[PoseLandmark.LEFT_ANKLE.value].x,
+                  landmarks[PoseLandmark.LEFT_ANKLE.value].y]
+    right_ankle = [landmarks[PoseLandmark.RIGHT_ANKLE.value].x,
+                   landmarks[PoseLandmark.RIGHT_ANKLE.value].y]
+
+    angle = pm.calculate_angle
+    return (
+        angle(left_shoulder, left_hip, left_knee, wrap=False),
+        angle(right_shoulder, right_hip, right_knee, wrap=False),
+        angle(left_shoulder, left_elbow, left_wrist, wrap=False),
+        angle(right_shoulder, right_elbow, right_wrist, wrap=False),
+        angle(left_hip, left_shoulder, left_elbow, wrap=False),
+        angle(right_hip, right_shoulder, right_elbow, wrap=False),
+        angle(left_hip, left_knee, left_ankle, wrap=False),
+        angle(right_hip, right_knee, right_ankle, wrap=False),
+        np.sqrt((right_wrist[0] - left_wrist[0]) ** 2 + (right_wrist[1] - left_wrist[1]) ** 2),
+    )
+
+
+def run(fn, frames, n):
+    start = time.perf_counter()
+    for i in range(n):
+        fn(frames[i % len(frames)])
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    frames = [synthetic_landmarks(rng) for _ in range(64)]
+    pose_frame = pm.PoseFrame(wrap=False)
+
+    # Both paths must agree before timing means anything
+    for landmarks in frames:
+        pose_frame.update(landmarks)
+        legacy = legacy_frame(landmarks)
+        batched = [pose_frame.angle(n) for n in ("left_hip", "right_hip", "left_elbow", "right_elbow",
+                                                   "left_shoulder", "right_shoulder", "left_knee", "right_knee")]
+        batched.append(pose_frame.distance("wrists"))
+        np.testing.assert_allclose(batched, legacy, rtol=1e-3, atol=1e-3)
+
+    before = run(legacy_frame, frames, args.frames)
+    after = run(pose_frame.update, frames, args.frames)
+    print(f"before (lists + scalar angles): {before:8.2f} us/frame")
+    print(f"after  (PoseFrame.update):      {after:8.2f} us/frame")
+    print(f"speedup: {before / after:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
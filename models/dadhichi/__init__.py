@@ -0,0 +1,2 @@
+# Shared helpers used by the Streamlit pages (pose math, nutrition data, ...).
+# Pages import from here directly, e.g. `from dadhichi.pose_math import PoseFrame`.
@@ -0,0 +1,169 @@
+import math
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+from mediapipe.framework.formats import landmark_pb2
+
+from dadhichi.pose_math import NUM_LANDMARKS
+
+# Same shape as what the pages read off a MediaPipe result, plus whether the
+# landmarks were measured (False) or extrapolated between runs (True)
+PoseResult = namedtuple("PoseResult", ["pose_landmarks", "predicted"])
+
+
+def new_landmark_list():
+    # Preallocated NormalizedLandmarkList that draw_landmarks accepts
+    landmarks = landmark_pb2.NormalizedLandmarkList()
+    for _ in range(NUM_LANDMARKS):
+        landmarks.landmark.add()
+    return landmarks
+
+
+def fill_landmark_list(landmarks, points):
+    # Write a (33, 4) x/y/z/visibility array into a list from new_landmark_list()
+    for lm, (x, y, z, v) in zip(landmarks.landmark, points.tolist()):
+        lm.x, lm.y, lm.z, lm.visibility = x, y, z, v
+    return landmarks
+
+
+def _smoothing_factor(dt, cutoff):
+    r = 2 * math.pi * cutoff * dt
+    return r / (r + 1)
+
+
+class OneEuroFilter:
+    """One Euro filter over a whole landmark array at once.
+
+    Jitter is smoothed hard when landmarks are still and lightly when they
+    move fast (`beta`). The filtered derivative `dx` is kept so positions
+    can be extrapolated between inference runs.
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=0.5, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.x = None
+        self.dx = None
+        self.t = None
+
+    def reset(self):
+        self.x = self.dx = self.t = None
+
+    def __call__(self, x, t):
+        if self.x is None:
+            self.x = x.copy()
+            self.dx = np.zeros_like(x)
+            self.t = t
+            return self.x
+        dt = max(t - self.t, 1e-6)
+        a_d = _smoothing_factor(dt, self.d_cutoff)
+        self.dx += a_d * ((x - self.x) / dt - self.dx)
+        cutoff = self.min_cutoff + self.beta * np.abs(self.dx)
+        r = 2 * np.pi * cutoff * dt
+        self.x += r / (r + 1) * (x - self.x)
+        self.t = t
+        return self.x
+
+    def predict(self, t):
+        # Constant-velocity extrapolation from the last filtered state
+        return self.x + self.dx * (t - self.t)
+
+
+class MotionDetector:
+    # Mean absolute difference of a small grayscale thumbnail against the last keyframe
+
+    def __init__(self, size=(64, 48)):
+        self.size = size
+        self._small = np.empty(size[::-1] + (3,), dtype=np.uint8)
+        self._gray = np.empty(size[::-1], dtype=np.uint8)
+        self._diff = np.empty(size[::-1], dtype=np.uint8)
+        self._keyframe = None
+
+    def score(self, image):
+        cv2.resize(image, self.size, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_RGB2GRAY, dst=self._gray)
+        if self._keyframe is None:
+            return float("inf")
+        cv2.absdiff(self._gray, self._keyframe, dst=self._diff)
+        return float(cv2.mean(self._diff)[0])
+
+    def mark_keyframe(self):
+        if self._keyframe is None:
+            self._keyframe = self._gray.copy()
+        else:
+            self._keyframe[:] = self._gray
+
+
+class AdaptiveInference:
+    """Drop-in wrapper for `mp_pose.Pose` that skips inference on quiet frames.
+
+    Full inference runs when `every` frames have passed since the last run,
+    when the frame has moved more than `motion_threshold` (mean grey-level
+    difference on a thumbnail), or when there is no pose to extrapolate.
+    In between, landmarks come from a One Euro filter extrapolated at
+    constant velocity. `every` adapts to the measured inference time so the
+    average per-frame cost stays inside 1 / target_fps.
+
+        inference = AdaptiveInference(pose)
+        results = inference.process(image)   # instead of pose.process(image)
+    """
+
+    def __init__(self, pose, target_fps=15.0, max_every=6, motion_threshold=6.0,
+                 min_cutoff=1.0, beta=0.5, clock=time.monotonic):
+        self.pose = pose
+        self.budget = 1.0 / target_fps
+        self.max_every = max_every
+        self.motion_threshold = motion_threshold
+        self.clock = clock
+
+        self.filter = OneEuroFilter(min_cutoff=min_cutoff, beta=beta)
+        self.motion = MotionDetector()
+        self.every = 1
+        self.inference_time = None
+        self.inferred = 0
+        self.predicted = 0
+
+        self.points = None
+        self._measured = np.zeros((NUM_LANDMARKS, 4), dtype=np.float32)
+        self._since = 0
+        self._landmarks = new_landmark_list()
+
+    def _update_rate(self, elapsed):
+        if self.inference_time is None:
+            self.inference_time = elapsed
+        else:
+            self.inference_time += 0.2 * (elapsed - self.inference_time)
+        self.every = min(self.max_every, max(1, math.ceil(self.inference_time / self.budget)))
+
+    def _to_landmarks(self, points):
+        return fill_landmark_list(self._landmarks, points)
+
+    def process(self, image):
+        now = self.clock()
+        motion = self.motion.score(image)
+        due = self.points is None or self._since >= self.every or motion > self.motion_threshold
+
+        if not due:
+            self._since += 1
+            self.predicted += 1
+            self.points[:, :3] = self.filter.predict(now)[:, :3]
+            return PoseResult(self._to_landmarks(self.points), True)
+
+        start = self.clock()
+        results = self.pose.process(image)
+        self._update_rate(self.clock() - start)
+        self.motion.mark_keyframe()
+        self.inferred += 1
+        self._since = 1
+
+        if results.pose_landmarks is None:
+            self.points = None
+            self.filter.reset()
+            return PoseResult(None, False)
+
+        self._measured[:] = [(lm.x, lm.y, lm.z, lm.visibility) for lm in results.pose_landmarks.landmark]
+        self.points = self.filter(self._measured, now).copy()
+        return PoseResult(self._to_landmarks(self.points), False)
@@ -0,0 +1,159 @@
+from collections import namedtuple
+
+import numpy as np
+
+from dadhichi.pose_math import PoseFrame
+
+# An asana is plain data: named joint angle / distance ranges (exclusive,
+# None for an open end) plus how long it has to be held. Joint and distance
+# names are the keys of pose_math.JOINTS / pose_math.DISTANCES.
+Asana = namedtuple("Asana", ["name", "image", "instructions", "angles", "distances", "hold"])
+Track = namedtuple("Track", ["name", "asanas"])
+
+
+PRANAMASANA = Asana(
+    name="Pranamasana (Prayer Pose)",
+    image="./images/pranamasana2.png",
+    instructions="""
+        - Stand straight with feet together.
+        - Bring palms together in front of chest.
+        - Keep the spine erect and shoulders relaxed.
+        - Focus on breathing deeply and evenly.
+        - Hold for 5 seconds, breathe deeply.
+    """,
+    angles={"left_arm_raise": (None, 100), "right_arm_raise": (None, 100)},
+    distances={"wrists": (None, 0.1)},
+    hold=5,
+)
+
+EKA_PADA_PRANAMASANA = Asana(
+    name="Eka Pada Pranamasana (One-Legged Prayer Pose)",
+    image="./images/Eka_Pada_Pranamasana.png",
+    instructions="""
+        - Shift weight to left leg.
+        - Bend right knee, place right foot on inner thigh.
+        - Hold for 5 seconds.
+        - Repeat on other side.
+    """,
+    angles={"left_arm_raise": (100, None), "right_arm_raise": (100, None), "right_knee": (None, 90)},
+    distances={"wrists": (None, 0.1)},
+    hold=5,
+)
+
+ASHWA_SANCHALANASANA = Asana(
+    name="Ashwa Sanchalanasana (Equestrian Pose)",
+    image="./images/Ashwa_Sanchalanasana.webp",
+    instructions="""
+        - Step right foot back into lunge.
+        - Lower right knee, raise arms overhead.
+        - Hold for 5 seconds.
+        - Repeat on other side.
+    """,
+    angles={"left_knee": (90, None), "right_knee": (None, 150)},
+    distances={},
+    hold=5,
+)
+
+ARDHA_CHAKRASANA = Asana(
+    name="Ardha Chakrasana (Half Wheel Pose)",
+    image="./images/ardha_chakrasana.webp",
+    instructions="""
+        - Stand with feet hip-width apart.
+        - Inhale, raise arms overhead, palms together.
+        - Exhale, bend backwards, keeping arms straight.
+        - Hold for 5 seconds.
+    """,
+    angles={"left_arm_raise": (100, None), "right_arm_raise": (100, None)},
+    distances={"wrists": (None, 0.1)},
+    hold=5,
+)
+
+UTKATASANA = Asana(
+    name="Utkatasana (Chair Pose)",
+    image="./images/Utkatasana.png",
+    instructions="""
+        - Stand with feet together.
+        - Inhale, raise arms overhead.
+        - Exhale, bend knees and lower hips as if sitting on a chair.
+        - Hold for 5 seconds.
+    """,
+    angles={
+        "left_knee": (None, 150), "right_knee": (None, 150),
+        "left_elbow": (150, None), "right_elbow": (150, None),
+        "left_shoulder": (120, None), "right_shoulder": (120, None),
+    },
+    distances={},
+    hold=5,
+)
+
+VEERABHADRASANA_2 = Asana(
+    name="Veerabhadrasana 2 (Warrior 2 Pose)",
+    image="./images/Veerabhadrasan_2.png",
+    instructions="""
+        - Step left foot back, right foot forward.
+        - Bend right knee, aligning it with ankle.
+        - Extend arms parallel to ground, palms facing down.
+        - Hold for 5 seconds.
+    """,
+    angles={
+        "right_knee": (None, 120),
+        "left_elbow": (150, None), "right_elbow": (150, None),
+        "left_shoulder": (None, 120), "right_shoulder": (None, 120),
+    },
+    distances={},
+    hold=5,
+)
+
+TRACKS = {
+    "Track 1": Track("Track 1", [PRANAMASANA, EKA_PADA_PRANAMASANA, ASHWA_SANCHALANASANA]),
+    "Track 2": Track("Track 2", [ARDHA_CHAKRASANA, UTKATASANA, VEERABHADRASANA_2]),
+}
+
+
+class TrackRules:
+    """A track's asanas compiled into threshold matrices over one feature vector.
+
+    Only the joints and distances some asana in the track constrains are
+    computed. Each asana becomes a row of lower / upper bounds (+-inf where
+    unconstrained), so `evaluate` checks every asana of the track with a
+    fixed four ufunc calls and no per-pose Python branching.
+    """
+
+    def __init__(self, track, wrap=False):
+        self.track = track
+        self.asanas = list(track.asanas)
+
+        joints = sorted({j for a in self.asanas for j in a.angles})
+        distances = sorted({d for a in self.asanas for d in a.distances})
+        # Yoga thresholds were tuned on unwrapped angles, keep it that way
+        self.pose_frame = PoseFrame(joints=joints, distances=distances, wrap=wrap)
+
+        names = joints + distances
+        column = {n: i for i, n in enumerate(names)}
+        self.lower = np.full((len(self.asanas), len(names)), -np.inf, dtype=np.float32)
+        self.upper = np.full((len(self.asanas), len(names)), np.inf, dtype=np.float32)
+        for row, asana in enumerate(self.asanas):
+            for name, (lo, hi) in list(asana.angles.items()) + list(asana.distances.items()):
+                if lo is not None:
+                    self.lower[row, column[name]] = lo
+                if hi is not None:
+                    self.upper[row, column[name]] = hi
+
+        self._above = np.empty(self.lower.shape, dtype=bool)
+        self._below = np.empty(self.lower.shape, dtype=bool)
+        self.verdicts = np.zeros(len(self.asanas), dtype=bool)
+
+    def __len__(self):
+        return len(self.asanas)
+
+    def check(self, features):
+        # Verdict for every asana from an already computed feature vector
+        np.greater(features, self.lower, out=self._above)
+        np.less(features, self.upper, out=self._below)
+        np.logical_and(self._above, self._below, out=self._above)
+        return np.all(self._above, axis=1, out=self.verdicts)
+
+    def evaluate(self, landmarks):
+        # Landmarks -> one bool per asana in track order
+        self.pose_frame.update(landmarks)
+        return self.check(self.pose_frame.features)
@@ -0,0 +1,120 @@
+import logging
+import os
+import queue
+import threading
+import wave
+from collections import namedtuple
+
+# Cue name -> WAV file, relative to the models/ directory
+CUES = {
+    "bell": "bell.wav",
+}
+
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Decoded PCM kept in memory so a cue never touches the disk again
+Cue = namedtuple("Cue", ["name", "path", "frames", "channels", "sample_width", "sample_rate"])
+
+
+def load_cue(name, path=None):
+    path = os.path.join(_BASE_DIR, path or CUES[name])
+    with wave.open(path, "rb") as wav:
+        return Cue(name, path, wav.readframes(wav.getnframes()), wav.getnchannels(),
+                   wav.getsampwidth(), wav.getframerate())
+
+
+def _simpleaudio_backend():
+    import simpleaudio
+
+    def play(cue):
+        simpleaudio.play_buffer(cue.frames, cue.channels, cue.sample_width, cue.sample_rate).wait_done()
+    return play
+
+
+def _sounddevice_backend():
+    import numpy as np
+    import sounddevice
+
+    dtypes = {1: np.uint8, 2: np.int16, 4: np.int32}
+
+    def play(cue):
+        pcm = np.frombuffer(cue.frames, dtype=dtypes[cue.sample_width]).reshape(-1, cue.channels)
+        sounddevice.play(pcm, cue.sample_rate, blocking=True)
+    return play
+
+
+class AudioCuePlayer:
+    """Plays preloaded cues on a background thread so the frame loop never waits.
+
+    Cues are decoded once at construction. `play` only enqueues; a single
+    worker thread does the actual output. Every backend plays the decoded
+    in-memory PCM, never the file: simpleaudio, then sounddevice. One of
+    them has to be installed for cues to be heard; when neither is, or the
+    device fails (headless servers), the player goes silent and says so in
+    the log instead of raising or stalling.
+    """
+
+    def __init__(self, cues=CUES, enabled=True, max_pending=2):
+        self.cues = {}
+        for name in cues:
+            try:
+                self.cues[name] = load_cue(name, cues[name])
+            except (OSError, wave.Error) as e:
+                logging.error(f"Audio cue '{name}' could not be loaded: {e}")
+
+        self._backend = self._pick_backend() if enabled and self.cues else None
+        self._pending = queue.Queue(maxsize=max_pending)
+        self._worker = None
+        if self._backend is not None:
+            self._worker = threading.Thread(target=self._run, name="audio-cues", daemon=True)
+            self._worker.start()
+
+    @property
+    def silent(self):
+        return self._backend is None
+
+    def _pick_backend(self):
+        for factory in (_simpleaudio_backend, _sounddevice_backend):
+            try:
+                return factory()
+            except Exception:
+                continue
+        logging.error("Audio cues need simpleaudio or sounddevice (pip install simpleaudio); cues are silent")
+        return None
+
+    def _run(self):
+        while True:
+            cue = self._pending.get()
+            backend = self._backend
+            if backend is None:
+                continue
+            try:
+                backend(cue)
+            except Exception as e:
+                # No output device: stop trying for the rest of the process
+                logging.error(f"Audio playback failed, muting cues: {e}")
+                self._backend = None
+
+    def play(self, name):
+        # Non-blocking; drops the cue if the device is muted or already backed up
+        cue = self.cues.get(name)
+        if cue is None or self._backend is None:
+            return False
+        try:
+            self._pending.put_nowait(cue)
+        except queue.Full:
+            return False
+        return True
+
+
+_player = None
+_player_lock = threading.Lock()
+
+
+def get_player():
+    # One player per process, shared by every session and Streamlit rerun
+    global _player
+    with _player_lock:
+        if _player is None:
+            _player = AudioCuePlayer(enabled=os.environ.get("DADHICHI_AUDIO", "on") != "off")
+        return _player
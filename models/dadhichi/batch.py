@@ -0,0 +1,197 @@
+"""Offline pose analysis of recorded sessions.
+
+Grades every video in a directory with the same asana rules and rep
+engine the camera pages use and writes per-frame landmarks, joint angles,
+verdicts and rep counts of every exercise to one columnar file per video,
+named after the video with its extension kept (clip.mp4 -> clip.mp4.npz).
+Videos are sharded across a process pool with one MediaPipe Pose graph
+per worker.
+
+    python -m dadhichi.batch recordings/ --out results/ [--workers 4] [--format npz|parquet]
+
+Run from the models/ directory.
+"""
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+import numpy as np
+
+from dadhichi.asanas import TRACKS, TrackRules
+from dadhichi.pose_math import NUM_LANDMARKS, PoseFrame
+from dadhichi.reps import EXERCISES, RepEngine
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".webm")
+
+# Per-process state, created once by the pool initializer
+_worker = {}
+
+
+def _init_worker(model_complexity, min_detection_confidence, min_tracking_confidence):
+    from dadhichi.pose_pool import PosePool
+
+    # One OpenCV thread per worker, the pool itself provides the parallelism
+    cv2.setNumThreads(1)
+    _worker["pool"] = PosePool(max_idle=1)
+    _worker["config"] = (model_complexity, min_detection_confidence, min_tracking_confidence)
+
+
+def analyze_video(path, pose):
+    """Run one video through `pose` and the page logic; returns a dict of arrays."""
+    rules = [TrackRules(track) for track in TRACKS.values()]
+    asana_names = [f"{rule.track.name}/{asana.name}" for rule in rules for asana in rule.asanas]
+    # Train page angles are wrapped to [0, 180], Yoga rules use their own unwrapped frame
+    pose_frame = PoseFrame(distances=[])
+    rep_engine = RepEngine(EXERCISES.values())
+    rep_columns = np.array([pose_frame.joint_names.index(j) for j in rep_engine.joints], dtype=np.intp)
+    exercise_names = [ex.name for ex in rep_engine.exercises]
+
+    landmarks, angles, verdicts, detected, reps, timestamps = [], [], [], [], [], []
+    empty_points = np.full((NUM_LANDMARKS, 4), np.nan, dtype=np.float32)
+    empty_angles = np.full(len(pose_frame.joint_names), np.nan, dtype=np.float32)
+    no_verdicts = np.zeros(len(asana_names), dtype=bool)
+
+    cap = cv2.VideoCapture(path)
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            timestamps.append(cap.get(cv2.CAP_PROP_POS_MSEC))
+            image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            image.flags.writeable = False
+            results = pose.process(image)
+
+            if results.pose_landmarks is None:
+                landmarks.append(empty_points)
+                angles.append(empty_angles)
+                verdicts.append(no_verdicts)
+                detected.append(False)
+                reps.append([rep_engine.reps(name) for name in exercise_names])
+                continue
+
+            lms = results.pose_landmarks.landmark
+            pose_frame.update(lms)
+            landmarks.append(pose_frame.points.copy())
+            angles.append(pose_frame.angles.copy())
+            verdicts.append(np.concatenate([rule.evaluate(lms) for rule in rules]))
+            detected.append(True)
+            # Video time, so minimum rep durations hold however fast frames are decoded
+            rep_engine.update(pose_frame.angles[rep_columns], timestamps[-1] / 1000)
+            reps.append([rep_engine.reps(name) for name in exercise_names])
+    finally:
+        cap.release()
+
+    return {
+        "timestamp_ms": np.asarray(timestamps, dtype=np.float64),
+        "detected": np.asarray(detected, dtype=bool),
+        "landmarks": np.asarray(landmarks, dtype=np.float32).reshape(-1, NUM_LANDMARKS, 4),
+        "angles": np.asarray(angles, dtype=np.float32).reshape(-1, len(pose_frame.joint_names)),
+        "verdicts": np.asarray(verdicts, dtype=bool).reshape(-1, len(asana_names)),
+        "reps": np.asarray(reps, dtype=np.int32).reshape(-1, len(exercise_names)),
+        "joint_names": np.asarray(pose_frame.joint_names),
+        "asana_names": np.asarray(asana_names),
+        "exercise_names": np.asarray(exercise_names),
+    }
+
+
+def write_npz(result, out_path):
+    np.savez_compressed(out_path, **result)
+    return out_path
+
+
+def write_parquet(result, out_path):
+    import pandas as pd
+
+    columns = {
+        "timestamp_ms": result["timestamp_ms"],
+        "detected": result["detected"],
+    }
+    points = result["landmarks"]
+    for i in range(NUM_LANDMARKS):
+        for j, axis in enumerate("xyzv"):
+            columns[f"lm{i}_{axis}"] = points[:, i, j]
+    for j, name in enumerate(result["joint_names"]):
+        columns[f"angle_{name}"] = result["angles"][:, j]
+    for j, name in enumerate(result["asana_names"]):
+        columns[f"ok_{name}"] = result["verdicts"][:, j]
+    for j, name in enumerate(result["exercise_names"]):
+        columns[f"reps_{name}"] = result["reps"][:, j]
+    pd.DataFrame(columns).to_parquet(out_path)
+    return out_path
+
+
+WRITERS = {"npz": write_npz, "parquet": write_parquet}
+
+
+def _process_file(path, out_dir, fmt):
+    # Pool task: one video in, one columnar file out
+    start = time.perf_counter()
+    with _worker["pool"].checkout(*_worker["config"]) as pose:
+        result = analyze_video(path, pose)
+    # Keep the video's extension so clip.mp4 and clip.avi don't overwrite each other
+    out_path = WRITERS[fmt](result, os.path.join(out_dir, f"{os.path.basename(path)}.{fmt}"))
+    frames = len(result["detected"])
+    return {
+        "video": path,
+        "output": out_path,
+        "frames": frames,
+        "detected": int(result["detected"].sum()),
+        "reps": {str(name): int(result["reps"][-1, j]) if frames else 0
+                 for j, name in enumerate(result["exercise_names"])},
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def find_videos(video_dir):
+    paths = [os.path.join(video_dir, name) for name in sorted(os.listdir(video_dir))
+             if name.lower().endswith(VIDEO_EXTENSIONS)]
+    # Largest first so one long video doesn't end up alone at the tail
+    return sorted(paths, key=os.path.getsize, reverse=True)
+
+
+def analyze_directory(video_dir, out_dir, workers=None, fmt="npz", model_complexity=1,
+                      min_detection_confidence=0.5, min_tracking_confidence=0.5):
+    """Analyze every video in `video_dir` in parallel; returns one summary dict per video."""
+    os.makedirs(out_dir, exist_ok=True)
+    videos = find_videos(video_dir)
+    workers = min(workers or os.cpu_count() or 1, max(len(videos), 1))
+    summaries = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(model_complexity, min_detection_confidence,
+                                       min_tracking_confidence)) as executor:
+        futures = {executor.submit(_process_file, path, out_dir, fmt): path for path in videos}
+        for future in as_completed(futures):
+            try:
+                summaries.append(future.result())
+            except Exception as e:
+                logging.error(f"Failed to analyze {futures[future]}: {e}")
+    return summaries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline pose analysis of recorded videos")
+    parser.add_argument("video_dir")
+    parser.add_argument("--out", default="analysis")
+    parser.add_argument("--workers", type=int, default=None, help="defaults to the number of cores")
+    parser.add_argument("--format", choices=sorted(WRITERS), default="npz")
+    parser.add_argument("--model-complexity", type=int, default=1, choices=[0, 1, 2])
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    summaries = analyze_directory(args.video_dir, args.out, workers=args.workers, fmt=args.format,
+                                  model_complexity=args.model_complexity)
+    elapsed = time.perf_counter() - start
+    frames = sum(s["frames"] for s in summaries)
+    for s in sorted(summaries, key=lambda s: s["video"]):
+        reps = ", ".join(f"{n} {name}" for name, n in s["reps"].items() if n) or "no reps"
+        print(f"{s['video']}: {s['frames']} frames, {s['detected']} with pose, {reps} -> {s['output']}")
+    print(f"{len(summaries)} videos, {frames} frames in {elapsed:.1f}s "
+          f"({frames / elapsed if elapsed else 0:.1f} frames/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+import logging
+import os
+import threading
+import time
+import weakref
+
+import cv2
+import numpy as np
+
+# Default capture source: a device index, a video file path or "synthetic"
+DEFAULT_SOURCE = os.environ.get("DADHICHI_CAMERA", "0")
+
+
+class SyntheticCapture:
+    """VideoCapture stand-in that draws a stick figure swinging its arms.
+
+    Lets the camera loops, tests and benchmarks run without a webcam.
+    With `realtime` set, `read` paces itself to `fps` like a device would.
+    """
+
+    def __init__(self, width=640, height=480, fps=30.0, realtime=False, seed=0):
+        self.width, self.height, self.fps = width, height, fps
+        self.realtime = realtime
+        self.frame_index = 0
+        self._rng = np.random.default_rng(seed)
+        self._next_time = None
+        self._open = True
+
+    def isOpened(self):
+        return self._open
+
+    def render(self, i, image=None):
+        w, h = self.width, self.height
+        if image is None or image.shape != (h, w, 3):
+            image = np.empty((h, w, 3), dtype=np.uint8)
+        image[:] = self._rng.integers(60, 90, (h, w, 3), dtype=np.uint8)
+        cx, cy = w // 2, h // 2
+        swing = int(80 * np.sin(i / 10))
+        cv2.circle(image, (cx, cy - 120), 30, (200, 180, 160), -1)
+        cv2.line(image, (cx, cy - 90), (cx, cy + 60), (200, 180, 160), 12)
+        cv2.line(image, (cx, cy - 60), (cx - 90, cy - 60 + swing), (200, 180, 160), 10)
+        cv2.line(image, (cx, cy - 60), (cx + 90, cy - 60 - swing), (200, 180, 160), 10)
+        cv2.line(image, (cx, cy + 60), (cx - 50, cy + 180), (200, 180, 160), 12)
+        cv2.line(image, (cx, cy + 60), (cx + 50, cy + 180), (200, 180, 160), 12)
+        return image
+
+    def read(self, image=None):
+        if not self._open:
+            return False, None
+        if self.realtime:
+            now = time.monotonic()
+            if self._next_time is not None and now < self._next_time:
+                time.sleep(self._next_time - now)
+            self._next_time = max(now, self._next_time or now) + 1.0 / self.fps
+        image = self.render(self.frame_index, image)
+        self.frame_index += 1
+        return True, image
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            self.width = int(value)
+        elif prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            self.height = int(value)
+        elif prop == cv2.CAP_PROP_FPS:
+            self.fps = float(value)
+        else:
+            return False
+        return True
+
+    def get(self, prop):
+        return {cv2.CAP_PROP_FRAME_WIDTH: self.width, cv2.CAP_PROP_FRAME_HEIGHT: self.height,
+                cv2.CAP_PROP_FPS: self.fps}.get(prop, 0.0)
+
+    def release(self):
+        self._open = False
+
+
+class Camera:
+    """A capture source opened on first use and kept open across reruns.
+
+    Pages keep one Camera per user in `st.session_state` (see
+    `session_camera`), so rerunning the script or pressing Start again
+    reuses the open device instead of re-initialising the webcam. The
+    device is only opened by the first `read`, with the requested
+    resolution, FPS and fourcc (MJPEG by default, which spares the USB bus
+    and the driver a raw YUYV stream), and a background reaper releases
+    it once it has been idle for `idle_timeout` seconds.
+
+    `source` is a device index, a video file (looped with `loop`) or
+    "synthetic" for a SyntheticCapture.
+    """
+
+    def __init__(self, source=DEFAULT_SOURCE, width=None, height=None, fps=None, fourcc="MJPG",
+                 idle_timeout=30.0, loop=True, clock=time.monotonic):
+        self.source = int(source) if str(source).isdigit() else source
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.fourcc = fourcc
+        self.idle_timeout = idle_timeout
+        self.loop = loop
+        self.clock = clock
+
+        self.opens = 0
+        self.actual = {}        # negotiated width / height / fps / fourcc of the open device
+        self._cap = None
+        self._last_used = clock()
+        self._lock = threading.Lock()
+
+    @property
+    def config(self):
+        return (self.source, self.width, self.height, self.fps, self.fourcc)
+
+    def _open_capture(self):
+        if self.source == "synthetic":
+            return SyntheticCapture(self.width or 640, self.height or 480, self.fps or 30.0,
+                                    realtime=True)
+        cap = cv2.VideoCapture(self.source)
+        if isinstance(self.source, int):
+            # Fourcc first: many drivers only offer the larger modes in MJPEG
+            if self.fourcc:
+                cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc))
+            if self.width and self.height:
+                cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+                cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+            if self.fps:
+                cap.set(cv2.CAP_PROP_FPS, self.fps)
+        return cap
+
+    def open(self):
+        """Open the source if it isn't yet; returns whether it is open."""
+        if self._open():
+            return True
+        # A device is held by one capture at a time: free it from another page's idle camera
+        if isinstance(self.source, int) and _release_device(self) and self._open():
+            return True
+        logging.error(f"Unable to open camera source {self.source!r}")
+        return False
+
+    def _open(self):
+        with self._lock:
+            self._last_used = self.clock()
+            if self._cap is not None and self._cap.isOpened():
+                return True
+            self._cap = self._open_capture()
+            if not self._cap.isOpened():
+                self._cap = None
+                return False
+            self.opens += 1
+            fourcc = int(self._cap.get(cv2.CAP_PROP_FOURCC)) if not isinstance(self._cap, SyntheticCapture) else 0
+            self.actual = {
+                "width": int(self._cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                "height": int(self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                "fps": float(self._cap.get(cv2.CAP_PROP_FPS)),
+                "fourcc": "".join(chr((fourcc >> 8 * i) & 0xFF) for i in range(4)) if fourcc else None,
+            }
+        _watch(self)
+        return True
+
+    def isOpened(self):
+        # Lazy: asking opens the source, as VideoCapture(0).isOpened() used to
+        return self.open()
+
+    def read(self, image=None):
+        """Same contract as VideoCapture.read, opening the source on first use."""
+        if self._cap is None and not self.open():
+            return False, None
+        with self._lock:
+            self._last_used = self.clock()
+            cap = self._cap
+            if cap is None:
+                return False, None
+            ok, frame = cap.read(image)
+            if not ok and self.loop and isinstance(self.source, str):
+                # End of a file source: rewind
+                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ok, frame = cap.read(image)
+            return ok, frame
+
+    def release(self):
+        with self._lock:
+            if self._cap is not None:
+                self._cap.release()
+                self._cap = None
+
+    def release_if_idle(self):
+        with self._lock:
+            idle = self._cap is not None and self.clock() - self._last_used > self.idle_timeout
+        if idle:
+            logging.info(f"Releasing camera {self.source!r} after {self.idle_timeout:.0f}s idle")
+            self.release()
+        return idle
+
+
+# Open cameras, checked by one reaper thread for the whole process
+_cameras = weakref.WeakSet()
+_reaper = None
+_reaper_lock = threading.Lock()
+
+
+def _reap(interval):
+    while True:
+        time.sleep(interval)
+        for camera in list(_cameras):
+            if camera.release_if_idle():
+                _cameras.discard(camera)
+
+
+def _watch(camera, interval=5.0):
+    global _reaper
+    with _reaper_lock:
+        _cameras.add(camera)
+        if _reaper is None:
+            _reaper = threading.Thread(target=_reap, args=(interval,), name="camera-reaper", daemon=True)
+            _reaper.start()
+
+
+def _release_device(camera, idle=1.0):
+    # Release other cameras holding the same device that haven't read for `idle` seconds
+    released = False
+    for other in list(_cameras):
+        if other is not camera and other.source == camera.source and other._cap is not None \
+                and other.clock() - other._last_used > idle:
+            logging.info(f"Releasing camera {other.source!r} held at {other.width}x{other.height}")
+            other.release()
+            _cameras.discard(other)
+            released = True
+    return released
+
+
+def session_camera(state, key="camera", **settings):
+    """The Camera cached in `state` (st.session_state), replaced if `settings` changed.
+
+    Pages asking for different settings pass their own `key`, so switching
+    between them keeps each page's camera instead of reopening the device.
+    """
+    camera = state.get(key)
+    wanted = Camera(**settings)
+    if camera is None or camera.config != wanted.config:
+        if camera is not None:
+            camera.release()
+        state[key] = camera = wanted
+    camera.idle_timeout = wanted.idle_timeout
+    return camera
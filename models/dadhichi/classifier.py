@@ -0,0 +1,325 @@
+"""Learned asana classifier, an optional alternative to the threshold rules.
+
+Features are the batched joint angles scaled to [0, 1] plus point
+distances divided by torso length, standardized with the training mean
+and std. Two compact models are available: kNN over the (subsampled)
+training set and a softmax linear model. Either classifies a frame in a
+few tens of microseconds.
+
+Training data are landmark recordings (see dadhichi.recording). Frame
+labels come from a JSON file mapping each recording to an asana name, or
+to a list of [start_s, end_s, name] segments; recordings without labels
+fall back to the verdicts the rules gave live ("none" where no asana
+matched). Only recordings made with the track's asanas (the verdict names
+in their metadata) are used; the others are skipped.
+
+    python -m dadhichi.classifier train recordings/*.npy --track "Track 1" [--labels labels.json] [--model knn|linear]
+    python -m dadhichi.classifier evaluate recordings/*.npy --track "Track 1" --classifier classifiers/track-1.npz
+
+Run from the models/ directory.
+"""
+import argparse
+import copy
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from dadhichi.asanas import TRACKS, TrackRules
+from dadhichi.pose_math import DISTANCES, JOINTS, LEFT_HIP, LEFT_SHOULDER, RIGHT_HIP, RIGHT_SHOULDER, PoseFrame
+from dadhichi.recording import load_recording
+
+# Where the Yoga page looks for a trained model per track
+CLASSIFIERS_DIR = "classifiers"
+NONE = "none"
+
+
+def classifier_path(track_name, directory=CLASSIFIERS_DIR):
+    return os.path.join(directory, track_name.lower().replace(" ", "-") + ".npz")
+
+
+class PoseFeatures:
+    # Landmark array -> raw (unstandardized) feature vector, into a reused buffer
+
+    def __init__(self):
+        self.frame = PoseFrame(joints=list(JOINTS), distances=list(DISTANCES))
+        self.names = self.frame.joint_names + self.frame.distance_names
+        self.values = np.empty(len(self.names), dtype=np.float32)
+        self._n_angles = len(self.frame.joint_names)
+
+    def __call__(self, points):
+        frame = self.frame
+        frame.points[:] = points
+        frame.compute()
+        p = frame.points
+        shoulders = (p[LEFT_SHOULDER, :2] + p[RIGHT_SHOULDER, :2]) / 2
+        hips = (p[LEFT_HIP, :2] + p[RIGHT_HIP, :2]) / 2
+        torso = max(float(np.hypot(*(shoulders - hips))), 1e-3)
+        np.multiply(frame.angles, 1 / 180, out=self.values[:self._n_angles])
+        np.multiply(frame.distances, 1 / torso, out=self.values[self._n_angles:])
+        return self.values
+
+
+class PoseClassifier:
+    """kNN or linear asana classifier over standardized PoseFeatures.
+
+    `predict(points)` returns a label; `verdicts(points, asanas)` returns one
+    bool per asana, the same shape TrackRules.evaluate gives, so the Yoga
+    loop can use either.
+    """
+
+    def __init__(self, kind, labels, mean, std, index=None, targets=None, weights=None, bias=None, k=5):
+        self.kind = kind
+        self.labels = list(labels)
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.scale = 1 / np.asarray(std, dtype=np.float32)
+        self.index = None if index is None else np.ascontiguousarray(index, dtype=np.float32)
+        self.targets = None if targets is None else np.asarray(targets, dtype=np.intp)
+        self.weights = None if weights is None else np.ascontiguousarray(weights, dtype=np.float32)
+        self.bias = None if bias is None else np.asarray(bias, dtype=np.float32)
+        self.k = k
+        self.features = PoseFeatures()
+        self._x = np.empty(len(self.mean), dtype=np.float32)
+        if self.index is not None:
+            self._norms = np.einsum("ij,ij->i", self.index, self.index)
+            self._dist = np.empty(len(self.index), dtype=np.float32)
+            self._votes = np.empty(len(self.labels), dtype=np.float32)
+
+    def fork(self):
+        # Same model arrays, its own scratch buffers: one per session / thread
+        clone = copy.copy(self)
+        clone.features = PoseFeatures()
+        clone._x = np.empty_like(self._x)
+        if self.index is not None:
+            clone._dist = np.empty_like(self._dist)
+            clone._votes = np.empty_like(self._votes)
+        return clone
+
+    def standardize(self, raw):
+        np.subtract(raw, self.mean, out=self._x)
+        return np.multiply(self._x, self.scale, out=self._x)
+
+    def predict_index(self, x):
+        if self.kind == "linear":
+            return int(np.argmax(self.weights @ x + self.bias))
+        # |a - x|^2 = |a|^2 - 2 a.x (+ |x|^2, the same for every row)
+        np.dot(self.index, x, out=self._dist)
+        np.multiply(self._dist, -2, out=self._dist)
+        np.add(self._dist, self._norms, out=self._dist)
+        k = min(self.k, len(self._dist))
+        nearest = np.argpartition(self._dist, k - 1)[:k]
+        self._votes[:] = 0
+        np.add.at(self._votes, self.targets[nearest], 1)
+        return int(np.argmax(self._votes))
+
+    def predict(self, points):
+        return self.labels[self.predict_index(self.standardize(self.features(points)))]
+
+    def verdicts(self, points, asanas):
+        label = self.predict(points)
+        return np.array([asana.name == label for asana in asanas], dtype=bool)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        arrays = {"kind": self.kind, "labels": np.asarray(self.labels), "mean": self.mean,
+                  "std": 1 / self.scale, "k": self.k}
+        if self.kind == "knn":
+            arrays.update(index=self.index, targets=self.targets)
+        else:
+            arrays.update(weights=self.weights, bias=self.bias)
+        np.savez(path, **arrays)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        optional = {name: data[name] for name in ("index", "targets", "weights", "bias") if name in data}
+        return cls(str(data["kind"]), [str(label) for label in data["labels"]], data["mean"], data["std"],
+                   k=int(data["k"]), **optional)
+
+
+_classifiers = {}
+_classifiers_lock = threading.Lock()
+
+
+def load_classifier(track_name):
+    # Trained classifier for the track, or None if there isn't one. The npz is read once
+    # per process and again only when retraining rewrites it; every caller gets a fork.
+    path = classifier_path(track_name)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    with _classifiers_lock:
+        cached = _classifiers.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = _classifiers[path] = (mtime, PoseClassifier.load(path))
+    return cached[1].fork()
+
+
+def frame_labels(recording, spec):
+    """One label per frame from a labels.json entry, or from the live rule verdicts."""
+    n = len(recording["detected"])
+    if isinstance(spec, str):
+        return np.full(n, spec, dtype=object)
+    labels = np.full(n, NONE, dtype=object)
+    if spec:
+        seconds = recording["timestamp_ms"] / 1000
+        for start, end, name in spec:
+            labels[(seconds >= start) & (seconds < end)] = name
+        return labels
+    names = recording["verdict_names"]
+    verdicts = recording["verdicts"]
+    matched = verdicts.any(axis=1)
+    labels[matched] = [names[i] for i in verdicts[matched].argmax(axis=1)]
+    return labels
+
+
+def track_recordings(paths, track_name, labels_spec=None):
+    """(recording, frame labels) for each recording made with the track's asanas.
+
+    Recordings whose verdict names differ from the track's are skipped, and
+    labels naming an asana outside the track raise a ValueError.
+    """
+    names = [asana.name for asana in TRACKS[track_name].asanas]
+    for path in paths:
+        recording = load_recording(path)
+        if list(recording["verdict_names"]) != names:
+            logging.error(f"Skipping {path}: its verdicts are not the asanas of {track_name}")
+            continue
+        labels = frame_labels(recording, (labels_spec or {}).get(os.path.basename(path)))
+        unknown = set(labels.tolist()) - set(names) - {NONE}
+        if unknown:
+            raise ValueError(f"{path} is labelled {', '.join(sorted(unknown))}, not in {track_name}")
+        yield recording, labels
+
+
+def build_dataset(paths, track_name, labels_spec=None):
+    """Raw features, labels and recording ids for every frame with a pose."""
+    features = PoseFeatures()
+    X, y, groups = [], [], []
+    for group, (recording, labels) in enumerate(track_recordings(paths, track_name, labels_spec)):
+        for i in np.flatnonzero(recording["detected"]):
+            X.append(features(recording["landmarks"][i]).copy())
+            y.append(labels[i])
+            groups.append(group)
+    return np.asarray(X, dtype=np.float32).reshape(-1, len(features.names)), np.asarray(y), np.asarray(groups)
+
+
+def train(X, y, kind="knn", k=5, max_per_class=500, epochs=300, lr=0.5, l2=1e-3, seed=0):
+    labels = sorted(set(y.tolist()))
+    targets = np.searchsorted(labels, y)
+    mean = X.mean(axis=0)
+    std = X.std(axis=0) + 1e-6
+    Z = (X - mean) / std
+
+    if kind == "knn":
+        # Cap each class so the index stays small and no class dominates the votes
+        rng = np.random.default_rng(seed)
+        keep = np.concatenate([rng.permutation(np.flatnonzero(targets == c))[:max_per_class]
+                               for c in range(len(labels))])
+        return PoseClassifier("knn", labels, mean, std, index=Z[keep], targets=targets[keep], k=k)
+
+    # Softmax regression, full-batch gradient descent
+    W = np.zeros((len(labels), Z.shape[1]), dtype=np.float32)
+    b = np.zeros(len(labels), dtype=np.float32)
+    onehot = np.eye(len(labels), dtype=np.float32)[targets]
+    for _ in range(epochs):
+        logits = Z @ W.T + b
+        logits -= logits.max(axis=1, keepdims=True)
+        p = np.exp(logits)
+        p /= p.sum(axis=1, keepdims=True)
+        grad = (p - onehot) / len(Z)
+        W -= lr * (grad.T @ Z + l2 * W)
+        b -= lr * grad.sum(axis=0)
+    return PoseClassifier("linear", labels, mean, std, weights=W, bias=b)
+
+
+def split(groups, test_fraction=0.2, seed=0):
+    # Hold out whole recordings when there are several, else a random share of frames
+    rng = np.random.default_rng(seed)
+    unique = np.unique(groups)
+    if len(unique) > 1:
+        held = rng.permutation(unique)[:max(1, int(round(len(unique) * test_fraction)))]
+        test = np.isin(groups, held)
+    else:
+        test = rng.random(len(groups)) < test_fraction
+    return ~test, test
+
+
+def evaluate(classifier, paths, track_name, labels_spec=None):
+    """Accuracy and per-frame latency of the classifier next to the track's rules."""
+    rules = TrackRules(TRACKS[track_name])
+    names = [asana.name for asana in rules.asanas]
+    correct = agree = frames = 0
+    classifier_time = rules_time = 0.0
+    for recording, labels in track_recordings(paths, track_name, labels_spec):
+        for i in np.flatnonzero(recording["detected"]):
+            points = recording["landmarks"][i]
+            start = time.perf_counter()
+            predicted = classifier.predict(points)
+            classifier_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            rules.pose_frame.points[:] = points
+            rules.pose_frame.compute()
+            verdicts = rules.check(rules.pose_frame.features)
+            rules_time += time.perf_counter() - start
+            rule_label = names[int(verdicts.argmax())] if verdicts.any() else NONE
+
+            frames += 1
+            correct += predicted == labels[i]
+            agree += predicted == rule_label
+    return {
+        "frames": frames,
+        "accuracy": correct / frames if frames else 0.0,
+        "agreement_with_rules": agree / frames if frames else 0.0,
+        "classifier_us_per_frame": classifier_time / frames * 1e6 if frames else 0.0,
+        "rules_us_per_frame": rules_time / frames * 1e6 if frames else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train / evaluate the learned asana classifier")
+    parser.add_argument("command", choices=["train", "evaluate"])
+    parser.add_argument("recordings", nargs="+")
+    parser.add_argument("--track", required=True, choices=sorted(TRACKS))
+    parser.add_argument("--labels", help="JSON: recording file name -> asana name or [[start_s, end_s, name], ...]")
+    parser.add_argument("--model", choices=["knn", "linear"], default="knn")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--classifier", help="model file (default: classifiers/<track>.npz)")
+    args = parser.parse_args(argv)
+
+    labels_spec = None
+    if args.labels:
+        with open(args.labels) as f:
+            labels_spec = json.load(f)
+    path = args.classifier or classifier_path(args.track)
+
+    if args.command == "train":
+        X, y, groups = build_dataset(args.recordings, args.track, labels_spec)
+        if not len(X):
+            parser.error(f"no frames with a pose in recordings of {args.track}")
+        fit, held = split(groups)
+        classifier = train(X[fit], y[fit], kind=args.model, k=args.k)
+        if held.any():
+            predicted = np.array([classifier.labels[classifier.predict_index(classifier.standardize(x).copy())]
+                                  for x in X[held]])
+            print(f"held-out accuracy: {np.mean(predicted == y[held]):.3f} on {int(held.sum())} frames")
+        # Final model uses every frame
+        classifier = train(X, y, kind=args.model, k=args.k)
+        print(f"{args.model} classifier over {len(X)} frames, classes: {', '.join(classifier.labels)}")
+        print(f"saved to {classifier.save(path)}")
+    else:
+        result = evaluate(PoseClassifier.load(path), args.recordings, args.track, labels_spec)
+        print(f"{result['frames']} frames: accuracy {result['accuracy']:.3f}, "
+              f"agreement with rules {result['agreement_with_rules']:.3f}")
+        print(f"per frame: classifier {result['classifier_us_per_frame']:.1f} us, "
+              f"rules {result['rules_us_per_frame']:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
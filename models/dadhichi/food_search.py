@@ -0,0 +1,174 @@
+import bisect
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+
+# Common USDA short-description abbreviations -> words people type
+ABBREVIATIONS = {
+    "W": "WITH", "WO": "WITHOUT", "CKD": "COOKED", "UNCKD": "UNCOOKED", "RTD": "READY", "RTE": "READY",
+    "FRZ": "FROZEN", "CND": "CANNED", "DRND": "DRAINED", "PREP": "PREPARED", "UNPREP": "UNPREPARED",
+    "BNLESS": "BONELESS", "SKNLESS": "SKINLESS", "SWTND": "SWEETENED", "UNSWTND": "UNSWEETENED",
+    "CHS": "CHEESE", "BF": "BEEF", "CHICK": "CHICKEN", "VEG": "VEGETABLE", "VEGS": "VEGETABLES",
+    "LN": "LEAN", "RST": "ROASTED", "RSTD": "ROASTED", "BRLD": "BROILED", "BKD": "BAKED", "FRD": "FRIED",
+    "BLD": "BOILED", "STMD": "STEAMED", "SMKD": "SMOKED", "DEHYD": "DEHYDRATED", "CONC": "CONCENTRATE",
+    "ENR": "ENRICHED", "UNENR": "UNENRICHED", "FORT": "FORTIFIED", "SLICD": "SLICED", "CHOPD": "CHOPPED",
+    "WHL": "WHOLE", "NFS": "UNSPECIFIED", "LOFAT": "LOWFAT", "FAT-FREE": "FATFREE", "SAL": "SALT",
+    "SOD": "SODIUM", "LO": "LOW", "RED": "REDUCED", "REG": "REGULAR", "COMM": "COMMERCIAL",
+    "MIX": "MIXED", "PDR": "POWDER", "JUC": "JUICE", "CRM": "CREAM", "PNUT": "PEANUT", "SNDWCH": "SANDWICH",
+    "GRD": "GROUND", "GRLD": "GRILLED", "APPL": "APPLE", "SKN": "SKIN", "BTTRMLK": "BUTTERMILK",
+    "UNSPEC": "UNSPECIFIED", "SPRD": "SPREAD", "STK": "STICK", "LT": "LIGHT", "BTLD": "BOTTLED",
+}
+
+_TOKEN = re.compile(r"[A-Z0-9]+(?:-[A-Z0-9]+)*")
+_WITHOUT = re.compile(r"\bW/O\b")
+
+
+def words(text):
+    return _TOKEN.findall(_WITHOUT.sub("WITHOUT", text.upper()))
+
+
+def tokenize(text):
+    """Upper-cased word tokens with USDA abbreviations expanded next to the original."""
+    tokens = []
+    for token in words(text):
+        tokens.append(token)
+        full = ABBREVIATIONS.get(token)
+        if full is not None:
+            tokens.append(full)
+    return tokens
+
+
+def trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FoodSearchIndex:
+    """Ranked top-k search over food descriptions, built once per process.
+
+    Every description is split into tokens (abbreviations such as CKD or
+    W/ are indexed under both spellings) and each distinct token gets a
+    posting array of the foods that contain it. A query token matches
+    every vocabulary token it is a prefix of, found by bisecting the
+    sorted vocabulary, so results update while the user is still typing;
+    a token with no prefix match falls back to vocabulary tokens that
+    share enough trigrams with it, which absorbs typos. Every query token
+    must match. A food scores the IDF of each query token times how close
+    its best match is (whole word over completion, over a fuzzy match),
+    plus a bonus when its leading word matches the first query token -
+    USDA puts the food itself first, "BUTTER,WITH SALT" - and the top k
+    come out of one argpartition.
+    """
+
+    def __init__(self, descriptions, fuzzy_threshold=0.45, first_token_bonus=1.0):
+        self.descriptions = list(descriptions)
+        self.fuzzy_threshold = fuzzy_threshold
+        self.first_token_bonus = first_token_bonus
+
+        postings = defaultdict(set)
+        first = []
+        for doc, text in enumerate(self.descriptions):
+            tokens = tokenize(text) or [""]
+            # Leading word, and its expansion if it is an abbreviation ("CHICK,BROILERS...")
+            alias = tokens[1] if len(tokens) > 1 and tokens[1] == ABBREVIATIONS.get(tokens[0]) else tokens[0]
+            first.append((tokens[0], alias))
+            for token in tokens:
+                postings[token].add(doc)
+
+        self.vocabulary = sorted(postings)
+        term_id = {term: i for i, term in enumerate(self.vocabulary)}
+        self.postings = [np.fromiter(sorted(postings[t]), dtype=np.int32) for t in self.vocabulary]
+
+        self._first = np.array([[term_id[t] for t in pair] for pair in first], dtype=np.intp).reshape(-1, 2)
+        self._lengths = np.array([len(text) for text in self.descriptions], dtype=np.float32)
+
+        grams = defaultdict(list)
+        for i, term in enumerate(self.vocabulary):
+            for gram in trigrams(term):
+                grams[gram].append(i)
+        self._grams = {gram: np.array(ids, dtype=np.int32) for gram, ids in grams.items()}
+        self._gram_counts = np.array([len(trigrams(t)) for t in self.vocabulary], dtype=np.float32)
+        self._term_lengths = np.array([len(t) for t in self.vocabulary], dtype=np.float32)
+
+    def _prefix_terms(self, token):
+        # Completions of a partly typed word, an exact word weighing most
+        lo = bisect.bisect_left(self.vocabulary, token)
+        hi = bisect.bisect_left(self.vocabulary, token + "￿")
+        return np.arange(lo, hi), len(token) / self._term_lengths[lo:hi]
+
+    def _fuzzy_terms(self, token):
+        grams = [self._grams[g] for g in trigrams(token) if g in self._grams]
+        if not grams:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+        overlap = np.bincount(np.concatenate(grams), minlength=len(self.vocabulary)).astype(np.float32)
+        similarity = overlap / (len(trigrams(token)) + self._gram_counts - overlap)
+        terms = np.flatnonzero(similarity >= self.fuzzy_threshold)
+        return terms, similarity[terms]
+
+    def search(self, query, k=20):
+        """Up to `k` descriptions best matching `query`, best first.
+
+        Safe to call from several sessions at once: the index is read-only
+        and the score arrays (a few tens of KB) are allocated per call.
+        """
+        tokens = list(dict.fromkeys(words(query)))
+        if not tokens:
+            return []
+        scores = np.zeros(len(self.descriptions), dtype=np.float32)
+        first_weight = np.zeros(len(self.vocabulary), dtype=np.float32)
+        matched_all = None
+        for position, token in enumerate(tokens):
+            terms, weights = self._prefix_terms(token)
+            full = ABBREVIATIONS.get(token)
+            if full is not None:
+                extra, extra_weights = self._prefix_terms(full)
+                terms, weights = np.concatenate([terms, extra]), np.concatenate([weights, extra_weights])
+            if not len(terms):
+                terms, weights = self._fuzzy_terms(token)
+            if not len(terms):
+                return []
+            if position == 0:
+                np.maximum.at(first_weight, terms, weights)
+
+            # Best match per food for this query token, weighted by the token's IDF
+            token_scores = np.zeros(len(self.descriptions), dtype=np.float32)
+            postings = [self.postings[term] for term in terms.tolist()]
+            np.maximum.at(token_scores, np.concatenate(postings), np.repeat(weights, [len(p) for p in postings]))
+            hit = token_scores > 0
+            token_scores *= np.log(1 + len(hit) / max(int(np.count_nonzero(hit)), 1))
+            matched_all = hit if matched_all is None else matched_all & hit
+            scores += token_scores
+
+        candidates = np.flatnonzero(matched_all)
+        if not len(candidates):
+            return []
+        ranked = scores[candidates]
+        if self.first_token_bonus:
+            ranked += self.first_token_bonus * first_weight[self._first[candidates]].max(axis=1)
+        # Shorter descriptions first among equals: "BUTTER,WITH SALT" before "BUTTER,WHIPPED,W/ SALT"
+        ranked -= 1e-5 * self._lengths[candidates]
+        k = min(k, len(candidates))
+        top = np.argpartition(-ranked, k - 1)[:k]
+        top = top[np.argsort(-ranked[top], kind="stable")]
+        return [self.descriptions[d] for d in candidates[top].tolist()]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_search_index():
+    # Built once per process over the shared nutrient store
+    global _index
+    with _index_lock:
+        if _index is None:
+            from dadhichi.nutrition import get_store
+
+            start = time.perf_counter()
+            _index = FoodSearchIndex(get_store().descriptions)
+            logging.info(f"Indexed {len(_index.descriptions)} foods in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return _index
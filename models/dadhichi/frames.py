@@ -0,0 +1,151 @@
+import logging
+import threading
+
+import cv2
+import numpy as np
+
+
+class _Pool:
+    __slots__ = ("free", "held", "limit")
+
+    def __init__(self, limit):
+        self.free = []      # arrays nobody holds
+        self.held = 0       # arrays handed out and not released yet
+        self.limit = limit  # held count at which `read` waits for a release, None to never wait
+
+
+class FrameBuffers:
+    """Preallocated frame storage for a camera loop.
+
+    Every frame the loop touches comes from a small pool of arrays reused
+    for the whole session: `read` decodes straight into a free capture
+    slot (resizing exactly once, up front, when the camera can't deliver
+    `size` itself) and `to_rgb` converts into a free RGB slot and marks it
+    read-only for MediaPipe. OpenCV writes through `dst=` so a long
+    session reuses the same few arrays instead of allocating several full
+    frames per iteration.
+
+    A handed-out frame belongs to the caller until `release(frame)`; only
+    then can it be handed out again, so a frame still queued, in
+    inference or on screen is never overwritten. A FramePipeline built
+    with `release=buffers.release` does this for every frame it reads.
+    `ring` is the most capture frames out at once: with a FramePipeline
+    that is the one being captured, one queued, one in inference, one
+    queued for display and one on screen, plus a spare. When all are out
+    `read` waits up to `wait` seconds for a release, then allocates
+    another frame rather than reuse a held one (counted in `overflows`).
+    """
+
+    def __init__(self, size=None, ring=6, wait=1.0):
+        self.size = size                  # (width, height) or None for the camera's own size
+        self.ring = ring
+        self.wait = wait
+        self.allocations = 0
+        self.resized = 0
+        self.overflows = 0
+        self._raw = None                  # decode target when a resize follows; consumed at once
+        self._frames = _Pool(ring)
+        self._rgb = _Pool(None)
+        self._held = {}                   # id(array) -> (array, pool it goes back to)
+        self._cond = threading.Condition()
+        self._resizing = False
+
+    def _take(self, pool, wait=0.0):
+        # A free array from `pool` (None if it has none yet), reserved for the caller
+        with self._cond:
+            if not pool.free and pool.limit is not None and pool.held >= pool.limit and wait:
+                if not self._cond.wait_for(lambda: pool.free or pool.held < pool.limit, wait):
+                    self.overflows += 1
+                    logging.error(f"No frame released in {wait:.1f}s with {pool.held} held; allocating another")
+            pool.held += 1
+            return pool.free.pop() if pool.free else None
+
+    def _hold(self, pool, array, spare=None):
+        # Hand `array` out against the reservation `_take` made; `spare` goes back unused
+        with self._cond:
+            self._held[id(array)] = (array, pool)
+            if spare is not None and spare is not array and spare.shape == array.shape:
+                pool.free.append(spare)
+        array.flags.writeable = True
+        return array
+
+    def _cancel(self, pool, spare):
+        with self._cond:
+            pool.held -= 1
+            if spare is not None:
+                pool.free.append(spare)
+            self._cond.notify_all()
+
+    def _fill(self, slot, shape):
+        if slot is None or slot.shape != shape:
+            slot = np.empty(shape, dtype=np.uint8)
+            self.allocations += 1
+        slot.flags.writeable = True
+        return slot
+
+    def release(self, frame):
+        """Hand back a frame from `read`, `fit` or `to_rgb`; anything else is ignored."""
+        if frame is None:
+            return
+        with self._cond:
+            entry = self._held.pop(id(frame), None)
+            if entry is None:
+                return
+            array, pool = entry
+            pool.held -= 1
+            pool.free.append(array)
+            self._cond.notify_all()
+
+    def read(self, cap):
+        """`cap.read()` into a free slot; returns (ok, frame) like VideoCapture."""
+        slot = self._take(self._frames, self.wait)
+        resizing = self.size is not None and self._resizing
+        # When a resize follows, the decoded frame is consumed at once and one raw buffer is enough
+        target = self._raw if resizing else slot
+        if target is not None:
+            target.flags.writeable = True
+        ok, raw = cap.read(target)
+        if not ok or raw is None:
+            self._cancel(self._frames, slot)
+            return False, None
+        if raw is not target:
+            self.allocations += 1
+        self._resizing = self.size is not None and raw.shape[1::-1] != tuple(self.size)
+        if not self._resizing:
+            if resizing:
+                # Camera switched to the target size: the raw buffer becomes a pooled frame
+                self._raw = None
+            return True, self._hold(self._frames, raw, spare=slot)
+        if resizing:
+            self._raw = raw
+        else:
+            # First frame at another size: keep it as the raw buffer, the slot gets the resize
+            self._raw, slot = raw, (slot if slot is not raw else None)
+        self.resized += 1
+        frame = self._fill(slot, (self.size[1], self.size[0]) + raw.shape[2:])
+        cv2.resize(raw, tuple(self.size), dst=frame, interpolation=cv2.INTER_AREA)
+        return True, self._hold(self._frames, frame)
+
+    def fit(self, frame):
+        # Resize a frame from another source (e.g. WebRTC) once into a pooled slot
+        if self.size is None or frame.shape[1::-1] == tuple(self.size):
+            return frame
+        self.resized += 1
+        dst = self._fill(self._take(self._frames), (self.size[1], self.size[0]) + frame.shape[2:])
+        cv2.resize(frame, tuple(self.size), dst=dst, interpolation=cv2.INTER_AREA)
+        return self._hold(self._frames, dst)
+
+    def to_rgb(self, frame):
+        """BGR -> RGB into a reused buffer, read-only so MediaPipe can skip its copy."""
+        rgb = self._fill(self._take(self._rgb), frame.shape)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb)
+        self._hold(self._rgb, rgb)
+        rgb.flags.writeable = False
+        return rgb
+
+    def stats(self):
+        with self._cond:
+            arrays = ([self._raw] + self._frames.free + self._rgb.free
+                      + [array for array, _ in self._held.values()])
+            return {"allocations": self.allocations, "resized": self.resized, "overflows": self.overflows,
+                    "held": len(self._held), "bytes": sum(b.nbytes for b in arrays if b is not None)}
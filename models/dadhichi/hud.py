@@ -0,0 +1,111 @@
+import cv2
+import numpy as np
+
+from dadhichi.pose_math import NUM_LANDMARKS, POSE_CONNECTIONS
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+
+class Layer:
+    """A static piece of HUD rendered once: pixels plus a mask at a fixed position.
+
+    Rectangles and text are drawn into the layer at construction time;
+    `apply` then stamps the whole thing onto a frame with one masked copy
+    instead of re-rasterizing every primitive on every frame.
+    """
+
+    def __init__(self, size, origin=(0, 0)):
+        w, h = size
+        self.origin = origin
+        self.pixels = np.zeros((h, w, 3), dtype=np.uint8)
+        self.mask = np.zeros((h, w), dtype=np.uint8)
+
+    def rect(self, pt1, pt2, color, thickness=-1):
+        cv2.rectangle(self.pixels, pt1, pt2, color, thickness)
+        cv2.rectangle(self.mask, pt1, pt2, 255, thickness)
+        return self
+
+    def text(self, text, org, color, scale=0.5, thickness=1):
+        cv2.putText(self.pixels, text, org, FONT, scale, color, thickness, cv2.LINE_AA)
+        cv2.putText(self.mask, text, org, FONT, scale, 255, thickness, cv2.LINE_AA)
+        return self
+
+    def apply(self, image):
+        x, y = self.origin
+        roi = image[max(y, 0):y + self.pixels.shape[0], max(x, 0):x + self.pixels.shape[1]]
+        h, w = roi.shape[:2]
+        dy, dx = max(-y, 0), max(-x, 0)
+        # Masked copy straight into the frame's ROI (any non-zero mask pixel counts as covered)
+        cv2.copyTo(self.pixels[dy:dy + h, dx:dx + w], self.mask[dy:dy + h, dx:dx + w], roi)
+        return image
+
+
+class LabelCache:
+    """Text labels rasterized once per (text, style) and stamped as layers.
+
+    Camera loops redraw a small vocabulary of strings ("asana: Correct",
+    "TIME: 3s", rep counts), so each one is rendered a single time. The
+    cache keeps the `maxsize` most recently built labels.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._layers = {}
+
+    def layer(self, text, color, scale=1.0, thickness=2):
+        key = (text, color, scale, thickness)
+        layer = self._layers.get(key)
+        if layer is None:
+            (w, h), baseline = cv2.getTextSize(text, FONT, scale, thickness)
+            pad = thickness + 1
+            layer = Layer((w + 2 * pad, h + baseline + 2 * pad)).text(text, (pad, h + pad), color, scale, thickness)
+            layer.anchor = (-pad, -(h + pad))
+            if len(self._layers) >= self.maxsize:
+                self._layers.pop(next(iter(self._layers)))
+            self._layers[key] = layer
+        return layer
+
+    def draw(self, image, text, org, color, scale=1.0, thickness=2):
+        # Same arguments as cv2.putText: `org` is the bottom-left of the text
+        layer = self.layer(text, color, scale, thickness)
+        layer.origin = (org[0] + layer.anchor[0], org[1] + layer.anchor[1])
+        return layer.apply(image)
+
+
+class SkeletonRenderer:
+    """Draws the pose skeleton straight from a (33, 4) landmark array.
+
+    Replaces `mp_drawing.draw_landmarks` on the hot path: no DrawingSpec
+    objects per frame, one vectorized projection to pixels into a reused
+    buffer, all bones in one `cv2.polylines` call and all joints in a
+    second one (zero-length segments with round caps are dots). Like
+    MediaPipe, landmarks below `min_visibility` or outside the frame are
+    skipped together with their bones.
+    """
+
+    def __init__(self, line_color=(0, 255, 0), point_color=(255, 0, 0), thickness=2, radius=2,
+                 connections=POSE_CONNECTIONS, min_visibility=0.5):
+        self.line_color = line_color
+        self.point_color = point_color
+        self.thickness = thickness
+        self.radius = radius
+        self.min_visibility = min_visibility
+        self._pairs = np.asarray(connections, dtype=np.intp)
+        self._scaled = np.empty((NUM_LANDMARKS, 2), dtype=np.float32)
+        self._pixels = np.empty((NUM_LANDMARKS, 2), dtype=np.int32)
+        self._dots = np.empty((NUM_LANDMARKS, 2, 2), dtype=np.int32)
+
+    def draw(self, image, points):
+        h, w = image.shape[:2]
+        xy = points[:, :2]
+        shown = ((points[:, 3] >= self.min_visibility) & (xy >= 0).all(axis=1) & (xy <= 1).all(axis=1))
+        np.multiply(xy, (w, h), out=self._scaled)
+        np.copyto(self._pixels, self._scaled, casting="unsafe")
+
+        bones = self._pairs[shown[self._pairs[:, 0]] & shown[self._pairs[:, 1]]]
+        if len(bones):
+            cv2.polylines(image, self._pixels[bones], False, self.line_color, self.thickness)
+        self._dots[:, 0] = self._pixels
+        self._dots[:, 1] = self._pixels
+        cv2.polylines(image, self._dots[shown], False, self.point_color, 2 * self.radius + self.thickness)
+        return image
@@ -0,0 +1,416 @@
+import itertools
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from dadhichi.adaptive import PoseResult, fill_landmark_list, new_landmark_list
+from dadhichi.pose_math import NUM_LANDMARKS
+from dadhichi.pose_pool import DEFAULT_CONFIG, PosePool, _make_pose
+
+# Largest frame a session may submit; each slot is one shared-memory block of this size
+MAX_FRAME_SHAPE = (720, 1280, 3)
+
+
+def _attach(name):
+    # Spawned workers share the server's resource tracker, which already holds this
+    # block; unregistering here would drop the server's entry before it unlinks
+    return shared_memory.SharedMemory(name=name)
+
+
+def _worker_main(index, tasks, results, config):
+    # Inference worker process: one Pose graph, frames arrive through shared memory.
+    # Each frame's block is attached only for that task, so a session's slots are
+    # unmapped everywhere as soon as it disconnects.
+    pose = _make_pose(*config)
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        ticket, session_id, seq, name, shape = task
+        try:
+            shm = _attach(name)
+            try:
+                image = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+                out = pose.process(image)
+                del image
+            finally:
+                shm.close()
+            points = None
+            if out.pose_landmarks is not None:
+                points = np.array([(lm.x, lm.y, lm.z, lm.visibility) for lm in out.pose_landmarks.landmark],
+                                  dtype=np.float32)
+            results.put((index, ticket, points, None))
+        except Exception as e:
+            results.put((index, ticket, None, repr(e)))
+    pose.close()
+
+
+class _Worker:
+    __slots__ = ("index", "process", "tasks", "task")
+
+    def __init__(self, index, process, tasks):
+        self.index = index
+        self.process = process
+        self.tasks = tasks            # this worker's own queue, so the service knows who holds what
+        self.task = None              # (ticket, session id, seq, slot name, shape) being processed
+
+
+class _Session:
+    __slots__ = ("id", "slots", "pending", "in_flight", "writing", "latest", "dropped", "submitted", "done")
+
+    def __init__(self, session_id, slots):
+        self.id = session_id
+        self.slots = slots            # shared-memory blocks owned by this session
+        self.pending = None           # (seq, slot name, shape) waiting for a worker
+        self.in_flight = None         # slot name currently being read by a worker
+        self.writing = None           # slot name the client is copying a frame into
+        self.latest = None            # (seq, points) of the newest result
+        self.dropped = 0
+        self.submitted = 0
+        self.done = threading.Condition()
+
+
+class InferenceService:
+    """Shared MediaPipe Pose workers serving every camera session in the process.
+
+    `workers` processes (default: one per core) each hold one Pose graph,
+    so capacity scales with cores rather than with script threads fighting
+    over the GIL. Sessions write frames into their own shared-memory slots
+    and only (session, slot) references cross the process boundary; the
+    landmarks come back as a small (33, 4) array.
+
+    Every session has at most one frame waiting: a newer frame replaces
+    it and counts as dropped, so overload costs frames, not latency. A
+    dispatcher thread hands waiting frames to free workers round-robin
+    across sessions, so one fast camera can't starve the others. A worker
+    that dies is replaced; the frame it held is reported as failed (no
+    pose) so its session moves on.
+    """
+
+    def __init__(self, workers=None, config=DEFAULT_CONFIG, max_frame_shape=MAX_FRAME_SHAPE):
+        self.workers = workers or os.cpu_count() or 1
+        self.config = tuple(config)
+        self.frame_bytes = int(np.prod(max_frame_shape))
+        self.in_flight = 0
+        self.completed = 0
+        self.errors = 0
+        self.restarts = 0
+
+        self._ctx = mp.get_context("spawn")
+        self._results = self._ctx.Queue()
+        self._workers = [self._spawn(i) for i in range(self.workers)]
+
+        self._sessions = {}
+        self._order = deque()
+        self._ids = itertools.count()
+        self._tickets = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._threads = [threading.Thread(target=self._dispatch_loop, name="inference-dispatch", daemon=True),
+                         threading.Thread(target=self._collect_loop, name="inference-collect", daemon=True)]
+        for thread in self._threads:
+            thread.start()
+
+    def _spawn(self, index):
+        tasks = self._ctx.Queue()
+        process = self._ctx.Process(target=_worker_main, args=(index, tasks, self._results, self.config),
+                                    name=f"pose-worker-{index}", daemon=True)
+        process.start()
+        return _Worker(index, process, tasks)
+
+    # -- sessions ---------------------------------------------------------
+
+    def connect(self, slots=2):
+        # New client with its own shared-memory slots
+        blocks = [shared_memory.SharedMemory(create=True, size=self.frame_bytes) for _ in range(slots)]
+        with self._cond:
+            if self._closed:
+                for block in blocks:
+                    block.close()
+                    block.unlink()
+                raise RuntimeError("Inference service is closed")
+            session = _Session(next(self._ids), {b.name: b for b in blocks})
+            self._sessions[session.id] = session
+            self._order.append(session.id)
+        return InferenceClient(self, session)
+
+    def _disconnect(self, session):
+        with self._cond:
+            self._sessions.pop(session.id, None)
+            if session.id in self._order:
+                self._order.remove(session.id)
+            session.pending = None
+            busy = session.in_flight
+        for name, block in session.slots.items():
+            block.close()
+            # A worker may still be reading the in-flight slot; unlinking only removes the name
+            block.unlink()
+        if busy is not None:
+            logging.debug(f"Session {session.id} closed with a frame in flight")
+
+    def _submit(self, session, image):
+        if image.dtype != np.uint8 or image.nbytes > self.frame_bytes:
+            raise ValueError(f"Frame {image.shape} {image.dtype} does not fit a {self.frame_bytes}-byte slot")
+        # Reserve a slot under the lock, copy into it without the lock, then publish it.
+        # One thread submits per session, so only the dispatcher races with us here.
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Inference service is closed")
+            if session.writing is not None:
+                raise RuntimeError(f"Session {session.id} is already submitting a frame")
+            # Any slot neither read by a worker nor waiting; else take the waiting frame's slot back
+            busy = (session.in_flight, session.pending[1] if session.pending else None)
+            name = next((n for n in session.slots if n not in busy), None)
+            if name is None:
+                name = session.pending[1]
+                session.pending = None
+                session.dropped += 1
+            session.writing = name
+        try:
+            block = session.slots[name]
+            np.copyto(np.ndarray(image.shape, dtype=np.uint8, buffer=block.buf), image)
+        finally:
+            with self._cond:
+                session.writing = None
+        with self._cond:
+            session.submitted += 1
+            seq = session.submitted
+            if session.pending is not None:
+                # A frame that was waiting in the other slot is now stale
+                session.dropped += 1
+            session.pending = (seq, name, image.shape)
+            self._cond.notify_all()
+        return seq
+
+    # -- scheduling -------------------------------------------------------
+
+    def _next_task(self):
+        # Round-robin over sessions with a waiting frame; caller holds the lock
+        for _ in range(len(self._order)):
+            session_id = self._order[0]
+            self._order.rotate(-1)
+            session = self._sessions[session_id]
+            if session.pending is not None and session.in_flight is None:
+                seq, name, shape = session.pending
+                session.pending = None
+                session.in_flight = name
+                return (next(self._tickets), session.id, seq, name, shape)
+        return None
+
+    def _dispatch_loop(self):
+        while True:
+            with self._cond:
+                task = worker = None
+                while not self._closed:
+                    worker = next((w for w in self._workers if w.task is None), None)
+                    if worker is not None:
+                        task = self._next_task()
+                        if task is not None:
+                            break
+                    self._cond.wait()
+                if self._closed:
+                    return
+                worker.task = task
+                self.in_flight += 1
+                tasks = worker.tasks
+            tasks.put(task)
+
+    def _finish(self, worker, ticket, points, error):
+        # Caller holds the lock; returns (session, seq) to publish, or None for a stale ticket
+        task = worker.task
+        if task is None or task[0] != ticket:
+            return None
+        _, session_id, seq, name, _ = task
+        worker.task = None
+        self.in_flight -= 1
+        self.completed += 1
+        session = self._sessions.get(session_id)
+        if session is not None and session.in_flight == name:
+            session.in_flight = None
+        if error is not None and session is not None:
+            self.errors += 1
+            logging.error(f"Inference worker failed on session {session_id}: {error}")
+        self._cond.notify_all()
+        return session, seq
+
+    def _publish(self, finished, points):
+        if finished is None or finished[0] is None:
+            return
+        session, seq = finished
+        with session.done:
+            session.latest = (seq, points)
+            session.done.notify_all()
+
+    def _replace_dead_workers(self):
+        failed = []
+        with self._cond:
+            if self._closed:
+                return
+            for i, worker in enumerate(self._workers):
+                if worker.process.is_alive():
+                    continue
+                logging.error(f"Inference worker {worker.index} exited ({worker.process.exitcode}), restarting it")
+                if worker.task is not None:
+                    failed.append(self._finish(worker, worker.task[0], None, "worker process died"))
+                self._workers[i] = self._spawn(worker.index)
+                self.restarts += 1
+            self._cond.notify_all()
+        for finished in failed:
+            self._publish(finished, None)
+
+    def _collect_loop(self, check_every=0.5):
+        checked = time.monotonic()
+        while True:
+            try:
+                item = self._results.get(timeout=check_every)
+            except queue.Empty:
+                item = None
+                if self._closed:
+                    return
+            if time.monotonic() - checked >= check_every:
+                self._replace_dead_workers()
+                checked = time.monotonic()
+            if item is None:
+                continue
+            index, ticket, points, error = item
+            with self._cond:
+                finished = self._finish(self._workers[index], ticket, points, error)
+            self._publish(finished, points)
+
+    # -- metrics / lifecycle ----------------------------------------------
+
+    def stats(self):
+        with self._cond:
+            waiting = sum(s.pending is not None for s in self._sessions.values())
+            return {
+                "workers": self.workers,
+                "sessions": len(self._sessions),
+                "queue_depth": waiting,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "dropped": sum(s.dropped for s in self._sessions.values()),
+                "errors": self.errors,
+                "restarts": self.restarts,
+            }
+
+    def close(self, if_idle=False):
+        # Stop the workers; with if_idle, only when no session is connected. True if it closed.
+        with self._cond:
+            if self._closed or (if_idle and self._sessions):
+                return False
+            self._closed = True
+            sessions = list(self._sessions.values())
+            self._cond.notify_all()
+        for worker in self._workers:
+            worker.tasks.put(None)
+        for worker in self._workers:
+            worker.process.join(timeout=2)
+        for thread in self._threads:
+            thread.join(timeout=2)
+        for session in sessions:
+            self._disconnect(session)
+        return True
+
+
+class InferenceClient:
+    """One session's handle on the shared service; `process` mirrors `Pose.process`."""
+
+    def __init__(self, service, session):
+        self.service = service
+        self.session = session
+        self._landmarks = new_landmark_list()
+        self._points = np.zeros((NUM_LANDMARKS, 4), dtype=np.float32)
+
+    @property
+    def dropped(self):
+        return self.session.dropped
+
+    def submit(self, image):
+        # Non-blocking; returns the frame's sequence number
+        return self.service._submit(self.session, image)
+
+    def latest(self):
+        # (seq, points) of the newest finished frame, points is None when no pose was found
+        return self.session.latest
+
+    def process(self, image, timeout=1.0):
+        # Submit and wait for this frame (or a newer one); None landmarks on timeout
+        seq = self.submit(image)
+        session = self.session
+        with session.done:
+            ready = session.done.wait_for(lambda: session.latest is not None and session.latest[0] >= seq,
+                                          timeout)
+            points = session.latest[1] if ready else None
+        if points is None:
+            return PoseResult(None, False)
+        self._points[:] = points
+        return PoseResult(fill_landmark_list(self._landmarks, self._points), False)
+
+    def close(self):
+        self.service._disconnect(self.session)
+        _retire_idle_services()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Pose configs kept running at once; older ones close as soon as their last session leaves
+MAX_SERVICES = 2
+
+_services = OrderedDict()
+_services_lock = threading.Lock()
+
+
+def get_service(config=DEFAULT_CONFIG, workers=None):
+    # One service per Pose config per process, registered with the metrics export.
+    # Slider values are rounded like PosePool keys so nudging one doesn't start a new pool.
+    from dadhichi.metrics import registry
+
+    key = PosePool.key(*config)
+    with _services_lock:
+        if key in _services:
+            _services.move_to_end(key)
+        else:
+            service = InferenceService(workers=workers, config=key)
+            _services[key] = service
+            label = "/".join(str(v) for v in key)
+            registry.add_gauge("inference_queue_depth", "Sessions with a frame waiting for a worker.",
+                               lambda: {lbl: s.stats()["queue_depth"] for lbl, s in _service_labels()})
+            registry.add_gauge("inference_in_flight", "Frames currently on a worker.",
+                               lambda: {lbl: s.stats()["in_flight"] for lbl, s in _service_labels()})
+            registry.add_gauge("inference_dropped_frames", "Frames replaced by a newer one before dispatch.",
+                               lambda: {lbl: s.stats()["dropped"] for lbl, s in _service_labels()})
+            logging.info(f"Started inference service {label} with {service.workers} workers")
+        service = _services[key]
+    _retire_idle_services()
+    return service
+
+
+def _retire_idle_services():
+    # Close the least recently requested services beyond MAX_SERVICES that have no sessions
+    with _services_lock:
+        stale = [key for key in list(_services)[:-MAX_SERVICES] if not _services[key].stats()["sessions"]]
+        retired = [(key, _services.pop(key)) for key in stale]
+    for key, service in retired:
+        if service.close(if_idle=True):
+            logging.info(f"Closed idle inference service {'/'.join(str(v) for v in key)}")
+        else:
+            # A session connected in the meantime; keep it, oldest first
+            with _services_lock:
+                _services[key] = service
+                _services.move_to_end(key, last=False)
+
+
+def _service_labels():
+    with _services_lock:
+        return [("/".join(str(v) for v in key), service) for key, service in _services.items()]
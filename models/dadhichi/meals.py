@@ -0,0 +1,45 @@
+from collections import namedtuple
+
+import numpy as np
+
+# Per-dish nutrients (..., dishes, nutrients), per-meal totals (..., nutrients) and each
+# dish's share of its meal's total (..., dishes, nutrients), all over store.nutrients
+MealTotals = namedtuple("MealTotals", ["dishes", "totals", "shares"])
+
+
+def aggregate(store, rows, servings):
+    """Nutrient totals of any number of meals in one matrix product.
+
+    `rows` holds store row offsets and `servings` the servings of each
+    (multiples of the store's per-100 g values), both shaped
+    (..., dishes): one meal is (dishes,), a week of meals is
+    (days, meals, dishes). A row of -1 is an empty slot. Servings are
+    scattered into a (meals, distinct foods) matrix and multiplied by the
+    nutrient-matrix slice of just those foods, so a week costs one small
+    matmul like a single meal does. Unknown (NaN) nutrients count as 0.
+    Only the store's nutrient columns are totalled (serving weights and
+    refuse % are not amounts), so column j of the result is
+    store.nutrients[j], which is also store.column(name) for a nutrient.
+
+        week = aggregate(store, rows, servings)    # rows: (7, 3, 4)
+        daily = week.totals.sum(axis=1)            # (7, nutrients)
+        weekly = daily.sum(axis=0)
+    """
+    rows = np.asarray(rows, dtype=np.intp)
+    servings = np.asarray(servings, dtype=np.float32).reshape(rows.shape)
+    servings = np.where(rows >= 0, servings, 0)
+    meals = int(np.prod(rows.shape[:-1], dtype=np.intp))
+    dishes = rows.shape[-1]
+
+    foods, slot = np.unique(rows.ravel(), return_inverse=True)
+    nutrients = np.nan_to_num(store.matrix[np.maximum(foods, 0), :len(store.nutrients)])
+    nutrients[foods < 0] = 0
+
+    amounts = np.zeros((meals, len(foods)), dtype=np.float32)
+    np.add.at(amounts, (np.repeat(np.arange(meals), dishes), slot), servings.ravel())
+    totals = (amounts @ nutrients).reshape(rows.shape[:-1] + (nutrients.shape[1],))
+
+    per_dish = (servings.reshape(-1, 1) * nutrients[slot]).reshape(rows.shape + (nutrients.shape[1],))
+    whole = np.broadcast_to(totals[..., None, :], per_dish.shape)
+    shares = np.divide(per_dish, whole, out=np.zeros_like(per_dish), where=whole > 0)
+    return MealTotals(per_dish, totals, shares)
@@ -0,0 +1,289 @@
+import json
+import logging
+import threading
+import time
+import weakref
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+# Frame loop stages, in loop order
+STAGES = ["read", "convert", "infer", "evaluate", "draw", "display"]
+
+# Histogram bucket upper bounds in milliseconds (Prometheus `le` labels)
+BUCKETS_MS = (1, 2, 5, 10, 20, 35, 50, 75, 100, 150, 250, 500, 1000)
+
+
+class RollingHistogram:
+    """Latency histogram: cumulative buckets for export plus a ring of recent samples.
+
+    `observe` is one array store and one searchsorted, cheap enough to
+    sit on the per-frame hot path. Percentiles are taken over the last
+    `window` samples only, so they follow the current session.
+    """
+
+    def __init__(self, window=300, buckets=BUCKETS_MS):
+        self.buckets = np.asarray(buckets, dtype=np.float64)
+        self.counts = np.zeros(len(buckets) + 1, dtype=np.int64)   # last bucket is +Inf
+        self.count = 0
+        self.total = 0.0
+        self._recent = np.zeros(window, dtype=np.float64)
+
+    def observe(self, ms):
+        self._recent[self.count % len(self._recent)] = ms
+        self.counts[np.searchsorted(self.buckets, ms)] += 1
+        self.count += 1
+        self.total += ms
+
+    def recent(self):
+        return self._recent[:min(self.count, len(self._recent))]
+
+    def percentile(self, q):
+        recent = self.recent()
+        return float(np.percentile(recent, q)) if recent.size else 0.0
+
+    def last(self):
+        return float(self._recent[(self.count - 1) % len(self._recent)]) if self.count else 0.0
+
+
+def _counter(field):
+    # Per-run counter that also adds whatever it grows by to the page aggregate
+    def get(self):
+        return self._counts[field]
+
+    def set(self, value):
+        delta = value - self._counts[field]
+        self._counts[field] = value
+        if self.parent is not None and delta > 0:
+            self.parent._add(field, delta)
+    return property(get, set)
+
+
+class FrameMetrics:
+    """Timing hooks and counters for one camera run.
+
+    Each run (a session pressing Start, or a WebRTC stream) gets its own
+    FrameMetrics from `registry.session(name)`. Stages can run on
+    different threads (see FramePipeline); each stage's histogram is only
+    written by the thread that runs it. Every sample and count is also
+    added, under a lock, to the page's aggregate (`registry.get(name)`),
+    which is what gets exported: its counters only grow, however many
+    sessions run at once, and its fps is the sum over runs that showed a
+    frame in the last `active_s` seconds. `dropped` can be assigned the
+    pipeline's running count; only increases reach the aggregate.
+
+        t = time.perf_counter()
+        image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        t = metrics.lap("convert", t)
+        results = pose.process(image)
+        t = metrics.lap("infer", t)
+    """
+
+    no_pose = _counter("no_pose")
+    errors = _counter("errors")
+    dropped = _counter("dropped")
+
+    def __init__(self, name, stages=STAGES, window=300, parent=None, active_s=5.0):
+        self.name = name
+        self.parent = parent
+        self.active_s = active_s
+        self.stages = {stage: RollingHistogram(window) for stage in stages}
+        self.frames = 0
+        self._counts = {"no_pose": 0, "errors": 0, "dropped": 0}
+        self._frame_times = np.zeros(60, dtype=np.float64)
+        self._lock = threading.Lock()
+        self._runs = None       # live runs feeding this aggregate
+        if parent is not None:
+            with parent._lock:
+                if parent._runs is None:
+                    parent._runs = weakref.WeakSet()
+                parent._runs.add(self)
+
+    def _add(self, field, delta):
+        with self._lock:
+            self._counts[field] += delta
+
+    def lap(self, stage, start):
+        now = time.perf_counter()
+        ms = (now - start) * 1000
+        self.stages[stage].observe(ms)
+        if self.parent is not None:
+            with self.parent._lock:
+                self.parent.stages[stage].observe(ms)
+        return now
+
+    def frame_done(self):
+        self._frame_times[self.frames % len(self._frame_times)] = time.perf_counter()
+        self.frames += 1
+        if self.parent is not None:
+            with self.parent._lock:
+                self.parent.frames += 1
+
+    @property
+    def last_frame(self):
+        return self._frame_times[(self.frames - 1) % len(self._frame_times)] if self.frames else 0.0
+
+    @property
+    def fps(self):
+        if self._runs is not None:
+            now = time.perf_counter()
+            with self._lock:
+                runs = list(self._runs)
+            return sum(run.fps for run in runs if now - run.last_frame < self.active_s)
+        n = min(self.frames, len(self._frame_times))
+        if n < 2:
+            return 0.0
+        newest = self._frame_times[(self.frames - 1) % len(self._frame_times)]
+        oldest = self._frame_times[(self.frames - n) % len(self._frame_times)]
+        return (n - 1) / (newest - oldest) if newest > oldest else 0.0
+
+    def draw_overlay(self, image, origin=(10, None)):
+        # Small FPS / inference / drop readout in the bottom-left corner
+        x, y = origin[0], origin[1] if origin[1] is not None else image.shape[0] - 50
+        lines = (f"FPS {self.fps:4.1f}  infer {self.stages['infer'].last():5.1f} ms",
+                 f"dropped {self.dropped}  no pose {self.no_pose}")
+        for i, text in enumerate(lines):
+            cv2.putText(image, text, (x, y + 20 * i), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1, cv2.LINE_AA)
+        return image
+
+    def snapshot(self):
+        fps = self.fps
+        with self._lock:
+            return {
+                "name": self.name,
+                "frames": self.frames,
+                "fps": fps,
+                "no_pose": self.no_pose,
+                "errors": self.errors,
+                "dropped": self.dropped,
+                "stages": {
+                    stage: {"count": h.count, "sum_ms": h.total, "p50_ms": h.percentile(50),
+                            "p95_ms": h.percentile(95), "p99_ms": h.percentile(99),
+                            "buckets": h.counts.copy()}
+                    for stage, h in self.stages.items()
+                },
+            }
+
+
+class MetricsRegistry:
+    # Every FrameMetrics in the process, keyed by name, for export
+
+    def __init__(self):
+        self._metrics = {}
+        self._gauges = {}    # name -> (help, fn returning {label: value})
+        self._lock = threading.Lock()
+        self._server = None
+
+    def add_gauge(self, name, help_text, fn):
+        # Gauges sampled at export time, e.g. queue depth of the inference service
+        with self._lock:
+            self._gauges[name] = (help_text, fn)
+
+    def _sample_gauges(self):
+        with self._lock:
+            gauges = dict(self._gauges)
+        return {name: (help_text, fn()) for name, (help_text, fn) in gauges.items()}
+
+    def get(self, name):
+        # The page-wide aggregate that is exported
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = FrameMetrics(name)
+            return self._metrics[name]
+
+    def session(self, name):
+        # Metrics for one camera run, feeding the page's aggregate
+        return FrameMetrics(name, parent=self.get(name))
+
+    def reset(self, name):
+        with self._lock:
+            self._metrics[name] = FrameMetrics(name)
+            return self._metrics[name]
+
+    def to_json(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        snapshot = {m.name: m.snapshot() for m in metrics}
+        for m in snapshot.values():
+            for stage in m["stages"].values():
+                del stage["buckets"]
+        snapshot["gauges"] = {name: values for name, (_, values) in self._sample_gauges().items()}
+        return json.dumps(snapshot, indent=2)
+
+    def to_prometheus(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        metrics = [SimpleNamespace(**m.snapshot()) for m in metrics]
+        out = [
+            "# HELP dadhichi_frames_total Frames processed by the camera loop.",
+            "# TYPE dadhichi_frames_total counter",
+        ]
+        out += [f'dadhichi_frames_total{{loop="{m.name}"}} {m.frames}' for m in metrics]
+        out += ["# HELP dadhichi_no_pose_frames_total Frames where no pose was detected.",
+                "# TYPE dadhichi_no_pose_frames_total counter"]
+        out += [f'dadhichi_no_pose_frames_total{{loop="{m.name}"}} {m.no_pose}' for m in metrics]
+        out += ["# HELP dadhichi_frame_errors_total Frames that raised while being processed.",
+                "# TYPE dadhichi_frame_errors_total counter"]
+        out += [f'dadhichi_frame_errors_total{{loop="{m.name}"}} {m.errors}' for m in metrics]
+        out += ["# HELP dadhichi_dropped_frames_total Frames dropped before display.",
+                "# TYPE dadhichi_dropped_frames_total counter"]
+        out += [f'dadhichi_dropped_frames_total{{loop="{m.name}"}} {m.dropped}' for m in metrics]
+        out += ["# HELP dadhichi_fps Recent frames per second.", "# TYPE dadhichi_fps gauge"]
+        out += [f'dadhichi_fps{{loop="{m.name}"}} {m.fps:.3f}' for m in metrics]
+        out += ["# HELP dadhichi_stage_latency_ms Per-stage frame loop latency.",
+                "# TYPE dadhichi_stage_latency_ms histogram"]
+        for m in metrics:
+            for stage, h in m.stages.items():
+                labels = f'loop="{m.name}",stage="{stage}"'
+                cumulative = np.cumsum(h["buckets"])
+                for le, count in zip(BUCKETS_MS, cumulative):
+                    out.append(f'dadhichi_stage_latency_ms_bucket{{{labels},le="{le:g}"}} {count}')
+                out.append(f'dadhichi_stage_latency_ms_bucket{{{labels},le="+Inf"}} {cumulative[-1]}')
+                out.append(f"dadhichi_stage_latency_ms_sum{{{labels}}} {h['sum_ms']:.3f}")
+                out.append(f"dadhichi_stage_latency_ms_count{{{labels}}} {h['count']}")
+        for name, (help_text, values) in self._sample_gauges().items():
+            out += [f"# HELP dadhichi_{name} {help_text}", f"# TYPE dadhichi_{name} gauge"]
+            out += [f'dadhichi_{name}{{key="{label}"}} {value}' for label, value in values.items()]
+        return "\n".join(out) + "\n"
+
+    def serve(self, port=9108, host="127.0.0.1"):
+        """Expose /metrics (Prometheus text) and /metrics.json on a daemon thread.
+
+        Idempotent; binds to localhost by default. Returns None (and logs)
+        when the port can't be bound, e.g. another process already has it.
+        """
+        if self._server is not None:
+            return self._server
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, kind = registry.to_prometheus(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, kind = registry.to_json(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode()
+                self.send_response(200)
+                self.send_header("Content-Type", kind)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer((host, port), Handler)
+        except OSError as e:
+            logging.error(f"Metrics server could not bind {host}:{port}: {e}")
+            return None
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        return self._server
+
+
+registry = MetricsRegistry()
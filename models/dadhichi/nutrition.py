@@ -0,0 +1,249 @@
+"""Nutrient table for the Nutrition page, served from a memory-mapped cache.
+
+The two source CSVs are merged into one table: food1.csv (USDA SR, per
+100 g, keyed by NDB_No) and food.csv (Food, Serving, Calories per
+serving). food.csv has no NDB_No, so its rows get synthetic IDs from
+SYNTHETIC_ID_BASE up; names already in food1.csv, and repeats within
+food.csv, are dropped. Its calories are converted to per 100 g using the
+gram weight in the Serving text (ml counted as g), which also becomes
+GmWt_1. Every other nutrient is NaN for those rows: unknown, not zero.
+The NOT_NUTRIENTS columns (serving weights, refuse %) describe the food
+rather than an amount per 100 g; they are moved after every nutrient
+column so totals can take the nutrients as one leading slice.
+
+The merged table is written once to CACHE_DIR/<checksum>/ as .npy
+arrays (ids, float32 nutrient matrix, and the descriptions as one UTF-8
+blob plus offsets) with a meta.json. The checksum covers both CSVs, so
+the cache is rebuilt only when one of them changes; otherwise startup is
+an mmap.
+
+    python -m dadhichi.nutrition build [--force]
+
+Run from the models/ directory.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+# USDA nutrient table the Nutrition page reads (descriptions in Shrt_Desc, one nutrient per column)
+FOOD_CSV = "./food1.csv"
+FOOD_CSV_ENCODING = "mac_roman"
+DESCRIPTION = "Shrt_Desc"
+FOOD_ID = "NDB_No"
+
+# Household foods with calories per serving only (columns Food, Serving, Calories)
+SERVINGS_CSV = "./food.csv"
+SYNTHETIC_ID_BASE = 900000
+CALORIES = "Energ_Kcal"
+GRAM_WEIGHT = "GmWt_1"
+# Per-food properties that must never be summed into a meal, kept as the last columns
+NOT_NUTRIENTS = ("GmWt_1", "GmWt_2", "Refuse_Pct")
+
+CACHE_DIR = "food_cache"
+CACHE_VERSION = 2
+
+
+def normalize_column(name):
+    """Consistent nutrient column names: "Copper_mg)" -> "Copper_(mg)", "Vit_D_ÔøΩg" -> "Vit_D_(ug)".
+
+    The headers were saved as UTF-8 and are read back as mac_roman, so the
+    micro sign's replacement character shows up as three letters.
+    """
+    name = name.replace("ÔøΩ", "u").replace("µ", "u").replace(" ", "")
+    return re.sub(r"_\(?(g|mg|ug)\)?$", r"_(\1)", name)
+
+
+def _checksum(paths):
+    digest = hashlib.sha256(f"v{CACHE_VERSION}".encode())
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def read_foods(path=FOOD_CSV, servings_path=SERVINGS_CSV, encoding=FOOD_CSV_ENCODING):
+    """Both CSVs merged: (ids, names, columns, matrix), nutrients per 100 g."""
+    import pandas as pd
+
+    df = pd.read_csv(path, encoding=encoding)
+    df.columns = [normalize_column(c) for c in df.columns]
+    df = df.drop_duplicates(FOOD_ID)
+    columns = [c for c in df.columns if c not in (FOOD_ID, DESCRIPTION)]
+    columns = [c for c in columns if c not in NOT_NUTRIENTS] + [c for c in columns if c in NOT_NUTRIENTS]
+    ids = df[FOOD_ID].to_numpy(dtype=np.int64)
+    names = df[DESCRIPTION].astype(str).tolist()
+    matrix = df[columns].to_numpy(dtype=np.float32)
+
+    if servings_path and os.path.exists(servings_path):
+        extra = pd.read_csv(servings_path, encoding=encoding)
+        extra["name"] = extra["Food"].astype(str).str.strip().str.upper()
+        extra = extra.drop_duplicates("name")
+        extra = extra[~extra["name"].isin(set(names))]
+        grams = extra["Serving"].str.extract(r"\(([\d.]+)\s*(?:g|ml)\)")[0].astype(float)
+        extra = extra[grams > 0]
+        grams = grams[grams > 0]
+        rows = np.full((len(extra), len(columns)), np.nan, dtype=np.float32)
+        rows[:, columns.index(CALORIES)] = extra["Calories"].to_numpy(dtype=np.float32) * 100 / grams.to_numpy()
+        rows[:, columns.index(GRAM_WEIGHT)] = grams.to_numpy()
+        ids = np.concatenate([ids, SYNTHETIC_ID_BASE + extra.index.to_numpy(dtype=np.int64)])
+        names += extra["name"].tolist()
+        matrix = np.concatenate([matrix, rows])
+    return ids, names, columns, matrix
+
+
+def build_cache(directory=CACHE_DIR, sources=(FOOD_CSV, SERVINGS_CSV), force=False):
+    """Write the merged table under directory/<checksum>/ unless it is already there; returns that path."""
+    checksum = _checksum([p for p in sources if os.path.exists(p)])
+    target = os.path.join(directory, checksum)
+    if os.path.exists(os.path.join(target, "meta.json")) and not force:
+        return target
+
+    ids, names, columns, matrix = read_foods(*sources)
+    encoded = [name.encode("utf-8") for name in names]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+
+    # Written beside the target and renamed into place, so readers never see half a cache
+    os.makedirs(directory, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".build-", dir=directory)
+    np.save(os.path.join(staging, "ids.npy"), ids)
+    np.save(os.path.join(staging, "nutrients.npy"), np.ascontiguousarray(matrix, dtype=np.float32))
+    np.save(os.path.join(staging, "names.npy"), np.frombuffer(b"".join(encoded), dtype=np.uint8))
+    np.save(os.path.join(staging, "name_offsets.npy"), offsets)
+    with open(os.path.join(staging, "meta.json"), "w") as f:
+        json.dump({"version": CACHE_VERSION, "checksum": checksum, "sources": list(sources),
+                   "rows": len(ids), "columns": columns}, f, indent=1)
+    if force and os.path.exists(target):
+        shutil.rmtree(target)
+    try:
+        os.rename(staging, target)
+    except OSError:
+        # Another process built the same checksum first
+        shutil.rmtree(staging, ignore_errors=True)
+    for entry in os.listdir(directory):
+        if entry != checksum and not entry.startswith("."):
+            shutil.rmtree(os.path.join(directory, entry), ignore_errors=True)
+    logging.info(f"Built food cache {target}: {len(ids)} foods x {len(columns)} nutrients")
+    return target
+
+
+class NutrientStore:
+    """Nutrient table held as one contiguous float32 matrix with hashed lookups.
+
+    Rows are foods, columns are nutrients. Descriptions and food IDs map
+    to row offsets through dicts, and nutrient names to column offsets, so
+    a lookup is two dict hits and an array index instead of a boolean scan
+    over every row. Like `df[df[DESCRIPTION] == name].values[0]`, a
+    description that occurs more than once resolves to its first row.
+    `nutrients` names the leading columns that are amounts per 100 g, so
+    `matrix[:, :len(nutrients)]` is what a meal total adds up.
+    """
+
+    def __init__(self, ids, names, columns, matrix):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.names = list(names)
+        self.columns = list(columns)
+        # A memory-mapped matrix from the cache is used as is, not copied
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        self._row_by_id = {food_id: row for row, food_id in enumerate(self.ids.tolist())}
+        self._row_by_name = {}
+        for row, name in enumerate(self.names):
+            self._row_by_name.setdefault(name, row)
+        self._column = {name: j for j, name in enumerate(self.columns)}
+        self.nutrients = [c for c in self.columns if c not in NOT_NUTRIENTS]
+        if self.columns[:len(self.nutrients)] != self.nutrients:
+            raise ValueError(f"Columns {', '.join(NOT_NUTRIENTS)} must come after every nutrient column")
+        # Unique descriptions in first-seen order, what the page's selectbox lists
+        self.descriptions = list(self._row_by_name)
+
+    @classmethod
+    def from_csv(cls, path=FOOD_CSV, servings_path=SERVINGS_CSV, encoding=FOOD_CSV_ENCODING):
+        return cls(*read_foods(path, servings_path, encoding))
+
+    @classmethod
+    def from_cache(cls, directory=CACHE_DIR, sources=(FOOD_CSV, SERVINGS_CSV)):
+        """Store over the memory-mapped cache, building it first if the CSVs changed."""
+        path = build_cache(directory, sources)
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        blob = np.load(os.path.join(path, "names.npy"), mmap_mode="r")
+        offsets = np.load(os.path.join(path, "name_offsets.npy")).tolist()
+        raw = blob.tobytes()
+        names = [raw[a:b].decode("utf-8") for a, b in zip(offsets[:-1], offsets[1:])]
+        return cls(np.load(os.path.join(path, "ids.npy"), mmap_mode="r"), names, meta["columns"],
+                   np.load(os.path.join(path, "nutrients.npy"), mmap_mode="r"))
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._row_by_name
+
+    def row(self, name):
+        return self._row_by_name[name]
+
+    def row_by_id(self, food_id):
+        return self._row_by_id[int(food_id)]
+
+    def column(self, nutrient):
+        return self._column[nutrient]
+
+    def columns_of(self, nutrients):
+        return np.array([self._column[n] for n in nutrients], dtype=np.intp)
+
+    def lookup(self, name, nutrients=None):
+        """Nutrients of one food: the whole row, or just `nutrients` in that order."""
+        values = self.matrix[self._row_by_name[name]]
+        return values if nutrients is None else values[self.columns_of(nutrients)]
+
+    def value(self, name, nutrient):
+        return self.matrix[self._row_by_name[name], self._column[nutrient]]
+
+    def rows(self, names):
+        return np.array([self._row_by_name[name] for name in names], dtype=np.intp)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    # Parsed once per process; every rerun of every session shares it read-only
+    global _store
+    with _store_lock:
+        if _store is None:
+            start = time.perf_counter()
+            try:
+                _store = NutrientStore.from_cache()
+            except OSError as e:
+                # Read-only checkout or full disk: parse the CSVs in memory instead
+                logging.error(f"Food cache unavailable ({e}), reading the CSVs")
+                _store = NutrientStore.from_csv()
+            logging.info(f"Loaded {len(_store)} foods in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return _store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the memory-mapped food cache from the CSVs")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--force", action="store_true", help="rebuild even if the checksum matches")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    path = build_cache(force=args.force)
+    store = NutrientStore.from_cache()
+    print(f"{path}: {len(store)} foods x {len(store.columns)} nutrients "
+          f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+import collections
+import queue
+import threading
+
+
+class LatestQueue:
+    """Small bounded queue that drops the oldest item instead of blocking.
+
+    The producer never waits on a slow consumer; when the queue is full the
+    stalest item is discarded and counted in `dropped`, so the consumer
+    always gets the freshest frame. `on_drop` is called with every item
+    discarded that way, or put after the queue closed.
+    """
+
+    CLOSED = object()
+
+    def __init__(self, maxsize=1, on_drop=None):
+        self._items = collections.deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self.on_drop = on_drop
+        self.closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        dropped = self.CLOSED
+        with self._cond:
+            if self.closed:
+                dropped = item
+            else:
+                if len(self._items) == self._items.maxlen:
+                    self.dropped += 1
+                    dropped = self._items.popleft()
+                self._items.append(item)
+                self._cond.notify()
+        if dropped is not self.CLOSED and self.on_drop is not None:
+            self.on_drop(dropped)
+
+    def get(self, timeout=None):
+        # Next item, LatestQueue.CLOSED once closed and drained, queue.Empty on timeout
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self.closed, timeout):
+                raise queue.Empty
+            if self._items:
+                return self._items.popleft()
+            return self.CLOSED
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def drain(self):
+        # Items still queued, removed; call once the producer has stopped
+        with self._cond:
+            items = list(self._items)
+            self._items.clear()
+        return items
+
+
+class FramePipeline:
+    """Capture -> inference -> render pipeline for the camera pages.
+
+    `read` is a `cap.read`-style callable returning (ok, frame) and
+    `process` turns a frame into whatever the page displays. In threaded
+    mode capture and inference each run on their own daemon thread, joined
+    by LatestQueues, and iterating the pipeline yields the freshest
+    processed result for the render / transport stage, which stays on the
+    calling (Streamlit script) thread so Stop and reruns still interrupt it.
+    A slow browser push then only drops frames instead of stalling capture.
+    With `threaded=False` the same stages run one after another inline.
+
+    `release`, when given, is called with every frame `read` returned once
+    the pipeline is done with it: after the render stage has finished with
+    its result (when the loop asks for the next one), or when it is dropped
+    or left queued at stop. Pass FrameBuffers.release so ring slots come
+    back only when nothing refers to them any more.
+
+    Use as a context manager so the threads are always stopped:
+
+        with FramePipeline(cap.read, process_frame) as frames:
+            for image in frames:
+                FRAME_WINDOW.image(image, channels="BGR")
+    """
+
+    def __init__(self, read, process, threaded=True, maxsize=1, release=None):
+        self.read = read
+        self.process = process
+        self.threaded = threaded
+        self.release = release
+        self.error = None
+        self.captured = 0
+        self.processed = 0
+
+        self._frames = LatestQueue(maxsize, on_drop=self._release)
+        # Results carry their frame so it is released only after the result has been rendered
+        self._results = LatestQueue(maxsize, on_drop=lambda item: self._release(item[0]))
+        self._stop = threading.Event()
+        self._threads = []
+
+    @property
+    def dropped(self):
+        return self._frames.dropped + self._results.dropped
+
+    def start(self):
+        if self.threaded and not self._threads:
+            self._threads = [
+                threading.Thread(target=self._capture_loop, name="pipeline-capture", daemon=True),
+                threading.Thread(target=self._inference_loop, name="pipeline-inference", daemon=True),
+            ]
+            for thread in self._threads:
+                thread.start()
+        return self
+
+    def stop(self, timeout=1.0):
+        self._stop.set()
+        self._frames.close()
+        self._results.close()
+        capture, inference = self._threads or (None, None)
+        # Always wait out an inference call in progress: the caller returns
+        # the Pose to the pool as soon as this does. Capture only touches
+        # the camera, so a stuck read gets `timeout`.
+        if inference is not None:
+            inference.join()
+        if capture is not None:
+            capture.join(timeout)
+        self._threads = []
+        for frame in self._frames.drain():
+            self._release(frame)
+        for frame, _ in self._results.drain():
+            self._release(frame)
+
+    def _release(self, frame):
+        if self.release is not None:
+            self.release(frame)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _capture_loop(self):
+        try:
+            while not self._stop.is_set():
+                ok, frame = self.read()
+                if not ok:
+                    break
+                self.captured += 1
+                self._frames.put(frame)
+        except Exception as e:
+            self.error = e
+        finally:
+            self._frames.close()
+
+    def _inference_loop(self):
+        try:
+            while not self._stop.is_set():
+                frame = self._frames.get()
+                if frame is LatestQueue.CLOSED:
+                    break
+                try:
+                    result = self.process(frame)
+                except Exception:
+                    self._release(frame)
+                    raise
+                self.processed += 1
+                self._results.put((frame, result))
+        except Exception as e:
+            self.error = e
+            self._stop.set()
+        finally:
+            self._results.close()
+
+    def _inline(self):
+        while not self._stop.is_set():
+            ok, frame = self.read()
+            if not ok:
+                return
+            self.captured += 1
+            try:
+                result = self.process(frame)
+                self.processed += 1
+                yield result
+            finally:
+                self._release(frame)
+
+    def __iter__(self):
+        if not self.threaded:
+            yield from self._inline()
+            return
+        self.start()
+        while True:
+            item = self._results.get()
+            if item is LatestQueue.CLOSED:
+                break
+            frame, result = item
+            try:
+                yield result
+            finally:
+                self._release(frame)
+        if self.error is not None:
+            raise self.error
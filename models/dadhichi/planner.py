@@ -0,0 +1,232 @@
+import logging
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from dadhichi.meals import aggregate
+
+# Daily (or per-meal) targets: kcal and grams of each macro
+Targets = namedtuple("Targets", ["calories", "protein", "carbs", "fat"])
+
+# A solved plan: store rows, servings of each (x 100 g), MealTotals over every
+# nutrient, mean relative miss on the targets and which solver produced it
+Plan = namedtuple("Plan", ["rows", "servings", "meal", "error", "solver", "ms"])
+
+TARGET_COLUMNS = ["Energ_Kcal", "Protein_(g)", "Carbohydrt_(g)", "Lipid_Tot_(g)"]
+SUGAR = "Sugar_Tot_(g)"
+SODIUM = "Sodium_(mg)"
+# kcal per gram of protein, carbs and fat
+ATWATER = np.array([4.0, 4.0, 9.0])
+
+# Nutrient-rich-food style density score: daily values of nutrients to encourage and to limit
+ENCOURAGE = {"Protein_(g)": 50, "Fiber_TD_(g)": 28, "Vit_A_RAE": 900, "Vit_C_(mg)": 90, "Vit_E_(mg)": 15,
+             "Calcium_(mg)": 1300, "Iron_(mg)": 18, "Potassium_(mg)": 4700, "Magnesium_(mg)": 420}
+LIMIT = {"FA_Sat_(g)": 20, SUGAR: 50, SODIUM: 2300}
+
+# Ingredients nobody eats 50 g of, which the macro-densest picks would otherwise favour
+NOT_A_DISH = ("BABYFOOD", "INFANT FORMULA", "PDR", "ISOLATE", "SHORTENING", "FISH OIL", "CHEWING GUM", "SPICES",
+              "ALLSPICE", "LEAVENING", "GELATIN")
+
+
+def lp_available():
+    try:
+        from scipy.optimize import linprog  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class MealPlanner:
+    """Picks foods and servings from the whole store to hit calorie and macro targets.
+
+    Densities are precomputed once per store: each food's share of its
+    energy from protein, carbs and fat, its grams of each per kcal, sugar
+    and sodium per kcal, and a nutrient-density score (percent daily
+    value of nine nutrients per 100 kcal, each capped at 100%, minus that
+    of saturated fat, sugar and sodium). A plan only searches a few
+    hundred candidates from the denser half of the store: the richest
+    sources of each macro and the foods whose energy split is closest to
+    the target's, minus excluded foods and foods too sugary or salty for
+    the caps. Foods missing the target or cap nutrients (the
+    calories-only food.csv rows) and NOT_A_DISH ingredients are never
+    candidates.
+
+    With scipy installed the candidates go to an LP (HiGHS) that
+    minimises the summed relative miss on the four targets under the
+    servings bound and the caps; its vertex solution uses few foods. The
+    result is rounded to `step` servings and polished by the local
+    search, which is also the whole solver without scipy: every
+    add-a-step, remove-a-step and move-a-step-to-another-food move is
+    scored at once as one array and the best one taken until none
+    improves.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        columns = store.columns_of(TARGET_COLUMNS + [SUGAR, SODIUM])
+        values = store.matrix[:, columns].astype(np.float64)
+        usable = ~np.isnan(values).any(axis=1) & (values[:, 0] > 0)
+        self.rows = np.flatnonzero(usable)
+        self.nutrients = values[usable, :4]
+        self.sugar = values[usable, 4]
+        self.sodium = values[usable, 5]
+        kcal = self.nutrients[:, :1]
+        self.per_kcal = self.nutrients[:, 1:] / kcal
+        self.energy_split = self.per_kcal * ATWATER
+        self.sugar_per_kcal = self.sugar / kcal[:, 0]
+        self.sodium_per_kcal = self.sodium / kcal[:, 0]
+        self.names = np.array([name.upper() for name in store.names])
+
+        per_100kcal = 100 / kcal
+        good = np.nan_to_num(store.matrix[np.ix_(self.rows, store.columns_of(list(ENCOURAGE)))])
+        bad = np.nan_to_num(store.matrix[np.ix_(self.rows, store.columns_of(list(LIMIT)))])
+        self.density = (np.minimum(good * per_100kcal / np.array(list(ENCOURAGE.values())), 1).sum(axis=1)
+                        - (bad * per_100kcal / np.array(list(LIMIT.values()))).sum(axis=1))
+        self.dense = self.density >= np.median(self.density)
+        self.dense &= ~np.isin(self.rows, self.rows_matching(NOT_A_DISH))
+
+    def rows_matching(self, words):
+        """Store rows whose description contains any of `words` (case-insensitive)."""
+        hits = np.zeros(len(self.names), dtype=bool)
+        for word in words:
+            word = word.strip().upper()
+            if word:
+                hits |= np.char.find(self.names, word) >= 0
+        return np.flatnonzero(hits)
+
+    def candidates(self, targets, exclude=(), sugar_max=None, sodium_max=None, limit=200):
+        """Offsets into self.rows worth searching for these targets."""
+        allowed = self.dense & ~np.isin(self.rows, np.asarray(list(exclude), dtype=np.intp))
+        # A food may be sweeter or saltier per kcal than the cap allows on average, but not by much
+        if sugar_max is not None:
+            allowed &= self.sugar_per_kcal <= 3 * sugar_max / targets.calories
+        if sodium_max is not None:
+            allowed &= self.sodium_per_kcal <= 3 * sodium_max / targets.calories
+        pool = np.flatnonzero(allowed)
+        if len(pool) <= limit:
+            return pool
+
+        wanted = np.array(targets[1:], dtype=np.float64) * ATWATER / targets.calories
+        per = limit // 4
+        picks = [pool[np.argpartition(np.abs(self.energy_split[pool] - wanted).sum(axis=1), per)[:per]]]
+        for macro in range(3):
+            picks.append(pool[np.argpartition(-self.per_kcal[pool, macro], per)[:per]])
+        return np.unique(np.concatenate(picks))
+
+    def _loss(self, totals, goal):
+        return (np.abs(totals - goal) / goal).sum(axis=-1)
+
+    def _solve_lp(self, A, goal, upper, sugar, sodium, sugar_max, sodium_max):
+        from scipy.optimize import linprog
+
+        n, m = A.shape
+        # Variables: servings (n), then over / under each target (m each), all relative to the target
+        B = A.T / goal[:, None]
+        cost = np.concatenate([np.full(n, 1e-4), np.ones(2 * m)])
+        A_eq = np.hstack([B, -np.eye(m), np.eye(m)])
+        A_ub, b_ub = [], []
+        for amounts, cap in ((sugar, sugar_max), (sodium, sodium_max)):
+            if cap is not None:
+                A_ub.append(np.concatenate([amounts, np.zeros(2 * m)]))
+                b_ub.append(cap)
+        result = linprog(cost, A_ub=np.array(A_ub) if A_ub else None, b_ub=b_ub or None, A_eq=A_eq,
+                         b_eq=np.ones(m), bounds=[(0, upper)] * n + [(0, None)] * (2 * m), method="highs")
+        if not result.success:
+            logging.error(f"Meal plan LP failed: {result.message}")
+            return None
+        return result.x[:n]
+
+    def _local_search(self, x, A, goal, upper, step, sugar, sodium, sugar_max, sodium_max, max_foods,
+                      max_moves=500):
+        sugar_max = np.inf if sugar_max is None else sugar_max
+        sodium_max = np.inf if sodium_max is None else sodium_max
+        deltas = np.concatenate([A * step, -A * step])
+        sugar_deltas = np.concatenate([sugar, -sugar]) * step
+        sodium_deltas = np.concatenate([sodium, -sodium]) * step
+        n = len(x)
+        totals = x @ A
+        loss = self._loss(totals, goal)
+        for _ in range(max_moves):
+            used = x > 0
+            room = x + step <= upper + 1e-9
+            feasible = np.concatenate([room & (used | (used.sum() < max_foods)), used])
+            feasible &= x @ sugar + sugar_deltas <= sugar_max + 1e-9
+            feasible &= x @ sodium + sodium_deltas <= sodium_max + 1e-9
+            losses = self._loss(totals + deltas, goal)
+            losses[~feasible] = np.inf
+            best = int(np.argmin(losses))
+
+            # Moving a step from one food in the plan to any candidate: (used x candidates) moves
+            held = np.flatnonzero(used)
+            swaps = totals + step * (A[None, :, :] - A[held, None, :])
+            swap_losses = self._loss(swaps, goal)
+            opens = (x[held, None] > step + 1e-9) & ~used[None, :]
+            swap_ok = room[None, :] & ~(opens & (used.sum() >= max_foods))
+            swap_ok &= x @ sugar + step * (sugar[None, :] - sugar[held, None]) <= sugar_max + 1e-9
+            swap_ok &= x @ sodium + step * (sodium[None, :] - sodium[held, None]) <= sodium_max + 1e-9
+            swap_losses[~swap_ok] = np.inf
+
+            if len(held) and swap_losses.min() < losses[best]:
+                i, j = np.unravel_index(int(np.argmin(swap_losses)), swap_losses.shape)
+                if not swap_losses[i, j] < loss - 1e-9:
+                    break
+                x[held[i]] -= step
+                x[j] += step
+                totals = swaps[i, j]
+                loss = swap_losses[i, j]
+                continue
+            if not losses[best] < loss - 1e-9:
+                break
+            x[best % n] += step if best < n else -step
+            totals = totals + deltas[best]
+            loss = losses[best]
+        return x
+
+    def plan(self, targets, max_servings=3.0, step=0.5, exclude=(), sugar_max=None, sodium_max=None,
+             max_foods=6, candidates=200, solver="auto"):
+        """Foods and servings (multiples of 100 g, in `step`s) closest to `targets`.
+
+        solver: "lp" (needs scipy), "local" or "auto" (lp when scipy is installed).
+        """
+        start = time.perf_counter()
+        goal = np.array(targets, dtype=np.float64)
+        pool = self.candidates(targets, exclude, sugar_max, sodium_max, candidates)
+        A, sugar, sodium = self.nutrients[pool], self.sugar[pool], self.sodium[pool]
+        if solver == "auto":
+            solver = "lp" if lp_available() else "local"
+
+        x = np.zeros(len(pool))
+        if solver == "lp" and len(pool):
+            solved = self._solve_lp(A, goal, max_servings, sugar, sodium, sugar_max, sodium_max)
+            if solved is not None:
+                # Keep the LP's largest foods, rounded down so the caps still hold
+                keep = np.argsort(-solved)[:max_foods]
+                x[keep] = np.floor(solved[keep] / step + 1e-6) * step
+        if len(pool):
+            x = self._local_search(x, A, goal, max_servings, step, sugar, sodium, sugar_max, sodium_max,
+                                   max_foods)
+
+        chosen = np.flatnonzero(x > 0)
+        rows = self.rows[pool[chosen]]
+        servings = x[chosen]
+        meal = aggregate(self.store, rows, servings)
+        achieved = meal.totals[self.store.columns_of(TARGET_COLUMNS)]
+        error = float(np.mean(np.abs(achieved - goal) / goal))
+        return Plan(rows, servings, meal, error, solver, (time.perf_counter() - start) * 1000)
+
+
+_planner = None
+_planner_lock = threading.Lock()
+
+
+def get_planner():
+    # Densities computed once per process over the shared nutrient store
+    global _planner
+    with _planner_lock:
+        if _planner is None:
+            from dadhichi.nutrition import get_store
+
+            _planner = MealPlanner(get_store())
+        return _planner
@@ -0,0 +1,180 @@
+from itertools import chain
+from operator import attrgetter
+
+import numpy as np
+
+# Number of landmarks produced by MediaPipe Pose
+NUM_LANDMARKS = 33
+
+# MediaPipe PoseLandmark indices used by the Yoga and Train pages
+NOSE = 0
+LEFT_SHOULDER = 11
+RIGHT_SHOULDER = 12
+LEFT_ELBOW = 13
+RIGHT_ELBOW = 14
+LEFT_WRIST = 15
+RIGHT_WRIST = 16
+LEFT_HIP = 23
+RIGHT_HIP = 24
+LEFT_KNEE = 25
+RIGHT_KNEE = 26
+LEFT_ANKLE = 27
+RIGHT_ANKLE = 28
+
+# Joint angles as (a, b, c) triples, the angle is measured at b
+JOINTS = {
+    "left_elbow": (LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST),
+    "right_elbow": (RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST),
+    "left_shoulder": (LEFT_HIP, LEFT_SHOULDER, LEFT_ELBOW),
+    "right_shoulder": (RIGHT_HIP, RIGHT_SHOULDER, RIGHT_ELBOW),
+    "left_arm_raise": (LEFT_WRIST, LEFT_SHOULDER, LEFT_HIP),
+    "right_arm_raise": (RIGHT_WRIST, RIGHT_SHOULDER, RIGHT_HIP),
+    "left_hip": (LEFT_SHOULDER, LEFT_HIP, LEFT_KNEE),
+    "right_hip": (RIGHT_SHOULDER, RIGHT_HIP, RIGHT_KNEE),
+    "left_knee": (LEFT_HIP, LEFT_KNEE, LEFT_ANKLE),
+    "right_knee": (RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE),
+}
+
+# Skeleton edges, the same set as mediapipe.solutions.pose.POSE_CONNECTIONS
+POSE_CONNECTIONS = (
+    (0, 1), (1, 2), (2, 3), (3, 7), (0, 4), (4, 5), (5, 6), (6, 8), (9, 10),
+    (11, 12), (11, 13), (13, 15), (15, 17), (15, 19), (15, 21), (17, 19),
+    (12, 14), (14, 16), (16, 18), (16, 20), (16, 22), (18, 20),
+    (11, 23), (12, 24), (23, 24), (23, 25), (24, 26), (25, 27), (26, 28),
+    (27, 29), (28, 30), (29, 31), (30, 32), (27, 31), (28, 32),
+)
+
+# Point-to-point distances as (a, b) pairs, in normalized image units
+DISTANCES = {
+    "wrists": (LEFT_WRIST, RIGHT_WRIST),
+    "ankles": (LEFT_ANKLE, RIGHT_ANKLE),
+}
+
+
+def calculate_angle(a, b, c, wrap=True):
+    # Scalar angle at b for a single triple of (x, y) points, in degrees
+    radians = np.arctan2(c[1] - b[1], c[0] - b[0]) - np.arctan2(a[1] - b[1], a[0] - b[0])
+    angle = np.abs(radians * 180.0 / np.pi)
+    if wrap and angle > 180.0:
+        angle = 360 - angle
+    return angle
+
+
+def _flat_xy_index(indices):
+    # Flat offsets of (x, y) into a C-contiguous (33, 4) landmark array
+    indices = np.asarray(indices, dtype=np.intp)
+    return np.stack([indices * 4, indices * 4 + 1], axis=-1)
+
+
+class JointKernel:
+    """Batched joint angles and distances for fixed landmark triples / pairs.
+
+    Every angle is two vectors (a - b, c - b) and every distance one vector
+    (a - b), so all of them come out of a single gather + subtract over the
+    flat landmark array. Index and scratch arrays are built once; a call is
+    a fixed handful of in-place ufuncs however many joints are requested.
+    With `wrap=False` angles are the raw |atan2 difference| in [0, 360),
+    which is what the Yoga thresholds were tuned against.
+    """
+
+    def __init__(self, triples=(), pairs=(), wrap=True):
+        triples = np.asarray(triples, dtype=np.intp).reshape(-1, 3)
+        pairs = np.asarray(pairs, dtype=np.intp).reshape(-1, 2)
+        self.wrap = wrap
+        self.n_angles = len(triples)
+        self.n_distances = len(pairs)
+
+        heads = np.concatenate([triples[:, 0], triples[:, 2], pairs[:, 0]])
+        tails = np.concatenate([triples[:, 1], triples[:, 1], pairs[:, 1]])
+        self._heads = _flat_xy_index(heads)
+        self._tails = _flat_xy_index(tails)
+        self._vectors = np.empty(self._heads.shape, dtype=np.float32)
+        self._tail_buf = np.empty(self._tails.shape, dtype=np.float32)
+        self._theta = np.empty(2 * self.n_angles, dtype=np.float32)
+        self._over = np.empty(self.n_angles, dtype=bool)
+
+    def __call__(self, points, angles, distances):
+        flat = points.reshape(-1)
+        v = self._vectors
+        np.take(flat, self._heads, out=v)
+        np.take(flat, self._tails, out=self._tail_buf)
+        np.subtract(v, self._tail_buf, out=v)
+
+        m = self.n_angles
+        if m:
+            theta = self._theta
+            np.arctan2(v[:2 * m, 1], v[:2 * m, 0], out=theta)
+            np.subtract(theta[m:], theta[:m], out=angles)
+            np.abs(angles, out=angles)
+            np.multiply(angles, 180.0 / np.pi, out=angles)
+            if self.wrap:
+                np.greater(angles, 180.0, out=self._over)
+                np.subtract(360.0, angles, out=angles, where=self._over)
+        if self.n_distances:
+            np.hypot(v[2 * m:, 0], v[2 * m:, 1], out=distances)
+        return angles, distances
+
+
+def batch_angles(points, triples, wrap=True):
+    # One-off wrapper for an (N, >=2) point array; loops should keep a JointKernel
+    buf = np.zeros((len(points), 4), dtype=np.float32)
+    buf[:, :2] = np.asarray(points)[:, :2]
+    kernel = JointKernel(triples, wrap=wrap)
+    angles, _ = kernel(buf, np.empty(kernel.n_angles, dtype=np.float32), None)
+    return angles
+
+
+_xyzv = attrgetter("x", "y", "z", "visibility")
+
+
+class PoseFrame:
+    """Per-frame landmark buffer plus the joint angles / distances derived from it.
+
+    The (33, 4) x/y/z/visibility array and the output arrays are allocated
+    once and refilled on every `update`, so a camera loop keeps one
+    PoseFrame around for the whole session. Only the joints and distances
+    named at construction are computed.
+    """
+
+    def __init__(self, joints=None, distances=None, wrap=True):
+        self.joint_names = list(JOINTS if joints is None else joints)
+        self.distance_names = list(DISTANCES if distances is None else distances)
+        self.wrap = wrap
+
+        self.points = np.zeros((NUM_LANDMARKS, 4), dtype=np.float32)
+        self._flat = self.points.reshape(-1)
+        self._kernel = JointKernel([JOINTS[n] for n in self.joint_names],
+                                   [DISTANCES[n] for n in self.distance_names], wrap=wrap)
+        # angles and distances are views into one feature vector so rule
+        # checks can compare everything in a single pass
+        n_angles = len(self.joint_names)
+        self.features = np.zeros(n_angles + len(self.distance_names), dtype=np.float32)
+        self.angles = self.features[:n_angles]
+        self.distances = self.features[n_angles:]
+
+        self._angle_index = {n: i for i, n in enumerate(self.joint_names)}
+        self._distance_index = {n: i for i, n in enumerate(self.distance_names)}
+
+    def load(self, landmarks):
+        # Copy MediaPipe landmarks (anything with x/y/z/visibility) into the buffer
+        self._flat[:] = np.fromiter(chain.from_iterable(map(_xyzv, landmarks)),
+                                    dtype=np.float32, count=NUM_LANDMARKS * 4)
+        return self
+
+    def compute(self):
+        return self._kernel(self.points, self.angles, self.distances)
+
+    def update(self, landmarks):
+        # load + compute, the usual per-frame call
+        self.load(landmarks)
+        return self.compute()
+
+    def angle(self, name):
+        return self.angles[self._angle_index[name]]
+
+    def distance(self, name):
+        return self.distances[self._distance_index[name]]
+
+    def point(self, index):
+        # (x, y) of a single landmark
+        return self.points[index, :2]
@@ -0,0 +1,169 @@
+import contextlib
+import logging
+import threading
+import time
+from collections import defaultdict, namedtuple
+
+import numpy as np
+
+DEFAULT_CONFIG = (1, 0.5, 0.5)
+
+
+def _make_pose(model_complexity, min_detection_confidence, min_tracking_confidence):
+    import mediapipe as mp
+    return mp.solutions.pose.Pose(model_complexity=model_complexity,
+                                  min_detection_confidence=min_detection_confidence,
+                                  min_tracking_confidence=min_tracking_confidence)
+
+
+class PosePool:
+    """Process-wide pool of MediaPipe Pose graphs, keyed by their settings.
+
+    Building a Pose graph costs hundreds of milliseconds, so sessions check
+    one out for the length of a camera run and hand it back afterwards
+    instead of constructing a new one per rerun. The key is
+    (model_complexity, min_detection_confidence, min_tracking_confidence);
+    at most `max_idle` idle graphs are kept per key.
+    """
+
+    def __init__(self, factory=_make_pose, max_idle=4):
+        self.factory = factory
+        self.max_idle = max_idle
+        self.build_times = defaultdict(list)   # key -> seconds per graph build
+        self.in_use = defaultdict(int)
+        self._idle = defaultdict(list)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model_complexity=1, min_detection_confidence=0.5, min_tracking_confidence=0.5):
+        return (int(model_complexity), round(float(min_detection_confidence), 2),
+                round(float(min_tracking_confidence), 2))
+
+    def _build(self, key):
+        start = time.perf_counter()
+        pose = self.factory(*key)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.build_times[key].append(elapsed)
+        logging.info(f"Built Pose graph {key} in {elapsed * 1000:.0f} ms")
+        return pose
+
+    def acquire(self, *args, **kwargs):
+        key = self.key(*args, **kwargs)
+        with self._lock:
+            pose = self._idle[key].pop() if self._idle[key] else None
+            self.in_use[key] += 1
+        if pose is None:
+            try:
+                pose = self._build(key)
+            except Exception:
+                with self._lock:
+                    self.in_use[key] -= 1
+                raise
+        return key, pose
+
+    def release(self, key, pose):
+        # Drop tracking state so the next session starts from a fresh detection
+        reset = getattr(pose, "reset", None)
+        if reset is not None:
+            reset()
+        with self._lock:
+            self.in_use[key] -= 1
+            if len(self._idle[key]) < self.max_idle:
+                self._idle[key].append(pose)
+                return
+        pose.close()
+
+    @contextlib.contextmanager
+    def checkout(self, *args, **kwargs):
+        key, pose = self.acquire(*args, **kwargs)
+        try:
+            yield pose
+        finally:
+            self.release(key, pose)
+
+    def warm_up(self, configs=(DEFAULT_CONFIG,), frame_size=(256, 256)):
+        # Build one graph per config and push a blank frame through it
+        blank = np.zeros(frame_size + (3,), dtype=np.uint8)
+        for config in configs:
+            with self.checkout(*config) as pose:
+                pose.process(blank)
+
+    def last_build_ms(self, *args, **kwargs):
+        times = self.build_times.get(self.key(*args, **kwargs))
+        return times[-1] * 1000 if times else None
+
+
+class PoseLease:
+    """A pooled Pose held across reruns for a stream the script doesn't loop over.
+
+    WebRTC frames arrive on streamlit-webrtc's own thread while the script
+    only reruns on widget changes, so no `with pool.checkout()` block can
+    span the stream. The page keeps a lease in `st.session_state` and on
+    every rerun calls `hold(config)` while the stream plays (a new config
+    hands the old graph back and takes a matching one) or `release()`
+    once it stops. `process` is a drop-in for `pose.process` that reports
+    no pose while nothing is held; it runs under the same lock as release,
+    so a graph is never returned to the pool mid-inference.
+    """
+
+    _NO_POSE = namedtuple("NoPose", ["pose_landmarks"])(None)
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.key = None
+        self.pose = None
+        self._lock = threading.Lock()
+
+    def hold(self, *args, **kwargs):
+        key = self.pool.key(*args, **kwargs)
+        if key == self.key:
+            return self.pose
+        acquired = self.pool.acquire(*key)
+        with self._lock:
+            previous = (self.key, self.pose)
+            self.key, self.pose = acquired
+        if previous[1] is not None:
+            self.pool.release(*previous)
+        return self.pose
+
+    def release(self):
+        with self._lock:
+            key, pose = self.key, self.pose
+            self.key = self.pose = None
+        if pose is not None:
+            self.pool.release(key, pose)
+
+    def process(self, image):
+        with self._lock:
+            if self.pose is None:
+                return self._NO_POSE
+            return self.pose.process(image)
+
+    def reset(self):
+        # Drop the held graph's tracking state (RoiTracker does this when its crop moves)
+        with self._lock:
+            if self.pose is not None and hasattr(self.pose, "reset"):
+                self.pose.reset()
+
+    def __del__(self):
+        # Session state dropped while a stream still held a graph
+        self.release()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(warm=True):
+    # One pool per process; the first caller pays for warming the default graph
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PosePool()
+            if warm:
+                try:
+                    _pool.warm_up()
+                except Exception as e:
+                    logging.error(f"Pose pool warm-up failed: {e}")
+        return _pool
@@ -0,0 +1,183 @@
+import logging
+import threading
+import time
+from collections import deque, namedtuple
+
+import cv2
+import numpy as np
+
+# A quality tier: the Pose model to run and the frame width it sees (None: as captured)
+Tier = namedtuple("Tier", ["name", "model_complexity", "input_width"])
+
+TIERS = (
+    Tier("lite", 0, 480),
+    Tier("full", 1, 640),
+    Tier("heavy", 2, None),
+)
+
+# Controllers currently running, for the metrics gauge; every session of a page has its own
+_active = set()
+_active_lock = threading.Lock()
+# Loop names seen so far, so each keeps reporting 0 for tiers nobody is on
+_names = set()
+
+
+def _tier_gauge():
+    # Sessions per loop name and tier, e.g. {"yoga/lite": 2, "yoga/full": 1, "yoga/heavy": 0}
+    with _active_lock:
+        counts = {f"{name}/{tier.name}": 0 for name in sorted(_names) for tier in TIERS}
+        for controller in _active:
+            label = f"{controller.name}/{controller.tier.name}"
+            counts[label] = counts.get(label, 0) + 1
+        return counts
+
+
+class QualityController:
+    """Drop-in `pose.process` that picks the Pose model tier to hold a target FPS.
+
+    Inference latency is averaged over the last `window` frames. Above the
+    frame budget (1 / target_fps) the controller steps down a tier; below
+    `up_ratio` of the budget it steps up, unless that tier was measured
+    over budget in the last `relearn` seconds. That memory, the gap
+    between the two thresholds, the full window needed before any
+    decision and the `cooldown` after a switch keep it from flapping
+    between tiers. The next tier's graph is
+    checked out of the pose pool on a background thread, so frames keep
+    flowing through the current one while it builds.
+
+        with QualityController(pose_pool, name="yoga") as inference:
+            results = inference.process(image)
+    """
+
+    def __init__(self, pool, name, target_fps=15.0, tiers=TIERS, start=1, min_detection_confidence=0.5,
+                 min_tracking_confidence=0.5, window=30, up_ratio=0.45, cooldown=5.0, relearn=120.0,
+                 clock=time.monotonic):
+        self.pool = pool
+        self.name = name
+        self.budget = 1.0 / target_fps
+        self.tiers = tiers
+        self.confidence = (min_detection_confidence, min_tracking_confidence)
+        self.up_ratio = up_ratio
+        self.cooldown = cooldown
+        self.relearn = relearn
+        self.clock = clock
+
+        self.level = start
+        self.switches = 0
+        self._latency = deque(maxlen=window)
+        self._measured = {}           # level -> (mean latency, when) from the last time it ran
+        self._last_switch = clock()
+        self._pending = None          # [level, (key, pose) or None] while a graph is being checked out
+        self._resized = None
+        self._lock = threading.Lock()
+        self._key, self.pose = pool.acquire(self.tier.model_complexity, *self.confidence)
+
+        from dadhichi.metrics import registry
+        with _active_lock:
+            _active.add(self)
+            _names.add(name)
+        registry.add_gauge("quality_tier_sessions", "Sessions running each Pose model tier picked by the quality "
+                           "controller.", _tier_gauge)
+
+    @property
+    def tier(self):
+        return self.tiers[self.level]
+
+    @property
+    def latency_ms(self):
+        return float(np.mean(self._latency)) * 1000 if self._latency else 0.0
+
+    def label(self):
+        return f"model: {self.tier.name} ({self.tier.model_complexity})"
+
+    def _prepare(self, image):
+        width = self.tier.input_width
+        h, w = image.shape[:2]
+        if width is None or w <= width:
+            return image
+        size = (width, round(h * width / w))
+        if self._resized is None or self._resized.shape[:2] != size[::-1]:
+            self._resized = np.empty(size[::-1] + image.shape[2:], dtype=image.dtype)
+        self._resized.flags.writeable = True
+        resized = cv2.resize(image, size, dst=self._resized, interpolation=cv2.INTER_AREA)
+        resized.flags.writeable = False
+        return resized
+
+    def _checkout(self, pending):
+        try:
+            acquired = self.pool.acquire(self.tiers[pending[0]].model_complexity, *self.confidence)
+        except Exception as e:
+            logging.error(f"Quality controller could not build tier {self.tiers[pending[0]].name}: {e}")
+            acquired = False
+        with self._lock:
+            closed = self.pose is None
+            pending[1] = acquired
+        if closed and acquired:
+            # Controller closed while the graph was building
+            self.pool.release(*acquired)
+
+    def _decide(self):
+        now = self.clock()
+        if (self._pending is not None or len(self._latency) < self._latency.maxlen
+                or now - self._last_switch < self.cooldown):
+            return
+        mean = float(np.mean(self._latency))
+        self._measured[self.level] = (mean, now)
+        if mean > self.budget and self.level > 0:
+            level = self.level - 1
+        elif mean < self.budget * self.up_ratio and self.level < len(self.tiers) - 1:
+            level = self.level + 1
+            known, when = self._measured.get(level, (0.0, -np.inf))
+            if known > self.budget and now - when < self.relearn:
+                return
+        else:
+            return
+        self._pending = [level, None]
+        threading.Thread(target=self._checkout, args=(self._pending,), name="quality-checkout",
+                         daemon=True).start()
+
+    def _swap(self):
+        level, acquired = self._pending
+        self._pending = None
+        self._last_switch = self.clock()
+        if not acquired:
+            return
+        self.pool.release(self._key, self.pose)
+        self._key, self.pose = acquired
+        logging.info(f"{self.name}: switching Pose from {self.tier.name} to {self.tiers[level].name} "
+                     f"({self.latency_ms:.0f} ms per frame, budget {self.budget * 1000:.0f} ms)")
+        self.level = level
+        self.switches += 1
+        self._latency.clear()
+
+    def process(self, image):
+        if self._pending is not None and self._pending[1] is not None:
+            self._swap()
+        image = self._prepare(image)
+        start = self.clock()
+        results = self.pose.process(image)
+        self._latency.append(self.clock() - start)
+        self._decide()
+        return results
+
+    def reset(self):
+        # Drop the current graph's tracking state (RoiTracker does this when its crop moves)
+        if hasattr(self.pose, "reset"):
+            self.pose.reset()
+
+    def close(self):
+        with _active_lock:
+            _active.discard(self)
+        with self._lock:
+            pose, self.pose = self.pose, None
+            pending = self._pending
+        if pending is not None and pending[1]:
+            self.pool.release(*pending[1])
+        if pose is not None:
+            self.pool.release(self._key, pose)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,219 @@
+"""Compact landmark recordings of camera sessions, and replay through the rules.
+
+A recording is a standard .npy file holding a fixed-size ring of records
+(one per frame) plus a small JSON sidecar with the joint / verdict names.
+Landmarks are quantized to int16 x/y/z and uint8 visibility, angles are
+float16 and verdicts are packed bits, about 250 bytes per frame. The file
+is memory-mapped, so `append` is a few array stores into the page cache.
+
+    python -m dadhichi.recording recordings/yoga-20240101-120000-3f9a1c2e.npy [--track "Track 1"] [--exercise Squat]
+
+Replays a recording through the asana rules and rep engine and prints the
+verdict / rep summary. Run from the models/ directory.
+"""
+import argparse
+import json
+import os
+import time
+import uuid
+
+import numpy as np
+
+from dadhichi.asanas import TRACKS, TrackRules
+from dadhichi.pose_math import NUM_LANDMARKS, PoseFrame
+from dadhichi.reps import EXERCISES, RepEngine
+
+# Where the camera pages put their recordings (relative to models/)
+RECORDINGS_DIR = "recordings"
+
+# Landmark coordinates are stored as int16 in units of 1/XYZ_SCALE (range +-4, ~0.1 px at 640 px)
+XYZ_SCALE = 8192
+
+
+def record_dtype(n_angles, n_verdicts):
+    return np.dtype([
+        ("seq", np.uint32),                       # 1-based frame number, 0 marks an empty slot
+        ("t_ms", np.uint32),                      # milliseconds since the recording started
+        ("detected", np.bool_),
+        ("xyz", np.int16, (NUM_LANDMARKS, 3)),
+        ("visibility", np.uint8, (NUM_LANDMARKS,)),
+        ("angles", np.float16, (n_angles,)),
+        ("verdicts", np.uint8, ((n_verdicts + 7) // 8,)),
+    ])
+
+
+def _sidecar(path):
+    return path + ".json"
+
+
+class LandmarkRecorder:
+    """Appends one quantized record per frame to a memory-mapped ring file.
+
+    `capacity` frames are kept (default: 10 minutes at 30 fps); older ones
+    are overwritten. Not thread-safe: call `append` from the thread that
+    runs inference and `close` once the loop has stopped.
+
+    Frame times are kept as milliseconds since the recorder was created.
+    `append` stamps each frame with `clock` unless given a `timestamp` on
+    that same clock, or `elapsed`, seconds since the start of the
+    recording (e.g. `i / fps` when recording a video file).
+    """
+
+    def __init__(self, path, capacity=18000, joints=(), verdicts=(), clock=time.monotonic):
+        self.path = path
+        self.capacity = capacity
+        self.clock = clock
+        self.frames = 0
+        self._start = clock()
+        self._records = np.lib.format.open_memmap(path, mode="w+", dtype=record_dtype(len(joints), len(verdicts)),
+                                                  shape=(capacity,))
+        with open(_sidecar(path), "w") as f:
+            json.dump({"capacity": capacity, "xyz_scale": XYZ_SCALE, "joints": list(joints),
+                       "verdicts": list(verdicts)}, f)
+
+        # Field views and scratch buffers, so append allocates nothing
+        self._seq = self._records["seq"]
+        self._t_ms = self._records["t_ms"]
+        self._detected = self._records["detected"]
+        self._xyz = self._records["xyz"]
+        self._visibility = self._records["visibility"]
+        self._angles = self._records["angles"]
+        self._verdicts = self._records["verdicts"]
+        self._scaled = np.empty((NUM_LANDMARKS, 4), dtype=np.float32)
+        self._scale = np.array([XYZ_SCALE, XYZ_SCALE, XYZ_SCALE, 255], dtype=np.float32)
+        self._lo = np.array([-32768, -32768, -32768, 0], dtype=np.float32)
+        self._hi = np.array([32767, 32767, 32767, 255], dtype=np.float32)
+
+    def append(self, points=None, angles=None, verdicts=None, timestamp=None, elapsed=None):
+        """Record one frame; `points` is a (33, 4) landmark array or None when no pose was found."""
+        if elapsed is None:
+            elapsed = (self.clock() if timestamp is None else timestamp) - self._start
+        t_ms = int(elapsed * 1000)
+        if not 0 <= t_ms <= 0xFFFFFFFF:
+            raise ValueError(f"Frame time {elapsed:.3f}s is outside the recording; pass `timestamp` on the "
+                             f"recorder's clock or `elapsed` seconds since its start")
+        i = self.frames % self.capacity
+        self.frames += 1
+        self._seq[i] = self.frames
+        self._t_ms[i] = t_ms
+        self._detected[i] = points is not None
+        if points is None:
+            return
+        # Quantize x/y/z/visibility in one pass, then store into the two fields
+        scaled = self._scaled
+        np.multiply(points, self._scale, out=scaled)
+        np.rint(scaled, out=scaled)
+        np.minimum(scaled, self._hi, out=scaled)
+        np.maximum(scaled, self._lo, out=scaled)
+        self._xyz[i] = scaled[:, :3]
+        self._visibility[i] = scaled[:, 3]
+        if angles is not None:
+            self._angles[i] = angles
+        if verdicts is not None:
+            self._verdicts[i] = np.packbits(verdicts)
+
+    def flush(self):
+        self._records.flush()
+
+    def close(self):
+        if self._records is not None:
+            self._records.flush()
+            self._records = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def new_recording(page, directory=RECORDINGS_DIR, **kwargs):
+    # Timestamped recorder for one camera session of `page`; the random suffix keeps
+    # sessions started within the same second from opening (and truncating) one file
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{page}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.npy")
+    return LandmarkRecorder(path, **kwargs)
+
+
+def load_recording(path):
+    """Read a recording back in frame order; returns a dict of dequantized arrays."""
+    with open(_sidecar(path)) as f:
+        meta = json.load(f)
+    records = np.load(path, mmap_mode="r")
+    order = np.argsort(records["seq"])
+    order = order[records["seq"][order] > 0]
+    records = records[order]
+
+    points = np.empty((len(records), NUM_LANDMARKS, 4), dtype=np.float32)
+    points[..., :3] = records["xyz"] / np.float32(meta["xyz_scale"])
+    points[..., 3] = records["visibility"] / np.float32(255)
+    points[~records["detected"]] = np.nan
+    verdicts = np.unpackbits(records["verdicts"], axis=1, count=len(meta["verdicts"])).astype(bool)
+    return {
+        "timestamp_ms": records["t_ms"].astype(np.int64),
+        "detected": records["detected"].copy(),
+        "landmarks": points,
+        "angles": records["angles"].astype(np.float32),
+        "verdicts": verdicts,
+        "joint_names": meta["joints"],
+        "verdict_names": meta["verdicts"],
+    }
+
+
+def replay(recording, track=None, exercises=()):
+    """Feed a loaded recording back through a track's rules and the rep engine.
+
+    Runs as fast as the CPU allows; timestamps come from the recording, so
+    rep tempo and minimum durations behave as they did live.
+    """
+    rules = TrackRules(TRACKS[track]) if track else None
+    engine = RepEngine([EXERCISES[name] for name in exercises]) if exercises else None
+    rep_frame = PoseFrame(joints=engine.joints, distances=[]) if engine else None
+
+    detected = recording["detected"]
+    verdicts = np.zeros((len(detected), len(rules) if rules else 0), dtype=bool)
+    events = []
+    for i in np.flatnonzero(detected):
+        points = recording["landmarks"][i]
+        if rules is not None:
+            rules.pose_frame.points[:] = points
+            rules.pose_frame.compute()
+            verdicts[i] = rules.check(rules.pose_frame.features)
+        if engine is not None:
+            rep_frame.points[:] = points
+            rep_frame.compute()
+            events.extend(engine.update(rep_frame.angles, recording["timestamp_ms"][i] / 1000))
+    return {
+        "verdicts": verdicts,
+        "asana_names": [a.name for a in rules.asanas] if rules else [],
+        "events": events,
+        "reps": {name: engine.reps(name) for name in exercises} if engine else {},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a landmark recording through the rules and rep engine")
+    parser.add_argument("recording")
+    parser.add_argument("--track", choices=sorted(TRACKS))
+    parser.add_argument("--exercise", action="append", default=[], choices=sorted(EXERCISES))
+    args = parser.parse_args(argv)
+
+    recording = load_recording(args.recording)
+    start = time.perf_counter()
+    result = replay(recording, args.track, args.exercise)
+    elapsed = time.perf_counter() - start
+
+    frames = len(recording["detected"])
+    duration = (recording["timestamp_ms"][-1] - recording["timestamp_ms"][0]) / 1000 if frames else 0.0
+    print(f"{frames} frames ({int(recording['detected'].sum())} with pose) covering {duration:.1f}s, "
+          f"replayed in {elapsed * 1000:.1f} ms ({duration / elapsed if elapsed else 0:.0f}x real time)")
+    for name, held in zip(result["asana_names"], result["verdicts"].sum(axis=0)):
+        print(f"{name}: correct on {held} frames")
+    for name, reps in result["reps"].items():
+        print(f"{name}: {reps} reps")
+    for event in result["events"]:
+        print(f"  {event.timestamp:7.2f}s {event.exercise} {event.side} #{event.count} ({event.duration:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
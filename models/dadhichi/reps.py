@@ -0,0 +1,132 @@
+from collections import namedtuple
+
+import numpy as np
+
+# An exercise is plain data, like an Asana: the joint it is counted on
+# (a pose_math.JOINTS name without the side prefix), the angle it has to
+# open past and close below, and which of the two ends completes a rep.
+# `hysteresis` is an extra margin in degrees a threshold must be crossed
+# by, `min_rep` the shortest rep in seconds that is still counted (faster
+# flips are landmark jitter). Bilateral exercises move both sides together
+# (a two-arm curl, a squat) and report the better side; only exercises done
+# as separate sets per side add the two up.
+Exercise = namedtuple("Exercise", ["name", "joint", "open_above", "close_below", "open_stage", "closed_stage",
+                                   "count_on", "hysteresis", "min_rep", "bilateral"])
+RepEvent = namedtuple("RepEvent", ["exercise", "side", "count", "timestamp", "duration"])
+
+SIDES = ("left", "right")
+
+EXERCISES = {
+    "Bicep Curl": Exercise("Bicep Curl", "elbow", open_above=150, close_below=40, open_stage="down",
+                           closed_stage="up", count_on="closed", hysteresis=0, min_rep=0.4, bilateral=True),
+    "Squat": Exercise("Squat", "knee", open_above=160, close_below=100, open_stage="up",
+                      closed_stage="down", count_on="open", hysteresis=5, min_rep=0.8, bilateral=True),
+    "Push-up": Exercise("Push-up", "elbow", open_above=155, close_below=95, open_stage="up",
+                        closed_stage="down", count_on="open", hysteresis=5, min_rep=0.6, bilateral=True),
+}
+
+# Per-track states
+_NONE, _OPEN, _CLOSED = 0, 1, 2
+_NO_EVENTS = ()
+
+
+class RepEngine:
+    """Streaming rep counter for several exercises, both sides, in one pass.
+
+    Every (exercise, side) pair is one track; thresholds, states and
+    counts are arrays over tracks, so `update` is a handful of vectorized
+    compares on the angle vector a PoseFrame already computed:
+
+        engine = RepEngine([EXERCISES["Squat"], EXERCISES["Push-up"]])
+        pose_frame = PoseFrame(joints=engine.joints, distances=[])
+        ...
+        pose_frame.update(landmarks)
+        for event in engine.update(pose_frame.angles, time.monotonic()):
+            ...
+
+    `update` returns RepEvents for the reps completed on this frame (almost
+    always none), each with its timestamp and duration since the previous
+    rep on that track.
+    """
+
+    def __init__(self, exercises, sides=SIDES):
+        self.exercises = list(exercises)
+        self.sides = tuple(sides)
+        tracks = [(ex, side) for ex in self.exercises for side in self.sides]
+        self.joints = list(dict.fromkeys(f"{side}_{ex.joint}" for ex, side in tracks))
+        self._tracks = tracks
+        self._columns = np.array([self.joints.index(f"{side}_{ex.joint}") for ex, side in tracks], dtype=np.intp)
+        self._open = np.array([ex.open_above + ex.hysteresis for ex, _ in tracks], dtype=np.float32)
+        self._close = np.array([ex.close_below - ex.hysteresis for ex, _ in tracks], dtype=np.float32)
+        self._count_state = np.array([_CLOSED if ex.count_on == "closed" else _OPEN for ex, _ in tracks],
+                                     dtype=np.int8)
+        self._min_rep = np.array([ex.min_rep for ex, _ in tracks], dtype=np.float64)
+        self._slices = {ex.name: slice(i * len(self.sides), (i + 1) * len(self.sides))
+                        for i, ex in enumerate(self.exercises)}
+        self.reset()
+
+    def reset(self):
+        n = len(self._tracks)
+        self.state = np.zeros(n, dtype=np.int8)
+        self.counts = np.zeros(n, dtype=np.int32)
+        self.last_rep = np.full(n, np.nan)     # timestamp of the last counted rep
+        self.started = np.full(n, np.nan)      # when the first rep reached the far end
+        self.last_duration = np.zeros(n)
+        self.events = []
+
+    def update(self, angles, timestamp):
+        """Feed one frame's angle vector (ordered like `joints`); returns new RepEvents."""
+        a = angles[self._columns]
+        state = self.state
+        new = np.where(a > self._open, _OPEN, np.where(a < self._close, _CLOSED, state)).astype(np.int8)
+        changed = new != state
+        if not changed.any():
+            return _NO_EVENTS
+
+        # Reaching the far end first starts the clock; arriving back at the counting end completes a rep
+        first = changed & (new != self._count_state) & np.isnan(self.started)
+        self.started[first] = timestamp
+        arriving = changed & (new == self._count_state) & (state != _NONE)
+        self.state = new
+        if not arriving.any():
+            return _NO_EVENTS
+
+        since = np.where(np.isnan(self.last_rep), self.started, self.last_rep)
+        duration = timestamp - since
+        counted = arriving & (duration >= self._min_rep)
+        events = []
+        for i in np.flatnonzero(counted):
+            self.counts[i] += 1
+            self.last_rep[i] = timestamp
+            self.last_duration[i] = duration[i]
+            ex, side = self._tracks[i]
+            events.append(RepEvent(ex.name, side, int(self.counts[i]), timestamp, float(duration[i])))
+        self.events.extend(events)
+        return events
+
+    def reps(self, name):
+        counts = self.counts[self._slices[name]]
+        ex = self.exercises[[e.name for e in self.exercises].index(name)]
+        return int(counts.max() if ex.bilateral else counts.sum())
+
+    def counting_side(self, name):
+        # Side the reported count comes from: most reps, then the latest rep, else the first side
+        sl = self._slices[name]
+        last = np.nan_to_num(self.last_rep[sl], nan=-np.inf)
+        best = max(range(len(self.sides)), key=lambda i: (self.counts[sl][i], last[i], -i))
+        return self.sides[best]
+
+    def stage(self, name, side=None):
+        # Stage label of one side (default: the first), None before the first threshold is crossed
+        sl = self._slices[name]
+        i = sl.start + (self.sides.index(side) if side else 0)
+        ex = self._tracks[i][0]
+        return {_OPEN: ex.open_stage, _CLOSED: ex.closed_stage}.get(int(self.state[i]))
+
+    def tempo(self, name):
+        # Seconds per rep of the most recent rep on any side, 0 before the first
+        sl = self._slices[name]
+        last = self.last_rep[sl]
+        if np.isnan(last).all():
+            return 0.0
+        return float(self.last_duration[sl][np.nanargmax(last)])
@@ -0,0 +1,136 @@
+import cv2
+import numpy as np
+
+from dadhichi.adaptive import PoseResult, fill_landmark_list, new_landmark_list
+from dadhichi.pose_math import PoseFrame
+
+
+class RoiTracker:
+    """Drop-in wrapper for `mp_pose.Pose` that runs it on a crop around the user.
+
+    The previous frame's landmarks give a square box around the body,
+    padded by `padding` of its size on every side. Only that crop, resized
+    to `input_size` (the landmark model's input), goes to the pose graph,
+    so a user standing far from the camera fills the model input instead
+    of a few dozen pixels of it. Landmarks are mapped back to full-frame
+    coordinates before they are returned.
+
+    Tracking is dropped, and the same frame retried on the full image,
+    when the crop yields no pose or too few visible landmarks. The full
+    frame is also used when the box would cover most of it anyway.
+
+    The box stays put while the body stays inside it with a margin and
+    still fills at least `min_fill` of it. Only then is it re-centered. In
+    video mode the graph smooths landmarks and tracks the body from frame
+    to frame, so it must see one steady view: a crop that moved every
+    frame would look like the body jumping. Whenever the view changes
+    (new box, or between crop and full frame), the graph's `reset()` is
+    called when it has one. That costs a fresh detection on the next
+    frame, which is why the box moves as rarely as possible.
+
+        inference = RoiTracker(pose)
+        results = inference.process(image)   # instead of pose.process(image)
+    """
+
+    def __init__(self, pose, padding=0.25, input_size=256, min_visibility=0.5, min_landmarks=8,
+                 max_coverage=0.8, min_fill=0.7):
+        self.pose = pose
+        self.padding = padding
+        self.input_size = input_size
+        self.min_visibility = min_visibility
+        self.min_landmarks = min_landmarks
+        self.max_coverage = max_coverage
+        self.min_fill = min_fill
+
+        self.box = None          # (x0, y0, side) in pixels of the current crop
+        self.cropped = 0
+        self.full_frames = 0
+        self.lost = 0
+        self.resets = 0
+
+        self._frame = PoseFrame(joints=[], distances=[])
+        self._crop = np.empty((input_size, input_size, 3), dtype=np.uint8)
+        self._landmarks = new_landmark_list()
+
+    def _next_box(self, points, width, height):
+        # Padded square around the visible landmarks, or None to use the full frame
+        visible = points[:, 3] >= self.min_visibility
+        if np.count_nonzero(visible) < self.min_landmarks:
+            return None
+        xs = points[visible, 0] * width
+        ys = points[visible, 1] * height
+        side = max(xs.max() - xs.min(), ys.max() - ys.min()) * (1 + 2 * self.padding)
+        if side * side > self.max_coverage * width * height or side >= min(width, height):
+            return None
+        side = int(side)
+        # Shift the box back inside the frame rather than shrinking it
+        x0 = min(max(int((xs.min() + xs.max() - side) / 2), 0), width - side)
+        y0 = min(max(int((ys.min() + ys.max() - side) / 2), 0), height - side)
+        return x0, y0, side
+
+    def _keeps(self, points, width, height):
+        # The current box still holds the body, half its padding to spare, and isn't far too big for it
+        x0, y0, side = self.box
+        visible = points[:, 3] >= self.min_visibility
+        if np.count_nonzero(visible) < self.min_landmarks:
+            return False
+        xs = (points[visible, 0] * width - x0) / side
+        ys = (points[visible, 1] * height - y0) / side
+        margin = self.padding / (1 + 2 * self.padding) / 2
+        if min(xs.min(), ys.min()) < margin or max(xs.max(), ys.max()) > 1 - margin:
+            return False
+        extent = max(xs.max() - xs.min(), ys.max() - ys.min())
+        return extent * (1 + 2 * self.padding) >= self.min_fill
+
+    def _reset(self):
+        # The graph is about to see a different view; drop its smoothing and tracking state
+        reset = getattr(self.pose, "reset", None)
+        if reset is not None:
+            reset()
+        self.resets += 1
+
+    def _run(self, image, box):
+        if box is None:
+            self.full_frames += 1
+            results = self.pose.process(image)
+            if results.pose_landmarks is None:
+                return None
+            return self._frame.load(results.pose_landmarks.landmark).points
+
+        x0, y0, side = box
+        crop = cv2.resize(image[y0:y0 + side, x0:x0 + side], (self.input_size, self.input_size),
+                          dst=self._crop, interpolation=cv2.INTER_AREA)
+        crop.flags.writeable = False
+        self.cropped += 1
+        results = self.pose.process(crop)
+        crop.flags.writeable = True
+        if results.pose_landmarks is None:
+            return None
+
+        # Crop-normalized -> frame-normalized; z shares x's scale (image width)
+        height, width = image.shape[:2]
+        points = self._frame.load(results.pose_landmarks.landmark).points
+        points[:, 0] = (x0 + points[:, 0] * side) / width
+        points[:, 1] = (y0 + points[:, 1] * side) / height
+        points[:, 2] *= side / width
+        return points
+
+    def process(self, image):
+        height, width = image.shape[:2]
+        box = self.box
+        points = self._run(image, box)
+        if points is None and box is not None:
+            # Lost the user inside the crop: detect on the whole frame right away
+            self.lost += 1
+            self._reset()
+            box = None
+            points = self._run(image, None)
+
+        if points is None:
+            self.box = None
+            return PoseResult(None, False)
+        if box is None or not self._keeps(points, width, height):
+            self.box = self._next_box(points, width, height)
+            if self.box != box:
+                self._reset()
+        return PoseResult(fill_landmark_list(self._landmarks, points), False)
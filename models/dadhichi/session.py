@@ -0,0 +1,61 @@
+import time
+
+
+class YogaSession:
+    """Hold timer and pose progression for one user working through a track.
+
+    One instance lives in each user's `st.session_state`, so concurrent
+    sessions in the same process never share timers. Holds are measured
+    with a monotonic clock (wall-clock jumps can't skip or stall a pose)
+    and `update` does no string formatting; TIME labels are built once.
+    """
+
+    __slots__ = ("num_poses", "clock", "pose_number", "counter", "finished", "_hold_start", "_labels")
+
+    def __init__(self, num_poses, clock=time.monotonic, max_hold=60):
+        self.num_poses = num_poses
+        self.clock = clock
+        self._labels = [f"TIME: {i}s" for i in range(max_hold + 1)]
+        self.reset()
+
+    def reset(self):
+        self.pose_number = 1      # 1-based, like the page shows it
+        self.counter = 0          # whole seconds the current pose has been held
+        self.finished = False
+        self._hold_start = None
+
+    @property
+    def index(self):
+        # 0-based position of the current pose in the track
+        return self.pose_number - 1
+
+    @property
+    def time_label(self):
+        return self._labels[min(self.counter, len(self._labels) - 1)]
+
+    def update(self, correct, hold):
+        """Advance the hold timer for one frame.
+
+        Returns True on the frame the current pose completes its `hold`
+        seconds and the session moves on to the next pose.
+        """
+        if self.finished:
+            return False
+        if not correct:
+            self._hold_start = None
+            self.counter = 0
+            return False
+
+        now = self.clock()
+        if self._hold_start is None:
+            self._hold_start = now
+        elapsed = now - self._hold_start
+        self.counter = int(elapsed)
+        if elapsed < hold:
+            return False
+
+        self._hold_start = None
+        self.counter = 0
+        self.pose_number += 1
+        self.finished = self.pose_number > self.num_poses
+        return True
@@ -0,0 +1,147 @@
+import time
+
+import cv2
+import numpy as np
+
+CODECS = {
+    "jpeg": (".jpg", cv2.IMWRITE_JPEG_QUALITY),
+    "webp": (".webp", cv2.IMWRITE_WEBP_QUALITY),
+}
+
+
+class FrameTransport:
+    """Pushes annotated frames to a Streamlit placeholder as pre-encoded images.
+
+    `st.image` on a raw BGR array converts it to PIL and re-encodes it on
+    every call. Here the frame is downscaled once to `preview_width`,
+    encoded with OpenCV (`codec` / `quality`) and handed over as bytes.
+    Display is capped at `max_fps` independently of processing, and frames
+    whose thumbnail barely differs from the last one sent (mean absolute
+    difference below `skip_threshold`) are not sent at all.
+
+    The thumbnail should come from the raw camera frame: pass
+    `thumb=transport.thumbnail(frame)` taken before the HUD is drawn, or a
+    user holding still would also freeze the timer and labels drawn over
+    them. `hud` is any comparable summary of what the overlay shows (hold
+    time, verdict, current asana); when it differs from the last frame
+    sent, the static skip is bypassed (the `max_fps` cap still applies).
+    """
+
+    def __init__(self, placeholder, codec="jpeg", quality=75, preview_width=640, max_fps=15.0,
+                 skip_threshold=1.0, clock=time.monotonic):
+        self.placeholder = placeholder
+        self.extension, quality_flag = CODECS[codec]
+        self.params = [quality_flag, int(quality)]
+        self.preview_width = preview_width
+        self.interval = 1.0 / max_fps if max_fps else 0.0
+        self.skip_threshold = skip_threshold
+        self.clock = clock
+
+        self.sent = 0
+        self.skipped_rate = 0
+        self.skipped_static = 0
+        self.bytes_sent = 0
+
+        self._last_sent = None
+        self._preview = None
+        self._last_thumb = None
+        self._last_hud = None
+
+    def _downscale(self, image):
+        h, w = image.shape[:2]
+        if w <= self.preview_width:
+            return image
+        size = (self.preview_width, round(h * self.preview_width / w))
+        if self._preview is None or self._preview.shape[:2] != size[::-1]:
+            self._preview = np.empty(size[::-1] + image.shape[2:], dtype=image.dtype)
+        return cv2.resize(image, size, dst=self._preview, interpolation=cv2.INTER_AREA)
+
+    @staticmethod
+    def thumbnail(image):
+        # 32x24 grayscale summary for the static test; take it before drawing on the frame
+        return cv2.cvtColor(cv2.resize(image, (32, 24), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+
+    def _is_static(self, thumb):
+        return (self._last_thumb is not None
+                and cv2.norm(thumb, self._last_thumb, cv2.NORM_L1) / thumb.size < self.skip_threshold)
+
+    def encode(self, image):
+        ok, buf = cv2.imencode(self.extension, self._downscale(image), self.params)
+        if not ok:
+            raise ValueError(f"Could not encode frame as {self.extension}")
+        return buf.tobytes()
+
+    def send(self, image, force=False, thumb=None, hud=None):
+        # Returns True if the frame went out to the browser
+        now = self.clock()
+        if thumb is None:
+            thumb = self.thumbnail(image)
+        if not force:
+            if self._last_sent is not None and now - self._last_sent < self.interval:
+                self.skipped_rate += 1
+                return False
+            if (hud is None or hud == self._last_hud) and self._is_static(thumb):
+                self.skipped_static += 1
+                return False
+
+        data = self.encode(image)
+        self.placeholder.image(data, use_column_width=True)
+        self._last_sent = now
+        self._last_thumb = thumb
+        self._last_hud = hud
+        self.sent += 1
+        self.bytes_sent += len(data)
+        return True
+
+
+def sidebar_settings():
+    # Shared transport widgets for the camera pages
+    import streamlit as st
+
+    with st.sidebar.expander("Video transport"):
+        settings = {
+            "codec": st.selectbox("Codec", list(CODECS)),
+            "quality": st.slider("Quality", 30, 95, 75, 5),
+            "preview_width": st.select_slider("Preview width", [320, 480, 640, 800, 1280], 640),
+            "max_fps": st.slider("Max display FPS", 5, 30, 15),
+        }
+        modes = ["Streamlit image"] + (["WebRTC (peer-to-peer)"] if webrtc_available() else [])
+        mode = st.radio("Transport", modes)
+    return mode, settings
+
+
+def webrtc_available():
+    try:
+        import streamlit_webrtc  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def run_webrtc(key, process, release=None):
+    """Optional peer-to-peer path: the browser streams its camera over WebRTC
+    and gets the processed frames back on the same connection, skipping
+    Streamlit's image pipeline entirely. `process` maps a BGR frame to a
+    BGR frame; `release` (e.g. FrameBuffers.release) gets that frame back
+    once it has been copied into the outgoing video frame. No ICE servers
+    are configured, so it works on localhost (host candidates only)
+    without any external service.
+    """
+    import av
+    from streamlit_webrtc import WebRtcMode, webrtc_streamer
+
+    def callback(frame):
+        image = process(frame.to_ndarray(format="bgr24"))
+        out = av.VideoFrame.from_ndarray(image, format="bgr24")
+        if release is not None:
+            release(image)
+        return out
+
+    return webrtc_streamer(
+        key=key,
+        mode=WebRtcMode.SENDRECV,
+        rtc_configuration={"iceServers": []},
+        media_stream_constraints={"video": True, "audio": False},
+        video_frame_callback=callback,
+        async_processing=True,
+    )
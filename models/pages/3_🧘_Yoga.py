@@ -1,53 +1,36 @@
-import datetime
-import os
+import logging
 import time
-import cv2
 import streamlit as st
-import mediapipe as mp
-import numpy as np
 from PIL import Image
-from playsound import playsound
 
-def calculate_angle(a, b, c):
-    radians = np.arctan2(c[1]-b[1], c[0]-b[0]) - np.arctan2(a[1]-b[1], a[0]-b[0])
-    angle = np.abs(radians * 180.0 / np.pi)
-    return angle   
-
-def count_time(time_interval):
-    global last_second, counter, pose_number
-    now = datetime.datetime.now()
-    current_second = int(now.strftime("%S"))
-    if current_second != last_second:
-        last_second = current_second
-        counter += 1
-        if counter == time_interval + 1:
-            counter = 0
-            pose_number += 1
-            playsound('../bell.wav')
-            if pose_number == 5:
-                pose_number = 1
-    return counter, pose_number
-
-
-last_second = 0
-counter = 0
-pose_number = 1
+from dadhichi.adaptive import AdaptiveInference
+from dadhichi.asanas import TRACKS, TrackRules
+from dadhichi.audio import get_player
+from dadhichi.camera import session_camera
+from dadhichi.classifier import load_classifier
+from dadhichi.frames import FrameBuffers
+from dadhichi.hud import LabelCache, SkeletonRenderer
+from dadhichi.metrics import registry as metrics_registry
+from dadhichi.pipeline import FramePipeline
+from dadhichi.inference_service import get_service
+from dadhichi.pose_pool import DEFAULT_CONFIG, PoseLease, get_pool
+from dadhichi.quality import QualityController
+from dadhichi.recording import new_recording
+from dadhichi.roi import RoiTracker
+from dadhichi.session import YogaSession
+from dadhichi.transport import FrameTransport, run_webrtc, sidebar_settings
+
+audio_cues = get_player()
 
 img1 = Image.open("./gif/yoga.gif")
 
-img2 = Image.open("./images/pranamasana2.png")
-img3 = Image.open("./images/Eka_Pada_Pranamasana.png")
-img4 = Image.open("./images/Ashwa_Sanchalanasana.webp")
-
-img5 = Image.open("./images/ardha_chakrasana.webp")
-img6 = Image.open("./images/Utkatasana.png")
-img7 = Image.open("./images/Veerabhadrasan_2.png")
+# Skeleton and labels are rasterized from cached specs / layers, not rebuilt per frame
+skeleton = SkeletonRenderer(line_color=(0, 255, 0), point_color=(255, 0, 0), thickness=2, radius=2)
+labels = LabelCache()
+# Pose graphs are pooled per process and only checked out while the camera runs
+pose_pool = get_pool()
 
-mp_drawing = mp.solutions.drawing_utils
-mp_pose = mp.solutions.pose
-pose = mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5)
-
-app_mode = st.sidebar.selectbox("Choose the exercise", ["About","Track 1","Track 2"])
+app_mode = st.sidebar.selectbox("Choose the exercise", ["About"] + list(TRACKS))
 
 if app_mode == "About":
     if app_mode == "About":
@@ -70,349 +53,193 @@ if app_mode == "About":
     with col2:
         st.image(img1, width=400)
 
-elif app_mode == "Track 1":
+else:
+    track = TRACKS[app_mode]
+    rules = TrackRules(track)
 
-    st.markdown("## Welcome to Track1")
+    st.markdown(f"## Welcome to {track.name.replace(' ', '')}")
 
     with st.container():
-        left_column1, right_column1 = st.columns(2)
-        with left_column1:
-            st.write("""
-                Pranamasana (Prayer Pose):
-                - Stand straight with feet together.
-                - Bring palms together in front of chest.
-                - Keep the spine erect and shoulders relaxed.
-                - Focus on breathing deeply and evenly.
-                - Hold for 5 seconds, breathe deeply.
-            """)
-              
-        with right_column1:
-            st.image(img2, width=200)
-
-        st.write("-------------")
+        for n, asana in enumerate(track.asanas):
+            if n:
+                st.write("-------------")
+            left_column, right_column = st.columns(2)
+            with left_column:
+                st.write(f"{asana.name}:\n{asana.instructions}")
+            with right_column:
+                st.image(Image.open(asana.image), width=200)
 
-        left_column2, right_column2 = st.columns(2)
-        with left_column2:
-            st.write("""
-                Eka Pada Pranamasana (One-Legged Prayer Pose):
-                - Shift weight to left leg.
-                - Bend right knee, place right foot on inner thigh.
-                - Hold for 5 seconds.
-                - Repeat on other side.
-                
-            """)
-        with right_column2:
-            st.image(img3, width=200)
-
-        st.write("-------------")
-        
-        left_column3, right_column3 = st.columns(2)
-        with left_column3:
-            st.write("""
-                Ashwa Sanchalanasana (Equestrian Pose):
-                - Step right foot back into lunge.
-                - Lower right knee, raise arms overhead.
-                - Hold for 5 seconds.
-                - Repeat on other side.
-            """)
-        with right_column3:
-            st.image(img4, width=200)
-        
-    
     st.write("-------------")
 
     st.write("Click on the Start button to start the live video feed.")
 
     
+    threaded = st.sidebar.checkbox("Threaded pipeline", value=True)
+    adaptive = st.sidebar.checkbox("Adaptive inference rate", value=False)
+    shared = st.sidebar.checkbox("Shared inference service", value=False)
+    roi = st.sidebar.checkbox("Crop to the user (ROI tracking)", value=False)
+    auto_quality = st.sidebar.checkbox("Auto model quality (hold 15 FPS)", value=False)
+    # Learned classifier instead of the threshold rules, when one was trained for this track
+    classifier = load_classifier(track.name)
+    if classifier is not None and st.sidebar.selectbox("Pose checker", ["Rules", "Classifier"]) == "Rules":
+        classifier = None
+    quality = None
+    transport_mode, transport_settings = sidebar_settings()
+    show_overlay = st.sidebar.checkbox("Performance overlay", value=False)
+    record = st.sidebar.checkbox("Record session landmarks", value=False)
+    recorder = None
+    if st.sidebar.checkbox("Serve metrics on localhost:9108", value=False):
+        # /metrics (Prometheus text) and /metrics.json
+        if metrics_registry.serve(9108) is None:
+            st.sidebar.warning("Port 9108 is already in use; metrics are not being served.")
+    # This run's timings; the page-wide totals behind /metrics add up every session
+    metrics = metrics_registry.session("yoga")
     start = st.button("Start")
-    cap = cv2.VideoCapture(0)
+    # Frames are decoded and resized once into a reused ring, never reallocated per frame
+    frame_buffers = FrameBuffers((800, 600))
+    # Opened by the first read after Start, kept across reruns, released when idle
+    cap = session_camera(st.session_state, key="yoga_camera", width=800, height=600, fps=30)
     FRAME_WINDOW = st.empty()
     stop = st.button("Stop")
-    
-    while start and not stop:
-        ret, frame = cap.read()
-        image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = pose.process(image)
-        image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-        image = cv2.resize(image,(800,600))
 
+    # Hold timer and progression are per user, never module globals
+    session_key = f"yoga_session_{track.name}"
+    if session_key not in st.session_state:
+        st.session_state[session_key] = YogaSession(len(rules))
+    session = st.session_state[session_key]
+    if start:
+        session.reset()
+
+    def read_frame():
+        # Capture stage
+        t = time.perf_counter()
+        ret, frame = frame_buffers.read(cap)
+        metrics.lap("read", t)
+        return ret, frame
+
+    def process_frame(frame):
+        # Inference stage: runs on the pipeline's worker thread in threaded mode
+        t = time.perf_counter()
+        image = frame_buffers.fit(frame)
+        rgb = frame_buffers.to_rgb(image)
+        t = metrics.lap("convert", t)
         try:
-            landmarks = results.pose_landmarks.landmark
-            mp_drawing.draw_landmarks(image, results.pose_landmarks, mp_pose.POSE_CONNECTIONS,
-                                        mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=2),
-                                        mp_drawing.DrawingSpec(color=(255, 0, 0), thickness=2, circle_radius=2))
-            
-            # if len(overlay_list) != 0:
-            left_shoulder = [landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER.value].x,
-                            landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER.value].y]
-            right_shoulder = [landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].x,
-                            landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].y]
-            left_wrist = [landmarks[mp_pose.PoseLandmark.LEFT_WRIST.value].x,
-                        landmarks[mp_pose.PoseLandmark.LEFT_WRIST.value].y]
-            right_wrist = [landmarks[mp_pose.PoseLandmark.RIGHT_WRIST.value].x,
-                        landmarks[mp_pose.PoseLandmark.RIGHT_WRIST.value].y]
-            left_hip = [landmarks[mp_pose.PoseLandmark.LEFT_HIP.value].x,
-                        landmarks[mp_pose.PoseLandmark.LEFT_HIP.value].y]
-            right_hip = [landmarks[mp_pose.PoseLandmark.RIGHT_HIP.value].x,
-                        landmarks[mp_pose.PoseLandmark.RIGHT_HIP.value].y]
-            left_elbow = [landmarks[mp_pose.PoseLandmark.LEFT_ELBOW.value].x,
-                            landmarks[mp_pose.PoseLandmark.LEFT_ELBOW.value].y]
-            right_elbow = [landmarks[mp_pose.PoseLandmark.RIGHT_ELBOW.value].x,
-                            landmarks[mp_pose.PoseLandmark.RIGHT_ELBOW.value].y]
-            left_knee = [landmarks[mp_pose.PoseLandmark.LEFT_KNEE.value].x,
-                            landmarks[mp_pose.PoseLandmark.LEFT_KNEE.value].y]
-            right_knee = [landmarks[mp_pose.PoseLandmark.RIGHT_KNEE.value].x,
-                            landmarks[mp_pose.PoseLandmark.RIGHT_KNEE.value].y]
-            left_ankle = [landmarks[mp_pose.PoseLandmark.LEFT_ANKLE.value].x,
-                            landmarks[mp_pose.PoseLandmark.LEFT_ANKLE.value].y]
-            right_ankle = [landmarks[mp_pose.PoseLandmark.RIGHT_ANKLE.value].x,
-                            landmarks[mp_pose.PoseLandmark.RIGHT_ANKLE.value].y]
-
-            
-            
-            # Check pose and display feedback
-            if pose_number == 1:
-                #pranamasana
-                left_angle = calculate_angle(left_wrist, left_shoulder, left_hip)
-                right_angle = calculate_angle(right_wrist, right_shoulder, right_hip)
-                distance = np.sqrt((right_wrist[0] - left_wrist[0])**2 + (right_wrist[1] - left_wrist[1])**2)
-                if left_angle < 100 and right_angle < 100 and distance < 0.1:
-                    cv2.putText(image, "Pose: Correct", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-                    counter, pose_number = count_time(5)
-                    cv2.putText(image, f"TIME: {int(counter)}s", (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-                else:
-                    cv2.putText(image, "Pose: Incorrect", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-                    counter = 0
-
-            elif pose_number == 2:
-                #ekapada pranamsana
-                left_angle = calculate_angle(left_wrist, left_shoulder, left_hip)
-                right_angle = calculate_angle(right_wrist, right_shoulder, right_hip)
-                right_knee = calculate_angle(right_hip, right_knee, right_ankle)
-
-                    # Calculate distance between wrists
-                distance = np.sqrt((right_wrist[0] - left_wrist[0])**2 + (right_wrist[1] - left_wrist[1])**2)
-
-                    # Check if wrists are close to the shoulders and (Pranamasana posture) and add timer
-                if left_angle > 100 and right_angle > 100 and right_knee < 90 and distance < 0.1:
-                    cv2.putText(image, "asana: Correct", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-                    counter, pose_number = count_time(5)
-                    cv2.putText(image, f"TIME: {int(counter)}s", (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-                else:
-                    cv2.putText(image, "Pose: Incorrect", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-                    counter = 0
-
-            # Ashwa Sanchalanasana        
-            elif pose_number == 3:
-                left_angle = calculate_angle(left_shoulder,left_hip , left_knee)
-                right_angle = calculate_angle(right_shoulder, right_hip, right_knee)
-
-                left_arm_angle = calculate_angle(left_shoulder, left_elbow, left_wrist)
-                right_arm_angle = calculate_angle(right_shoulder, right_elbow, right_wrist)
-
-                left_shoulder_angle = calculate_angle(left_hip, left_shoulder, left_elbow)
-                right_shoulder_angle = calculate_angle(right_hip, right_shoulder, right_elbow)
-
-                left_leg_angle = calculate_angle(left_hip, left_knee, left_ankle)
-                right_leg_angle = calculate_angle(right_hip, right_knee, right_ankle)
-
-                if left_leg_angle > 90 and right_leg_angle < 150 :
-                    cv2.putText(image, "asana: Correct", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-                    counter, pose_number = count_time(5)
-                    cv2.putText(image, f"TIME: {int(counter)}s", (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+            results = inference.process(rgb)
+        finally:
+            frame_buffers.release(rgb)
+        t = metrics.lap("infer", t)
+        # Static-frame test on the camera image, before any HUD is drawn over it
+        thumb = FrameTransport.thumbnail(image)
+        # Draw on the BGR frame itself; no conversion back from RGB
+        finished = False
+        # What the HUD shows; the transport sends every change even while the user holds still
+        hud = (session.index, None)
+
+        if results.pose_landmarks is None:
+            metrics.no_pose += 1
+            if recorder is not None:
+                recorder.append(None)
+        else:
+            try:
+                landmarks = results.pose_landmarks.landmark
+
+                # One pass over the batched angles gives a verdict for every asana in the track
+                verdicts = rules.evaluate(landmarks)
+                if classifier is not None:
+                    verdicts = classifier.verdicts(rules.pose_frame.points, rules.asanas)
+                if recorder is not None:
+                    recorder.append(rules.pose_frame.points, rules.pose_frame.angles, verdicts)
+                t = metrics.lap("evaluate", t)
+
+                # evaluate() already copied the landmarks into the rules' PoseFrame
+                skeleton.draw(image, rules.pose_frame.points)
+
+                # Check pose and display feedback
+                if not session.finished:
+                    correct = verdicts[session.index]
+                    if session.update(correct, track.asanas[session.index].hold):
+                        # Queued on the audio thread, the camera feed keeps running
+                        audio_cues.play("bell")
+                    if correct:
+                        labels.draw(image, "asana: Correct", (50, 50), (0, 255, 0))
+                        labels.draw(image, session.time_label, (50, 100), (255, 255, 255))
+                        hud = (session.index, session.time_label)
+                    else:
+                        labels.draw(image, "asana: Incorrect", (50, 50), (0, 0, 255))
+                        hud = (session.index, False)
                 else:
-                    cv2.putText(image, "asana: Incorrect", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-                    counter = 0
-            else:
-                #pause the frame
-                cv2.putText(image, "Track completed", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-                st.write("Task Completed")
-                start = False
-
-        except:
-            pass     
-
-        # Display the image
-        # FRAME_WINDOW.image(image, channels="BGR")
-        FRAME_WINDOW.image(image, channels="BGR", use_column_width=True)
-        
-    cap.release()
-
-    
-
-elif app_mode == "Track 2":
-    
-    st.markdown("## Welcome to Track2")
-
-    with st.container():
-        left_column1, right_column1 = st.columns(2)
-        with left_column1:
-            st.write("""
-                Ardha Chakrasana (Half Wheel Pose):
-                - Stand with feet hip-width apart.
-                - Inhale, raise arms overhead, palms together.
-                - Exhale, bend backwards, keeping arms straight.
-                - Hold for 5 seconds.
-            """)
-              
-        with right_column1:
-            st.image(img5, width=200)
-
-        st.write("-------------")
-
-        left_column2, right_column2 = st.columns(2)
-        with left_column2:
-            st.write("""
-                Utkatasana (Chair Pose):
-                - Stand with feet together.
-                - Inhale, raise arms overhead.
-                - Exhale, bend knees and lower hips as if sitting on a chair.
-                - Hold for 5 seconds.
-                
-            """)
-        with right_column2:
-            st.image(img6, width=200)
-
-        st.write("-------------")
-        
-        left_column3, right_column3 = st.columns(2)
-        with left_column3:
-            st.write("""
-                Veerabhadrasana 2 (Warrior 2 Pose):
-                - Step left foot back, right foot forward.
-                - Bend right knee, aligning it with ankle.
-                - Extend arms parallel to ground, palms facing down.
-                - Hold for 5 seconds.
-            """)
-        with right_column3:
-            st.image(img7, width=200)
-        
-    
-    st.write("-------------")
-
-    st.write("Click on the Start button to start the live video feed.")
-
-    
-    start = st.button("Start")
-    cap = cv2.VideoCapture(0)
-    FRAME_WINDOW = st.empty()
-    stop = st.button("Stop")
-    
-    while start and not stop:
-        ret, frame = cap.read()
-        image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = pose.process(image)
-        image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-        image = cv2.resize(image,(800,600))
-
+                    #pause the frame
+                    labels.draw(image, "Track completed", (50, 50), (0, 0, 255))
+                    finished = True
+                    hud = (session.index, True)
+
+            except Exception as e:
+                metrics.errors += 1
+                logging.error(f"Error in Yoga frame processing: {e}")
+
+        if quality is not None:
+            labels.draw(image, quality.label(), (10, image.shape[0] - 70), (0, 255, 255), 0.5, 1)
+        if show_overlay:
+            metrics.draw_overlay(image)
+        metrics.lap("draw", t)
+        return image, finished, thumb, hud
+
+    def build_inference(pose):
+        # ROI crop wraps the pose graph, adaptive rate skipping wraps both
+        if roi:
+            pose = RoiTracker(pose)
+        return AdaptiveInference(pose) if adaptive else pose
+
+    # Pooled graph for the WebRTC stream, held only while it plays
+    if "yoga_webrtc_pose" not in st.session_state:
+        st.session_state.yoga_webrtc_pose = PoseLease(pose_pool)
+    webrtc_pose = st.session_state.yoga_webrtc_pose
+    if not transport_mode.startswith("WebRTC"):
+        webrtc_pose.release()
+
+    if transport_mode.startswith("WebRTC"):
+        # Browser camera in, annotated frames out over one peer connection
+        inference = build_inference(webrtc_pose)
+        stream = run_webrtc("yoga", lambda frame: process_frame(frame)[0], release=frame_buffers.release)
+        if stream.state.playing:
+            webrtc_pose.hold(min_detection_confidence=0.5, min_tracking_confidence=0.5)
+        else:
+            webrtc_pose.release()
+
+    elif start and not stop:
+        transport = FrameTransport(FRAME_WINDOW, **transport_settings)
+        if record:
+            recorder = new_recording("yoga", joints=rules.pose_frame.joint_names,
+                                     verdicts=[asana.name for asana in rules.asanas])
+        # A client of the process-wide worker pool, a pooled Pose whose model tier
+        # follows the measured frame rate, or a pooled Pose of our own
+        if shared:
+            source = get_service(DEFAULT_CONFIG).connect()
+        elif auto_quality:
+            source = quality = QualityController(pose_pool, "yoga", target_fps=15)
+        else:
+            source = pose_pool.checkout(min_detection_confidence=0.5, min_tracking_confidence=0.5)
         try:
-            landmarks = results.pose_landmarks.landmark
-            mp_drawing.draw_landmarks(image, results.pose_landmarks, mp_pose.POSE_CONNECTIONS,
-                                        mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=2),
-                                        mp_drawing.DrawingSpec(color=(255, 0, 0), thickness=2, circle_radius=2))
-            
-            # if len(overlay_list) != 0:
-            left_shoulder = [landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER.value].x,
-                            landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER.value].y]
-            right_shoulder = [landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].x,
-                            landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].y]
-            left_wrist = [landmarks[mp_pose.PoseLandmark.LEFT_WRIST.value].x,
-                        landmarks[mp_pose.PoseLandmark.LEFT_WRIST.value].y]
-            right_wrist = [landmarks[mp_pose.PoseLandmark.RIGHT_WRIST.value].x,
-                        landmarks[mp_pose.PoseLandmark.RIGHT_WRIST.value].y]
-            left_hip = [landmarks[mp_pose.PoseLandmark.LEFT_HIP.value].x,
-                        landmarks[mp_pose.PoseLandmark.LEFT_HIP.value].y]
-            right_hip = [landmarks[mp_pose.PoseLandmark.RIGHT_HIP.value].x,
-                        landmarks[mp_pose.PoseLandmark.RIGHT_HIP.value].y]
-            left_elbow = [landmarks[mp_pose.PoseLandmark.LEFT_ELBOW.value].x,
-                            landmarks[mp_pose.PoseLandmark.LEFT_ELBOW.value].y]
-            right_elbow = [landmarks[mp_pose.PoseLandmark.RIGHT_ELBOW.value].x,
-                            landmarks[mp_pose.PoseLandmark.RIGHT_ELBOW.value].y]
-            left_knee = [landmarks[mp_pose.PoseLandmark.LEFT_KNEE.value].x,
-                            landmarks[mp_pose.PoseLandmark.LEFT_KNEE.value].y]
-            right_knee = [landmarks[mp_pose.PoseLandmark.RIGHT_KNEE.value].x,
-                            landmarks[mp_pose.PoseLandmark.RIGHT_KNEE.value].y]
-            left_ankle = [landmarks[mp_pose.PoseLandmark.LEFT_ANKLE.value].x,
-                            landmarks[mp_pose.PoseLandmark.LEFT_ANKLE.value].y]
-            right_ankle = [landmarks[mp_pose.PoseLandmark.RIGHT_ANKLE.value].x,
-                            landmarks[mp_pose.PoseLandmark.RIGHT_ANKLE.value].y]
-
-            
-            
-            # Check pose and display feedback
-            if pose_number == 1:
-                #ardha chakrasana
-                left_angle = calculate_angle(left_wrist, left_shoulder, left_hip)
-                right_angle = calculate_angle(right_wrist, right_shoulder, right_hip)
-                right_knee = calculate_angle(right_hip, right_knee, right_ankle)
-                distance = np.sqrt((right_wrist[0] - left_wrist[0])**2 + (right_wrist[1] - left_wrist[1])**2)
-
-                if left_angle > 100 and right_angle > 100 and  distance < 0.1:
-                    cv2.putText(image, "Pose: Correct", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-                    counter, pose_number = count_time(5)
-                    cv2.putText(image, f"TIME: {int(counter)}s", (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-                else:
-                    cv2.putText(image, "Pose: Incorrect", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-                    counter = 0
-
-            elif pose_number == 2:
-                #utkatasana
-                left_angle = calculate_angle(left_shoulder,left_hip , left_knee)
-                right_angle = calculate_angle(right_shoulder, right_hip, right_knee)
-
-                left_arm_angle = calculate_angle(left_shoulder, left_elbow, left_wrist)
-                right_arm_angle = calculate_angle(right_shoulder, right_elbow, right_wrist)
-
-                left_shoulder_angle = calculate_angle(left_hip, left_shoulder, left_elbow)
-                right_shoulder_angle = calculate_angle(right_hip, right_shoulder, right_elbow)
-
-                left_leg_angle = calculate_angle(left_hip, left_knee, left_ankle)
-                right_leg_angle = calculate_angle(right_hip, right_knee, right_ankle)
-
-                    # Calculate distance between wrists
-                distance = np.sqrt((right_wrist[0] - left_wrist[0])**2 + (right_wrist[1] - left_wrist[1])**2)
-
-                    # Check if wrists are close to the shoulders and (Pranamasana posture) and add timer
-                if right_leg_angle < 150 and left_leg_angle < 150 and left_arm_angle > 150 and right_arm_angle > 150 and left_shoulder_angle > 120  and right_shoulder_angle > 120 :
-                    cv2.putText(image, "asana: Correct", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-                    counter, pose_number = count_time(5)
-                    cv2.putText(image, f"TIME: {int(counter)}s", (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-                else:
-                    cv2.putText(image, "Pose: Incorrect", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-                    counter = 0
-                    
-            # Veerabadrasana 2
-            elif pose_number == 3:
-                left_angle = calculate_angle(left_shoulder,left_hip , left_knee)
-                right_angle = calculate_angle(right_shoulder, right_hip, right_knee)
-
-                left_arm_angle = calculate_angle(left_shoulder, left_elbow, left_wrist)
-                right_arm_angle = calculate_angle(right_shoulder, right_elbow, right_wrist)
-
-                left_shoulder_angle = calculate_angle(left_hip, left_shoulder, left_elbow)
-                right_shoulder_angle = calculate_angle(right_hip, right_shoulder, right_elbow)
-
-                left_leg_angle = calculate_angle(left_hip, left_knee, left_ankle)
-                right_leg_angle = calculate_angle(right_hip, right_knee, right_ankle)
-
-                if right_leg_angle < 120  and left_arm_angle > 150 and right_arm_angle > 150 and left_shoulder_angle < 120  and right_shoulder_angle < 120 :
-                    cv2.putText(image, "asana: Correct", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-                    counter, pose_number = count_time(5)
-                    cv2.putText(image, f"TIME: {int(counter)}s", (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-                else:
-                    cv2.putText(image, "asana: Incorrect", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-                    counter = 0
-            else:
-                #pause the frame
-                cv2.putText(image, "Track completed", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-                start = False
-
-        except:
-            pass     
-
-        # Display the image
-        FRAME_WINDOW.image(image, channels="BGR")
-        # FRAME_WINDOW.image(image, channels="BGR", use_column_width=True)
-        
-    cap.release()
-   
+            with source as pose:
+                # Optional ROI crop and adaptive frame skipping around the pose graph
+                inference = build_inference(pose)
+
+                # Render stage stays on the script thread; capture and inference run behind it
+                # Each ring slot goes back to frame_buffers only once its frame has been shown
+                with FramePipeline(read_frame, process_frame, threaded=threaded,
+                                   release=frame_buffers.release) as frames:
+                    for image, finished, thumb, hud in frames:
+                        t = time.perf_counter()
+                        transport.send(image, force=finished, thumb=thumb, hud=hud)
+                        metrics.lap("display", t)
+                        metrics.dropped = frames.dropped
+                        metrics.frame_done()
+                        if finished:
+                            st.write("Task Completed")
+                            break
+        finally:
+            # Stop and reruns end the script mid-loop; the recording is flushed either way
+            if recorder is not None:
+                recorder.close()
+        if recorder is not None:
+            st.caption(f"Session recorded to {recorder.path}")
@@ -1,16 +1,37 @@
 import streamlit as st
-import mediapipe as mp
 import numpy as np
 import cv2
 import logging
+import time
 from PIL import Image
 
+from dadhichi import pose_math
+from dadhichi.adaptive import AdaptiveInference
+from dadhichi.camera import session_camera
+from dadhichi.frames import FrameBuffers
+from dadhichi.hud import LabelCache, Layer, SkeletonRenderer
+from dadhichi.metrics import registry as metrics_registry
+from dadhichi.pipeline import FramePipeline
+from dadhichi.inference_service import get_service
+from dadhichi.pose_pool import PoseLease, get_pool
+from dadhichi.quality import QualityController
+from dadhichi.recording import new_recording
+from dadhichi.reps import EXERCISES, RepEngine
+from dadhichi.roi import RoiTracker
+from dadhichi.transport import FrameTransport, run_webrtc, sidebar_settings
+from dadhichi.pose_math import PoseFrame
+
 # Set up logging to capture errors in the terminal instead of showing them in Streamlit UI
 logging.basicConfig(level=logging.ERROR)
 
-# Initialize Mediapipe Pose and Drawing utilities
-mp_pose = mp.solutions.pose
-mp_drawing = mp.solutions.drawing_utils
+# Static HUD parts are rendered once per process and stamped onto each frame
+rep_panel = (Layer((226, 74))
+             .rect((0, 0), (225, 73), (245, 117, 16))
+             .text('REPS', (15, 12), (0, 0, 0))
+             .text('STAGE', (65, 12), (0, 0, 0)))
+labels = LabelCache()
+skeleton = SkeletonRenderer(line_color=(245, 117, 66), point_color=(245, 66, 230), thickness=2, radius=2)
+pose_pool = get_pool()  # built and warmed once per process
 
 # Streamlit UI Elements
 st.markdown(
@@ -29,118 +50,206 @@ exercise = st.selectbox("Select an Exercise", ["-- Select --", "Bicep Curl", "Sq
 if "run_camera" not in st.session_state:
     st.session_state.run_camera = False
 
-# Only show camera controls if Bicep Curl is selected
-if exercise == "Bicep Curl":
+# Camera controls for any exercise the rep engine knows
+if exercise in EXERCISES:
     st.sidebar.header("Configuration")
     confidence_threshold = st.sidebar.slider("Detection Confidence", 0.1, 1.0, 0.5, 0.1)
     tracking_threshold = st.sidebar.slider("Tracking Confidence", 0.1, 1.0, 0.5, 0.1)
+    threaded = st.sidebar.checkbox("Threaded pipeline", value=True)
+    adaptive = st.sidebar.checkbox("Adaptive inference rate", value=False)
+    shared = st.sidebar.checkbox("Shared inference service", value=False)
+    roi = st.sidebar.checkbox("Crop to the user (ROI tracking)", value=False)
+    auto_quality = st.sidebar.checkbox("Auto model quality (hold 15 FPS)", value=False)
+    quality = None
+    transport_mode, transport_settings = sidebar_settings()
+    show_overlay = st.sidebar.checkbox("Performance overlay", value=False)
+    record = st.sidebar.checkbox("Record session landmarks", value=False)
+    if st.sidebar.checkbox("Serve metrics on localhost:9108", value=False):
+        # /metrics (Prometheus text) and /metrics.json
+        if metrics_registry.serve(9108) is None:
+            st.sidebar.warning("Port 9108 is already in use; metrics are not being served.")
+    # This run's timings; the page-wide totals behind /metrics add up every session
+    metrics = metrics_registry.session("train")
+    build_ms = pose_pool.last_build_ms(min_detection_confidence=confidence_threshold,
+                                       min_tracking_confidence=tracking_threshold)
+    if build_ms is not None:
+        st.sidebar.caption(f"Pose graph built in {build_ms:.0f} ms (pooled)")
 
     # Start & Stop Buttons
     start_button = st.sidebar.button("Start Camera")
     stop_button = st.sidebar.button("Stop Camera")
 
+    # Both sides of the selected exercise, counted from one angle vector per frame;
+    # counts live per user and exercise across reruns, like the Yoga page's session
+    engine_key = f"train_reps_{exercise}"
+    if engine_key not in st.session_state:
+        st.session_state[engine_key] = RepEngine([EXERCISES[exercise]])
+    rep_engine = st.session_state[engine_key]
+
     # Handle button clicks
     if start_button:
         st.session_state.run_camera = True
+        rep_engine.reset()
     if stop_button:
         st.session_state.run_camera = False
 
-    # Function to calculate angle between three points
-    def calculate_angle(a, b, c):
-        try:
-            a = np.array(a)
-            b = np.array(b)
-            c = np.array(c)
-            radians = np.arctan2(c[1] - b[1], c[0] - b[0]) - np.arctan2(a[1] - b[1], a[0] - b[0])
-            angle = np.abs(radians * 180.0 / np.pi)
-            if angle > 180.0:
-                angle = 360 - angle
-            return angle
-        except Exception as e:
-            logging.error(f"Angle Calculation Error: {e}")
-            return 0  # Default to 0 if error occurs
+    # Pooled graph for the WebRTC stream, held only while it plays
+    if "train_webrtc_pose" not in st.session_state:
+        st.session_state.train_webrtc_pose = PoseLease(pose_pool)
+    webrtc_pose = st.session_state.train_webrtc_pose
+    if not (st.session_state.run_camera and transport_mode.startswith("WebRTC")):
+        webrtc_pose.release()
 
     # Camera Feed
     if st.session_state.run_camera:
-        st.write("📹 Camera is ON. Get Ready to Perform Bicep Curls!")
-        cap = cv2.VideoCapture(0)  # Capture from webcam
+        st.write(f"📹 Camera is ON. Get Ready to Perform {exercise}s!")
+        frame_buffers = FrameBuffers()  # reused capture / RGB buffers at the camera's size
+        # Webcam cached per session: reused across reruns, released when idle
+        cap = session_camera(st.session_state, key="train_camera", width=640, height=480, fps=30)
         stframe = st.empty()  # Streamlit placeholder for video frames
 
-        counter = 0  # Rep counter
-        stage = None  # "up" or "down"
-
-        # Setup Mediapipe Pose
-        with mp_pose.Pose(
-            min_detection_confidence=confidence_threshold, 
-            min_tracking_confidence=tracking_threshold
-        ) as pose:
-            while st.session_state.run_camera and cap.isOpened():
-                ret, frame = cap.read()
-                if not ret:
-                    logging.error("Unable to read from camera. Please check your webcam.")
-                    break
-
+        pose_frame = PoseFrame(joints=rep_engine.joints, distances=[])
+        recorder = None
+
+        def read_frame():
+            # Capture stage
+            t = time.perf_counter()
+            ret, frame = frame_buffers.read(cap)
+            metrics.lap("read", t)
+            if not ret:
+                logging.error("Unable to read from camera. Please check your webcam.")
+            return ret, frame
+
+        def process_frame(frame):
+            # Inference stage: runs on the pipeline's worker thread in threaded mode
+            try:
+                # Convert to RGB
+                t = time.perf_counter()
+                rgb = frame_buffers.to_rgb(frame)
+                t = metrics.lap("convert", t)
                 try:
-                    # Convert to RGB
-                    image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    image.flags.writeable = False
-                    results = pose.process(image)
-
-                    # Convert back to BGR
-                    image.flags.writeable = True
-                    image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-
-                    if results.pose_landmarks:
-                        landmarks = results.pose_landmarks.landmark
-
-                        # Extract shoulder, elbow, and wrist landmarks
-                        shoulder = [landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER.value].x,
-                                    landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER.value].y]
-                        elbow = [landmarks[mp_pose.PoseLandmark.LEFT_ELBOW.value].x,
-                                 landmarks[mp_pose.PoseLandmark.LEFT_ELBOW.value].y]
-                        wrist = [landmarks[mp_pose.PoseLandmark.LEFT_WRIST.value].x,
-                                 landmarks[mp_pose.PoseLandmark.LEFT_WRIST.value].y]
-
-                        # Calculate angle
-                        angle = calculate_angle(shoulder, elbow, wrist)
-
-                        # Display angle
-                        cv2.putText(image, str(angle),
-                                    tuple(np.multiply(elbow, [640, 480]).astype(int)),
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2, cv2.LINE_AA)
-
-                        # Rep counting logic
-                        if angle > 150:
-                            stage = "down"
-                        if angle < 40 and stage == 'down':
-                            stage = "up"
-                            counter += 1
-
-                    # Display Rep Counter
-                    cv2.rectangle(image, (0, 0), (225, 73), (245, 117, 16), -1)
-                    cv2.putText(image, 'REPS', (15, 12), 
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1, cv2.LINE_AA)
-                    cv2.putText(image, str(counter), 
-                                (10, 60), 
-                                cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 2, cv2.LINE_AA)
-                    cv2.putText(image, 'STAGE', (65, 12), 
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1, cv2.LINE_AA)
-                    cv2.putText(image, stage if stage else "None", 
-                                (60, 60), 
-                                cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 2, cv2.LINE_AA)
-
-                    # Draw Pose Landmarks
-                    if results.pose_landmarks:
-                        mp_drawing.draw_landmarks(image, results.pose_landmarks, mp_pose.POSE_CONNECTIONS,
-                                                  mp_drawing.DrawingSpec(color=(245, 117, 66), thickness=2, circle_radius=2), 
-                                                  mp_drawing.DrawingSpec(color=(245, 66, 230), thickness=2, circle_radius=2))
-
-                    # Show Image in Streamlit
-                    stframe.image(image, channels="BGR", use_column_width=True)
-
-                except Exception as e:
-                    logging.error(f"Error in Camera Processing: {e}")
-                    continue  # Skip this frame if an error occurs
-
+                    results = inference.process(rgb)
+                finally:
+                    frame_buffers.release(rgb)
+                t = metrics.lap("infer", t)
+
+                # Annotate the original BGR frame instead of converting back;
+                # the static-frame test looks at it before anything is drawn
+                image = frame
+                thumb = FrameTransport.thumbnail(image)
+
+                if results.pose_landmarks:
+                    # Copy landmarks and calculate the tracked joint angles
+                    pose_frame.update(results.pose_landmarks.landmark)
+
+                    # Rep counting logic
+                    for event in rep_engine.update(pose_frame.angles, time.monotonic()):
+                        logging.info(f"{event.exercise} rep {event.count} ({event.side}) in {event.duration:.1f}s")
+
+                    # Display the angle of the side the shown count comes from
+                    side = rep_engine.counting_side(exercise)
+                    joint = f"{side}_{EXERCISES[exercise].joint}"
+                    point = pose_frame.point(pose_math.JOINTS[joint][1])
+                    cv2.putText(image, str(pose_frame.angle(joint)),
+                                tuple(np.multiply(point, [640, 480]).astype(int)),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2, cv2.LINE_AA)
+                    if recorder is not None:
+                        recorder.append(pose_frame.points, pose_frame.angles)
+                    t = metrics.lap("evaluate", t)
+                else:
+                    metrics.no_pose += 1
+                    if recorder is not None:
+                        recorder.append(None)
+                counter = rep_engine.reps(exercise)
+                stage = rep_engine.stage(exercise, rep_engine.counting_side(exercise))
+                tempo = rep_engine.tempo(exercise)
+
+                # Display Rep Counter
+                rep_panel.apply(image)
+                labels.draw(image, str(counter), (10, 60), (255, 255, 255), 2, 2)
+                labels.draw(image, stage if stage else "None", (60, 60), (255, 255, 255), 2, 2)
+                if tempo:
+                    labels.draw(image, f"TEMPO {tempo:.1f}s/rep", (10, 95), (245, 117, 16), 0.6, 2)
+
+                # Draw Pose Landmarks
+                if results.pose_landmarks:
+                    skeleton.draw(image, pose_frame.points)
+                if quality is not None:
+                    labels.draw(image, quality.label(), (10, image.shape[0] - 70), (0, 255, 255), 0.5, 1)
+                if show_overlay:
+                    metrics.draw_overlay(image)
+                metrics.lap("draw", t)
+                # A new count, stage or tempo goes out even while the user holds still
+                return image, thumb, (counter, stage, round(tempo, 1))
+
+            except Exception as e:
+                metrics.errors += 1
+                logging.error(f"Error in Camera Processing: {e}")
+                return None, None, None  # Skip this frame if an error occurs
+
+        def build_inference(pose):
+            # ROI crop wraps the pose graph, adaptive rate skipping wraps both
+            if roi:
+                pose = RoiTracker(pose)
+            return AdaptiveInference(pose) if adaptive else pose
+
+        if transport_mode.startswith("WebRTC"):
+            # Browser camera in, annotated frames out over one peer connection
             cap.release()
-            st.write("📷 Camera Stopped.")
+            inference = build_inference(webrtc_pose)
+
+            def webrtc_frame(frame):
+                image = process_frame(frame)[0]
+                return frame if image is None else image
+
+            stream = run_webrtc("train", webrtc_frame)
+            if stream.state.playing:
+                # A changed slider swaps the held graph for one with the new confidences
+                webrtc_pose.hold(min_detection_confidence=confidence_threshold,
+                                 min_tracking_confidence=tracking_threshold)
+            else:
+                webrtc_pose.release()
+
+        else:
+            # Check out a pooled Mediapipe Pose instead of building a new graph,
+            # let the quality controller pick its model tier from the frame rate,
+            # or connect to the process-wide worker pool shared by every session
+            if shared:
+                source = get_service((1, confidence_threshold, tracking_threshold)).connect()
+            elif auto_quality:
+                source = quality = QualityController(pose_pool, "train", target_fps=15,
+                                                     min_detection_confidence=confidence_threshold,
+                                                     min_tracking_confidence=tracking_threshold)
+            else:
+                source = pose_pool.checkout(
+                    min_detection_confidence=confidence_threshold, 
+                    min_tracking_confidence=tracking_threshold
+                )
+            with source as pose:
+                # Optional ROI crop and adaptive frame skipping around the pose graph
+                inference = build_inference(pose)
+                if cap.isOpened():
+                    transport = FrameTransport(stframe, **transport_settings)
+                    if record:
+                        recorder = new_recording("train", joints=rep_engine.joints)
+                    try:
+                        # Render stage stays on the script thread; capture and inference run behind it
+                        # Each ring slot goes back to frame_buffers only once its frame has been shown
+                        with FramePipeline(read_frame, process_frame, threaded=threaded,
+                                           release=frame_buffers.release) as frames:
+                            for image, thumb, hud in frames:
+                                if image is not None:
+                                    # Show Image in Streamlit
+                                    t = time.perf_counter()
+                                    transport.send(image, thumb=thumb, hud=hud)
+                                    metrics.lap("display", t)
+                                metrics.dropped = frames.dropped
+                                metrics.frame_done()
+                    finally:
+                        # Stop and reruns end the script mid-loop; the recording is flushed either way
+                        if recorder is not None:
+                            recorder.close()
+
+                if recorder is not None:
+                    st.caption(f"Session recorded to {recorder.path}")
+                st.write("📷 Camera Stopped.")
@@ -6,6 +6,11 @@ import plotly.graph_objects as go
 from streamlit_extras.no_default_selectbox import selectbox
 import matplotlib.pyplot as plt
 
+from dadhichi.food_search import get_search_index
+from dadhichi.meals import aggregate
+from dadhichi.nutrition import get_store
+from dadhichi.planner import Targets, get_planner
+
 st.set_page_config(page_title='Nutrition Calorie Tracker', layout='wide')
 
 html = """
@@ -17,58 +22,40 @@ st.markdown(html, unsafe_allow_html=True)
 st.write("")
 
 # st.title('Nutrition Calorie Tracker')
-df=pd.read_csv("./food1.csv", encoding='mac_roman')
+# Parsed once per process and indexed by description, not re-read on every widget change
+store = get_store()
+# Searched server-side; the browser only ever gets the top matches, not all 8,790 foods
+food_index = get_search_index()
 ye=st.number_input('Enter Number of dishes', min_value=1, max_value=10)
-i=0
-j=0
-calories=0
-list1=[]
-list2=[]
-list3=[]
-list4=[]
-list5=[]
-list6=[]
-list7=[]
-list8=[]
+names=[]
+rows=np.full(ye, -1)
+servings=np.zeros(ye)
+details=[]
 
 
 try:
-    while(i<ye):
+    for i in range(ye):
         st.write("--------------------")
-        sel=selectbox('Select the food ',df['Shrt_Desc'].unique(),no_selection_label=" ",key=i)
-        list1.append(sel)
-        sel_serving=st.number_input('Select the number of servings ',min_value=1,max_value=10,value=1,step=1,key=j+100)
-        # list2.append(sel_serving)
-        i=i+1
-        j=j+1
+        query=st.text_input('Search food (e.g. butter salt, chicken ckd) ',key=f"search{i}")
+        sel=selectbox('Select the food ',food_index.search(query,k=20),no_selection_label=" ",key=i)
+        sel_serving=st.number_input('Select the number of servings ',min_value=1,max_value=10,value=1,step=1,key=i+100)
         st.write("Food : ",sel)
         st.write("Serving : ",sel_serving)
-        st.write("Calories per serving : ",df[df['Shrt_Desc']==sel]['Energ_Kcal'].values[0])
-        cal= df[df['Shrt_Desc']==sel]['Energ_Kcal'].values[0]*sel_serving
-        list2.append(cal)
-        st.write("Total calories for ",sel_serving,"servings of ",sel ,"= ",cal,"Energ_Kcal")
-        
-        #protine
+        names.append(sel)
+        rows[i]=store.row(sel)
+        servings[i]=sel_serving
+        # Filled in once the whole meal is totalled
+        details.append(st.empty())
 
-        protine= df[df['Shrt_Desc']==sel]['Protein_(g)'].values[0]*sel_serving
-        list3.append(protine)
-        
-        carbs= df[df['Shrt_Desc']==sel]['Carbohydrt_(g)'].values[0]*sel_serving
-        list4.append(carbs)
-        
-        fat= df[df['Shrt_Desc']==sel]['Lipid_Tot_(g)'].values[0]*sel_serving
-        list5.append(fat)
-        
-        sugar= df[df['Shrt_Desc']==sel]['Sugar_Tot_(g)'].values[0]*sel_serving
-        list7.append(sugar)
-        
-        calcium= df[df['Shrt_Desc']==sel]['Calcium_(mg)'].values[0]*sel_serving
-        list8.append(calcium)
-        
-        calories += cal
-   
-    
-    st.write("Total Calories:", calories)
+    # Every dish and every nutrient in one matrix product
+    meal = aggregate(store, rows, servings)
+    kcal = store.column("Energ_Kcal")
+    for i, detail in enumerate(details):
+        detail.write(f"Calories per serving : {meal.dishes[i, kcal] / servings[i]:g}  \n"
+                     f"Total calories for {servings[i]:g} servings of {names[i]} = {meal.dishes[i, kcal]:g} Energ_Kcal")
+    st.write("Total Calories:", meal.totals[kcal])
+    with st.expander("All nutrients in this meal"):
+        st.dataframe(pd.DataFrame({"Total": meal.totals}, index=store.nutrients))
     st.write("--------------------")
     
 
@@ -76,25 +63,51 @@ try:
 
     # Create pie chart
     with col1:
-        fig = go.Figure(data=[go.Pie(labels=list1, values=list2, textinfo='percent', insidetextorientation='radial')])
+        fig = go.Figure(data=[go.Pie(labels=names, values=meal.dishes[:, store.column("Energ_Kcal")], textinfo='percent', insidetextorientation='radial')])
         fig.update_layout(title="Calorie Breakdown")
         st.plotly_chart(fig)
     with col2:
-        fig1 = go.Figure(data=[go.Pie(labels=list1, values=list3, textinfo='percent', insidetextorientation='radial')])
+        fig1 = go.Figure(data=[go.Pie(labels=names, values=meal.dishes[:, store.column("Protein_(g)")], textinfo='percent', insidetextorientation='radial')])
         fig1.update_layout(title="Protein Breakdown")
         st.plotly_chart(fig1)
     with col3:
-        fig2 = go.Figure(data=[go.Pie(labels=list1, values=list4, textinfo='percent', insidetextorientation='radial')])
+        fig2 = go.Figure(data=[go.Pie(labels=names, values=meal.dishes[:, store.column("Carbohydrt_(g)")], textinfo='percent', insidetextorientation='radial')])
         fig2.update_layout(title="Carbs Breakdown")
         st.plotly_chart(fig2)
     with col1:
-        fig3 = go.Figure(data=[go.Pie(labels=list1, values=list5, textinfo='percent', insidetextorientation='radial')])
+        fig3 = go.Figure(data=[go.Pie(labels=names, values=meal.dishes[:, store.column("Lipid_Tot_(g)")], textinfo='percent', insidetextorientation='radial')])
         fig3.update_layout(title="Fat Breakdown")
         st.plotly_chart(fig3)
     with col3:
-        fig5 = go.Figure(data=[go.Pie(labels=list1, values=list7, textinfo='percent', insidetextorientation='radial')])
+        fig5 = go.Figure(data=[go.Pie(labels=names, values=meal.dishes[:, store.column("Sugar_Tot_(g)")], textinfo='percent', insidetextorientation='radial')])
         fig5.update_layout(title="Sugar Breakdown")
         st.plotly_chart(fig5)
     
 except:
     st.write("")
+
+
+st.write("--------------------")
+with st.expander("Plan a meal for my targets"):
+    c1,c2,c3,c4=st.columns(4)
+    kcal_target=c1.number_input('Calories (kcal)',min_value=100,max_value=6000,value=2000,step=50)
+    protein_target=c2.number_input('Protein (g)',min_value=0,max_value=400,value=100,step=5)
+    carbs_target=c3.number_input('Carbs (g)',min_value=0,max_value=800,value=250,step=5)
+    fat_target=c4.number_input('Fat (g)',min_value=0,max_value=300,value=67,step=5)
+    c1,c2,c3=st.columns(3)
+    sugar_cap=c1.number_input('Max sugar (g, 0 = no cap)',min_value=0,max_value=300,value=0,step=5)
+    sodium_cap=c2.number_input('Max sodium (mg, 0 = no cap)',min_value=0,max_value=6000,value=0,step=100)
+    max_servings=c3.slider('Max servings of one food (x 100 g)',0.5,5.0,3.0,0.5)
+    excluded=st.text_input('Leave out foods containing (comma separated, e.g. beef, pork)')
+    if st.button('Plan'):
+        planner = get_planner()
+        # Zero targets would divide by zero in the relative miss; the smallest step stands in for "none"
+        targets = Targets(kcal_target, max(protein_target, 1), max(carbs_target, 1), max(fat_target, 1))
+        plan = planner.plan(targets, max_servings=max_servings, exclude=planner.rows_matching(excluded.split(",")),
+                            sugar_max=sugar_cap or None, sodium_max=sodium_cap or None)
+        st.write(f"{len(plan.rows)} foods, {plan.error:.1%} off the targets on average ({plan.solver} solver, {plan.ms:.0f} ms)")
+        st.dataframe(pd.DataFrame({"Food": [store.names[r] for r in plan.rows], "Servings (x 100 g)": plan.servings}))
+        shown = ["Energ_Kcal", "Protein_(g)", "Carbohydrt_(g)", "Lipid_Tot_(g)", "Sugar_Tot_(g)", "Sodium_(mg)"]
+        st.dataframe(pd.DataFrame({"Plan": plan.meal.totals[store.columns_of(shown)],
+                                   "Target": [kcal_target, protein_target, carbs_target, fat_target, sugar_cap or None, sodium_cap or None]},
+                                  index=shown))
@@ -0,0 +1,14 @@
+import os
+
+import pytest
+
+MODELS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="session")
+def food_store():
+    # The app's own nutrient table, parsed from the CSVs (no cache written)
+    pytest.importorskip("pandas")
+    from dadhichi.nutrition import NutrientStore
+
+    return NutrientStore.from_csv(os.path.join(MODELS_DIR, "food1.csv"), os.path.join(MODELS_DIR, "food.csv"))
@@ -0,0 +1,91 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from dadhichi.asanas import TRACKS, TrackRules
+from dadhichi.pose_math import (LEFT_ANKLE, LEFT_ELBOW, LEFT_HIP, LEFT_KNEE, LEFT_SHOULDER, LEFT_WRIST, NUM_LANDMARKS,
+                                RIGHT_ANKLE, RIGHT_ELBOW, RIGHT_HIP, RIGHT_KNEE, RIGHT_SHOULDER, RIGHT_WRIST,
+                                calculate_angle)
+
+
+def angle(p, a, b, c):
+    # The Yoga page's original calculate_angle: raw |atan2 difference|, never wrapped
+    return calculate_angle(p[a], p[b], p[c], wrap=False)
+
+
+def wrists(p):
+    return np.sqrt((p[RIGHT_WRIST][0] - p[LEFT_WRIST][0]) ** 2 + (p[RIGHT_WRIST][1] - p[LEFT_WRIST][1]) ** 2)
+
+
+# The checks the Yoga page made per pose before the rules became data, one function per asana
+def pranamasana(p):
+    return (angle(p, LEFT_WRIST, LEFT_SHOULDER, LEFT_HIP) < 100 and angle(p, RIGHT_WRIST, RIGHT_SHOULDER, RIGHT_HIP) < 100
+            and wrists(p) < 0.1)
+
+
+def eka_pada_pranamasana(p):
+    return (angle(p, LEFT_WRIST, LEFT_SHOULDER, LEFT_HIP) > 100 and angle(p, RIGHT_WRIST, RIGHT_SHOULDER, RIGHT_HIP) > 100
+            and angle(p, RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE) < 90 and wrists(p) < 0.1)
+
+
+def ashwa_sanchalanasana(p):
+    return angle(p, LEFT_HIP, LEFT_KNEE, LEFT_ANKLE) > 90 and angle(p, RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE) < 150
+
+
+def ardha_chakrasana(p):
+    return (angle(p, LEFT_WRIST, LEFT_SHOULDER, LEFT_HIP) > 100 and angle(p, RIGHT_WRIST, RIGHT_SHOULDER, RIGHT_HIP) > 100
+            and wrists(p) < 0.1)
+
+
+def utkatasana(p):
+    return (angle(p, RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE) < 150 and angle(p, LEFT_HIP, LEFT_KNEE, LEFT_ANKLE) < 150
+            and angle(p, LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST) > 150
+            and angle(p, RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST) > 150
+            and angle(p, LEFT_HIP, LEFT_SHOULDER, LEFT_ELBOW) > 120
+            and angle(p, RIGHT_HIP, RIGHT_SHOULDER, RIGHT_ELBOW) > 120)
+
+
+def veerabhadrasana_2(p):
+    return (angle(p, RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE) < 120
+            and angle(p, LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST) > 150
+            and angle(p, RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST) > 150
+            and angle(p, LEFT_HIP, LEFT_SHOULDER, LEFT_ELBOW) < 120
+            and angle(p, RIGHT_HIP, RIGHT_SHOULDER, RIGHT_ELBOW) < 120)
+
+
+OLD_CHECKS = {
+    "Track 1": [pranamasana, eka_pada_pranamasana, ashwa_sanchalanasana],
+    "Track 2": [ardha_chakrasana, utkatasana, veerabhadrasana_2],
+}
+
+
+def random_poses(n, seed=0):
+    # Uniform landmarks, with the wrists brought together in half the poses so the prayer checks pass too
+    rng = np.random.default_rng(seed)
+    poses = rng.random((n, NUM_LANDMARKS, 4)).astype(np.float32)
+    close = rng.random(n) < 0.5
+    poses[close, RIGHT_WRIST, :2] = poses[close, LEFT_WRIST, :2] + rng.normal(0, 0.03, (int(close.sum()), 2))
+    return poses
+
+
+@pytest.mark.parametrize("track_name", sorted(TRACKS))
+def test_track_rules_match_old_checks(track_name):
+    rules = TrackRules(TRACKS[track_name])
+    checks = OLD_CHECKS[track_name]
+    hits = np.zeros(len(checks), dtype=int)
+    for points in random_poses(3000):
+        landmarks = [SimpleNamespace(x=x, y=y, z=z, visibility=v) for x, y, z, v in points.tolist()]
+        xy = points[:, :2].astype(np.float64)
+        expected = [check(xy) for check in checks]
+        np.testing.assert_array_equal(rules.evaluate(landmarks), expected)
+        hits += expected
+    # Every asana was seen both matching and not matching
+    assert (hits > 0).all() and (hits < 3000).all()
+
+
+def test_track_rules_order_and_length():
+    for track in TRACKS.values():
+        rules = TrackRules(track)
+        assert len(rules) == len(track.asanas)
+        assert [asana.name for asana in rules.asanas] == [asana.name for asana in track.asanas]
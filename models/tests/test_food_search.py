@@ -0,0 +1,38 @@
+from dadhichi.food_search import FoodSearchIndex, tokenize
+
+DESCRIPTIONS = [
+    "PEANUT BUTTER,SMOOTH STYLE,W/ SALT",
+    "BUTTER,WHIPPED,W/ SALT",
+    "SALT,TABLE",
+    "BUTTER,WITHOUT SALT",
+    "BUTTER,WITH SALT",
+    "CHICKEN,BROILERS OR FRYERS,BREAST,MEAT ONLY,CKD,RSTD",
+    "BUTTERMILK,FLUID,CULTURED,LOWFAT",
+]
+
+
+def test_tokenize_expands_abbreviations():
+    assert tokenize("BEEF,CKD,W/O FAT") == ["BEEF", "CKD", "COOKED", "WITHOUT", "FAT"]
+
+
+def test_butter_salt_ranking():
+    results = FoodSearchIndex(DESCRIPTIONS).search("butter salt")
+    assert results[0] == "BUTTER,WITH SALT"
+    # Butter itself before foods that merely contain butter; salt alone doesn't match
+    assert results.index("BUTTER,WHIPPED,W/ SALT") < results.index("PEANUT BUTTER,SMOOTH STYLE,W/ SALT")
+    assert "SALT,TABLE" not in results
+
+
+def test_prefix_typo_and_abbreviation():
+    index = FoodSearchIndex(DESCRIPTIONS)
+    assert index.search("buttermi") == ["BUTTERMILK,FLUID,CULTURED,LOWFAT"]
+    assert index.search("chiken")[0].startswith("CHICKEN")
+    assert index.search("chicken roasted") == ["CHICKEN,BROILERS OR FRYERS,BREAST,MEAT ONLY,CKD,RSTD"]
+    assert index.search("") == []
+    assert index.search("zzzz") == []
+
+
+def test_butter_salt_over_food_table(food_store):
+    results = FoodSearchIndex(food_store.descriptions).search("butter salt", k=5)
+    assert results[0] == "BUTTER,WITH SALT"
+    assert all(name.startswith("BUTTER") for name in results)
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from dadhichi.meals import aggregate
+from dadhichi.nutrition import CALORIES, GRAM_WEIGHT, NutrientStore
+
+
+@pytest.fixture
+def store():
+    # Three foods, two nutrients per 100 g and a serving weight that must never be totalled
+    return NutrientStore([1, 2, 3], ["RICE", "DAL", "GHEE"], [CALORIES, "Protein_(g)", GRAM_WEIGHT],
+                         np.array([[130, 2.7, 150], [116, 9.0, 200], [900, np.nan, 14]], dtype=np.float32))
+
+
+def test_single_meal(store):
+    meal = aggregate(store, [0, 1, 2], [2.0, 1.5, 0.1])
+    assert meal.totals.shape == (2,)
+    np.testing.assert_allclose(meal.totals, [2 * 130 + 1.5 * 116 + 90, 2 * 2.7 + 1.5 * 9.0], rtol=1e-5)
+    np.testing.assert_allclose(meal.dishes[2], [90, 0])
+    np.testing.assert_allclose(meal.shares.sum(axis=0), [1, 1], rtol=1e-5)
+
+
+def test_empty_slots_and_repeats(store):
+    # A -1 row is an empty slot; the same food twice adds up
+    meal = aggregate(store, [0, -1, 0], [1.0, 5.0, 1.0])
+    np.testing.assert_allclose(meal.totals, [260, 5.4], rtol=1e-5)
+    np.testing.assert_allclose(meal.dishes[1], [0, 0])
+
+
+def test_week_matches_meal_by_meal(store):
+    rng = np.random.default_rng(0)
+    rows = rng.integers(-1, 3, (7, 3, 4))
+    servings = rng.random((7, 3, 4)).astype(np.float32) * 3
+    week = aggregate(store, rows, servings)
+    assert week.totals.shape == (7, 3, 2)
+    assert week.shares.shape == (7, 3, 4, 2)
+    for day in range(7):
+        for meal in range(3):
+            single = aggregate(store, rows[day, meal], servings[day, meal])
+            np.testing.assert_allclose(week.totals[day, meal], single.totals, rtol=1e-5, atol=1e-4)
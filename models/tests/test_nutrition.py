@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from dadhichi.nutrition import CALORIES, GRAM_WEIGHT, NOT_NUTRIENTS, NutrientStore, normalize_column
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("Copper_mg)", "Copper_(mg)"),
+    ("Panto_Acid_mg)", "Panto_Acid_(mg)"),
+    ("Vit_D_ÔøΩg", "Vit_D_(ug)"),
+    ("Selenium_(ÔøΩg)", "Selenium_(ug)"),
+    ("Vit_K_(µg)", "Vit_K_(ug)"),
+    ("Choline_Tot_ (mg)", "Choline_Tot_(mg)"),
+    ("Protein_(g)", "Protein_(g)"),
+    ("Energ_Kcal", "Energ_Kcal"),
+    ("Vit_D_IU", "Vit_D_IU"),
+])
+def test_normalize_column(raw, expected):
+    assert normalize_column(raw) == expected
+
+
+def test_store_lookups():
+    store = NutrientStore([1, 2, 3], ["APPLE", "BREAD", "APPLE"], [CALORIES, "Protein_(g)", GRAM_WEIGHT],
+                          np.array([[52, 0.3, 180], [265, 9, 30], [1, 1, 1]]))
+    assert store.nutrients == [CALORIES, "Protein_(g)"]
+    assert store.descriptions == ["APPLE", "BREAD"]
+    # A repeated description resolves to its first row
+    assert store.row("APPLE") == 0
+    assert store.row_by_id(3) == 2
+    assert store.value("BREAD", "Protein_(g)") == pytest.approx(9)
+    np.testing.assert_allclose(store.lookup("BREAD", [GRAM_WEIGHT, CALORIES]), [30, 265])
+    assert "BREAD" in store and "CAKE" not in store
+
+
+def test_store_rejects_weights_before_nutrients():
+    with pytest.raises(ValueError):
+        NutrientStore([1], ["APPLE"], [GRAM_WEIGHT, CALORIES], np.zeros((1, 2)))
+
+
+def test_merged_table(food_store):
+    assert food_store.columns[-len(NOT_NUTRIENTS):] == list(NOT_NUTRIENTS)
+    assert all("(" in c or c in (CALORIES, "Vit_A_IU", "Vit_A_RAE", "Vit_D_IU") for c in food_store.nutrients)
+    assert food_store.value("BUTTER,WITH SALT", CALORIES) == pytest.approx(717)
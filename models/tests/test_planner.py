@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from dadhichi.planner import SODIUM, SUGAR, TARGET_COLUMNS, MealPlanner, Targets
+
+
+@pytest.fixture(scope="module")
+def planner(food_store):
+    return MealPlanner(food_store)
+
+
+def test_local_plan_hits_targets(planner, food_store):
+    targets = Targets(700, 40, 80, 20)
+    plan = planner.plan(targets, solver="local")
+    assert plan.solver == "local"
+    assert plan.error < 0.1
+    assert 0 < len(plan.rows) <= 6
+    assert ((plan.servings > 0) & (plan.servings <= 3)).all()
+    # Servings come in half steps
+    np.testing.assert_allclose(plan.servings * 2, np.round(plan.servings * 2))
+    achieved = plan.meal.totals[food_store.columns_of(TARGET_COLUMNS)]
+    assert plan.error == pytest.approx(np.mean(np.abs(achieved - np.array(targets)) / np.array(targets)), rel=1e-4)
+
+
+def test_plan_respects_caps_and_exclusions(planner, food_store):
+    first = planner.plan(Targets(600, 30, 70, 20), solver="local")
+    plan = planner.plan(Targets(600, 30, 70, 20), solver="local", exclude=first.rows, sugar_max=10,
+                        sodium_max=500)
+    assert not np.isin(plan.rows, first.rows).any()
+    assert plan.meal.totals[food_store.column(SUGAR)] <= 10 + 1e-3
+    assert plan.meal.totals[food_store.column(SODIUM)] <= 500 + 1e-3
+
+
+def test_candidates_skip_non_dishes(planner):
+    names = planner.names[planner.rows[planner.candidates(Targets(700, 40, 80, 20))]]
+    assert not any("INFANT FORMULA" in name or "BABYFOOD" in name for name in names)
+
+
+def test_lp_plan(planner):
+    pytest.importorskip("scipy")
+    plan = planner.plan(Targets(700, 40, 80, 20), solver="lp")
+    assert plan.solver == "lp"
+    assert plan.error < 0.1
@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from dadhichi.pose_math import (DISTANCES, JOINTS, LEFT_WRIST, NUM_LANDMARKS, RIGHT_WRIST, JointKernel, PoseFrame,
+                                batch_angles, calculate_angle)
+
+
+def random_points(seed=0):
+    return np.random.default_rng(seed).random((NUM_LANDMARKS, 4)).astype(np.float32)
+
+
+def landmarks(points):
+    return [SimpleNamespace(x=float(x), y=float(y), z=float(z), visibility=float(v)) for x, y, z, v in points]
+
+
+def test_calculate_angle_right_angle():
+    assert calculate_angle([1, 0], [0, 0], [0, 1]) == pytest.approx(90)
+    assert calculate_angle([1, 0], [0, 0], [-1, 0]) == pytest.approx(180)
+
+
+def test_calculate_angle_wrap():
+    # 270 degrees raw, 90 once wrapped
+    assert calculate_angle([0, -1], [0, 0], [-1, 0], wrap=False) == pytest.approx(270)
+    assert calculate_angle([0, -1], [0, 0], [-1, 0]) == pytest.approx(90)
+
+
+@pytest.mark.parametrize("wrap", [True, False])
+def test_kernel_matches_scalar_angles(wrap):
+    points = random_points()
+    triples = list(JOINTS.values())
+    pairs = list(DISTANCES.values())
+    kernel = JointKernel(triples, pairs, wrap=wrap)
+    angles, distances = kernel(points, np.empty(len(triples), dtype=np.float32),
+                               np.empty(len(pairs), dtype=np.float32))
+    expected = [calculate_angle(points[a, :2], points[b, :2], points[c, :2], wrap=wrap) for a, b, c in triples]
+    np.testing.assert_allclose(angles, expected, atol=1e-3)
+    np.testing.assert_allclose(distances, [np.hypot(*(points[a, :2] - points[b, :2])) for a, b in pairs], atol=1e-6)
+
+
+def test_batch_angles():
+    points = np.array([[1, 0], [0, 0], [0, 1]], dtype=np.float32)
+    np.testing.assert_allclose(batch_angles(points, [(0, 1, 2), (2, 1, 0)]), [90, 90], atol=1e-4)
+
+
+def test_pose_frame_update():
+    points = random_points(1)
+    frame = PoseFrame()
+    frame.update(landmarks(points))
+    np.testing.assert_allclose(frame.points, points)
+    a, b, c = JOINTS["left_knee"]
+    assert frame.angle("left_knee") == pytest.approx(calculate_angle(points[a], points[b], points[c]), abs=1e-3)
+    assert frame.distance("wrists") == pytest.approx(np.hypot(*(points[LEFT_WRIST, :2] - points[RIGHT_WRIST, :2])))
+    np.testing.assert_array_equal(frame.point(LEFT_WRIST), points[LEFT_WRIST, :2])
+
+
+def test_pose_frame_selected_features():
+    frame = PoseFrame(joints=["right_elbow", "left_hip"], distances=[])
+    frame.update(landmarks(random_points(2)))
+    assert frame.features.shape == (2,)
+    assert frame.angles[0] == frame.angle("right_elbow")
+    assert frame.angles[1] == frame.angle("left_hip")
@@ -0,0 +1,68 @@
+import numpy as np
+
+from dadhichi.reps import EXERCISES, RepEngine
+
+FPS = 30
+
+
+def curl(seconds=1.0):
+    # Elbow angle over one curl: open (165) -> closed (25) -> open, sampled at FPS
+    t = np.linspace(0, 1, int(seconds * FPS), endpoint=False)
+    return 95 + 70 * np.cos(2 * np.pi * t)
+
+
+def run(engine, left, right, start=0.0):
+    events = []
+    for i, angles in enumerate(zip(left, right)):
+        events += engine.update(np.asarray(angles, dtype=np.float32), start + i / FPS)
+    return events
+
+
+def test_two_arm_curls_count_once():
+    engine = RepEngine([EXERCISES["Bicep Curl"]])
+    assert engine.joints == ["left_elbow", "right_elbow"]
+    angles = np.concatenate([curl() for _ in range(5)])
+    events = run(engine, angles, angles)
+    assert engine.reps("Bicep Curl") == 5
+    # Each arm reports its own reps; the count is the better side, not their sum
+    assert len(events) == 10
+    assert engine.counts.tolist() == [5, 5]
+
+
+def test_one_arm_curls():
+    engine = RepEngine([EXERCISES["Bicep Curl"]])
+    angles = np.concatenate([curl() for _ in range(4)])
+    run(engine, np.full(len(angles), 165.0), angles)
+    assert engine.reps("Bicep Curl") == 4
+    assert engine.counting_side("Bicep Curl") == "right"
+    assert engine.stage("Bicep Curl", "right") == "down"
+
+
+def test_jitter_within_min_rep_is_not_counted():
+    # Flips faster than min_rep are landmark noise: at most one rep per 0.4 s gets through
+    engine = RepEngine([EXERCISES["Bicep Curl"]])
+    angles = np.concatenate([curl(0.2) for _ in range(5)])
+    events = run(engine, angles, angles)
+    assert engine.reps("Bicep Curl") == 2
+    assert all(event.duration >= EXERCISES["Bicep Curl"].min_rep for event in events)
+
+
+def test_tempo_and_reset():
+    engine = RepEngine([EXERCISES["Bicep Curl"]])
+    angles = np.concatenate([curl(2.0) for _ in range(3)])
+    run(engine, angles, angles)
+    assert engine.reps("Bicep Curl") == 3
+    assert abs(engine.tempo("Bicep Curl") - 2.0) < 0.1
+    engine.reset()
+    assert engine.reps("Bicep Curl") == 0
+    assert engine.tempo("Bicep Curl") == 0.0
+    assert engine.stage("Bicep Curl") is None
+
+
+def test_exercises_share_joints():
+    engine = RepEngine([EXERCISES["Bicep Curl"], EXERCISES["Push-up"]])
+    assert engine.joints == ["left_elbow", "right_elbow"]
+    angles = np.concatenate([curl() for _ in range(2)])
+    run(engine, angles, angles)
+    assert engine.reps("Bicep Curl") == 2
+    assert engine.reps("Push-up") == 2
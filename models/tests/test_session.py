@@ -0,0 +1,58 @@
+from dadhichi.session import YogaSession
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def hold(session, clock, seconds, hold=5, correct=True, fps=10):
+    advanced = []
+    for _ in range(int(seconds * fps)):
+        advanced.append(session.update(correct, hold))
+        clock.now += 1 / fps
+    return advanced
+
+
+def test_hold_advances_pose():
+    clock = FakeClock()
+    session = YogaSession(3, clock=clock)
+    advanced = hold(session, clock, 4)
+    assert not any(advanced)
+    assert session.counter == 3
+    assert session.time_label == "TIME: 3s"
+    assert hold(session, clock, 1.5).count(True) == 1
+    assert session.pose_number == 2
+    assert session.index == 1
+
+
+def test_incorrect_frame_resets_timer():
+    clock = FakeClock()
+    session = YogaSession(3, clock=clock)
+    hold(session, clock, 4)
+    assert not session.update(False, 5)
+    assert session.counter == 0
+    hold(session, clock, 4)
+    assert session.pose_number == 1
+
+
+def test_finishes_after_last_pose():
+    clock = FakeClock()
+    session = YogaSession(2, clock=clock)
+    hold(session, clock, 6)
+    hold(session, clock, 6)
+    assert session.finished
+    assert session.pose_number == 3
+    assert not session.update(True, 5)
+    session.reset()
+    assert (session.pose_number, session.counter, session.finished) == (1, 0, False)
+
+
+def test_time_label_is_capped():
+    clock = FakeClock()
+    session = YogaSession(1, clock=clock, max_hold=10)
+    hold(session, clock, 20, hold=30)
+    assert session.time_label == "TIME: 10s"